@@ -5,6 +5,10 @@ They should be importable directly from this directory, with the main
 plugin class in any contained module being called Puzzle and inheriting from
 solver.plugin.PuzzleType.
 
+Each module should also have a MANIFEST dictionary literal with the "name",
+"extension" and "modes" of the plugin, so it can be listed without being
+imported. See solver.registry.
+
 """
 
 # PuzzleSolver
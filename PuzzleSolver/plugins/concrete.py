@@ -23,40 +23,55 @@ Various base classes for plugins.
 
 
 import tkinter
-import multiprocessing
-import queue
 import time
 
 import solver.plugin
-import solver.state
+from solver import profiling
+from solver.sharedbuffer import SharedBuffer
+from solver.progress import NODES, DEPTH, BEST
 
-_i = 0
+MANIFEST = {"name": "Concrete", "extension": ".con", "modes": ["CREATE", "PLAY"]}
+EXTENSION = MANIFEST["extension"]
+STEPS = 10 # Pretend search steps of the usual strategy
 
 class Puzzle(solver.plugin.PuzzleType):
     """Entire plugin."""
 
-    def __init__(self):
-        global _i
-        solver.plugin.PuzzleType.__init__(self)
-        self.i = _i
-        _i += 1
-
     def name(self):
         """Get the name of the puzzle type."""
-        return "Concrete " + str(self.i)
+        return MANIFEST["name"]
 
     def get(self, mode):
         """Get the a new puzzle pane for the given mode."""
-        return ConcreteView(mode, self.i)
+        return ConcreteView(mode)
+
+    def extension(self):
+        """Get the file extension used to save puzzles of this type."""
+        return EXTENSION
+
+    def solvePuzzle(self, puzzle, context=None):
+        """Solve a loaded puzzle object without a GUI."""
+        board = bytearray(puzzle.encode("utf-8"))
+        _solve(board, lambda colour: None, context)
+        return board.decode("utf-8")
+
+    def encodePuzzle(self, puzzle):
+        """Get the bytes to save for a puzzle."""
+        return puzzle.encode("utf-8")
+
+    def decodePuzzle(self, data):
+        """Rebuild a puzzle from its saved bytes."""
+        return str(data, "utf-8")
 
 class ConcreteView(solver.plugin.PuzzleView):
     """Functionality for a single mode."""
 
-    def __init__(self, mode, i):
+    def __init__(self, mode):
         solver.plugin.PuzzleView.__init__(self)
         self.mode = mode
-        self.i = i
         self.data = tkinter.StringVar()
+        self.partial = {} # Solver's letters by UTF-8 offset, shown apart from data
+        self.preview = tkinter.StringVar()
         self.changeValue("", False)
 
     def changeValue(self, text, needssaving=True):
@@ -69,23 +84,30 @@ class ConcreteView(solver.plugin.PuzzleView):
         fr = tkinter.Frame(master)
         fr.grid_rowconfigure(0, weight=1)
         fr.grid_columnconfigure(0, weight=1)
-        tkinter.Label(fr, text="Hello I am " + str(self.i) + " and my mode is " + self.mode).grid(row=0, column=0, sticky="nsew")
+        tkinter.Label(fr, text="Hello my mode is " + self.mode).grid(row=0, column=0, sticky="nsew")
         tkinter.Entry(fr, textvariable=self.data).grid(row=1, column=0, sticky="sew")
+        tkinter.Label(fr, textvariable=self.preview, fg="GREY").grid(row=2, column=0, sticky="sew")
         self.status = tkinter.Frame(fr, width=50, background="GREEN")
         self.status.grid(row=0, column=1, rowspan=2, sticky="nse")
         return fr
 
     def canSolve(self):
         """Can we solve puzzles in this view."""
-        return self.i > 4 and self.mode == "PLAY"
+        return self.mode == "PLAY"
 
     def getSolver(self):
         """Get the solver for this view if one exists."""
         return ConcreteSolver(self.data, self.status) if self.canSolve() else None
 
+    def getSolvers(self):
+        """Get every strategy to race, a slow and careful one and a quick one."""
+        if not self.canSolve():
+            return []
+        return [ConcreteSolver(self.data, self.status, steps) for steps in (STEPS, STEPS // 2)]
+
     def getExtension(self):
         """Get either the file extension used to save the puzzles below, or None."""
-        return ".con"
+        return EXTENSION
 
     def getPuzzle(self):
         """Get either the puzzle object if it can be saved, or None."""
@@ -107,53 +129,94 @@ class ConcreteView(solver.plugin.PuzzleView):
         """Load the given puzzle if possible and return if successful."""
         self.changeValue(str(puzzle), False)
 
-class ConcreteSolver(solver.plugin.Solver):
+    def applyPartial(self, changes):
+        """Show letters the solver has finished, keyed by their offset in the UTF-8 board."""
+        for i, c in changes.items():
+            if c == None:
+                self.partial.pop(i, None)
+            else:
+                self.partial[i] = c
+        board = bytearray(self.data.get().encode("utf-8"))
+        for i, c in self.partial.items():
+            if i < len(board):
+                board[i] = c
+        self.preview.set(board.decode("utf-8", "replace") if self.partial else "")
+
+    def clearPartial(self):
+        """Stop showing the solver's letters."""
+        self.partial = {}
+        self.preview.set("")
+
+class ConcreteSolver(solver.plugin.PooledSolver):
     """Functionality for a puzzle solver, changed will be performed on the underlying view."""
 
-    def __init__(self, var, status):
-        solver.plugin.Solver.__init__(self)
-        self.var = var
-        self.status = status
-        self.queue = multiprocessing.Queue()
-        self.proc = None
-
-    def start(self):
-        """Start the solver."""
-
-        self.proc = multiprocessing.Process(target=self.solve)
-        self.proc.start()
-        self.poll()
+    checkpoints = True
 
-    def stop(self):
-        """Stop the solver and return success (in stopping)."""
-
-        return self.proc == None or not self.proc.is_alive()
-
-    def poll(self): # Ergh
-        if self.proc == None:
-            return
-        lastitem = None
-        while True:
-            try:
-                lastitem = self.queue.get(False)
-
-                if lastitem == False: # Done
-                    self.proc.join()
-                    self.proc = None
-                    solver.state.solving.change(None)
-                    return
-
-                self.status.config(bg=lastitem)
-            except queue.Empty:
-                break
-
-        self.status.after(10, self.poll)
-
-    def solve(self):
-        for i in range(10):
-            self.queue.put("RED")
-            time.sleep(0.5)
-            self.queue.put("ORANGE")
+    def __init__(self, var, status, steps=None):
+        solver.plugin.PooledSolver.__init__(self, status)
+        self.var = var
+        self.board = None
+        self.steps = STEPS if steps == None else steps
+
+    def strategy(self):
+        """Name the strategy by how many steps it takes."""
+        return "steps%d" % self.steps
+
+    def task(self):
+        """Get the function and arguments to run in a worker."""
+
+        self.board = SharedBuffer.publish(self.var.get().encode("utf-8"))
+        return _run, (self.board, self.steps)
+
+    def update(self, colour):
+        if self.shown():
+            self.widget.config(bg=colour)
+
+    def solved(self, result):
+        if result:
+            self.var.set(bytes(self.board.view).decode("utf-8"))
+            self.widget.config(bg="GREEN") # Its updates were hidden if it was not the favourite
+
+    def release(self):
+        solver.plugin.PooledSolver.release(self)
+        if self.board != None:
+            self.board.close()
+            self.board = None
+
+def _run(context, board, steps):
+    """Entry point for the solving process, the board is solved in place."""
+
+    try:
+        return _solve(board.view, context.send, context, steps)
+    finally:
+        board.close()
+
+def _solve(board, report, context=None, steps=None):
+    """
+    Pretend to solve the UTF-8 board in place over a number of steps,
+    passing status colours to report, and return whether it was solved.
+
+    """
+
+    start = context.resumed() if context != None else None
+    for i in range(start or 0, STEPS if steps == None else steps):
+        for colour in ("RED", "ORANGE"):
+            if context != None:
+                if context.wantsCheckpoint():
+                    context.checkpoint(i)
+                if context.cancelled():
+                    return False
+                values = context.progress.values
+                values[NODES] += 1
+                values[DEPTH] = values[BEST] = i
+            report(colour)
             time.sleep(0.5)
-        self.queue.put("GREEN")
-        self.queue.put(False)
+    with profiling.span("concrete.upper"):
+        for i, c in enumerate(board):
+            if ord("a") <= c <= ord("z"):
+                board[i] = c - 32
+                profiling.count("concrete.letters")
+                if context != None:
+                    context.sendPartial({i: c - 32})
+    report("GREEN")
+    return True
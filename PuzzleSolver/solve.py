@@ -18,9 +18,83 @@
 #     You should have received a copy of the GNU General Public License
 #     along with PuzzleSolver.  If not, see <http://www.gnu.org/licenses/>.
 
+import argparse
+import os
+import sys
+
 import plugins
 
+import solver.batch
+import solver.benchmark
+import solver.checkpoint
 import solver.gui.main
+import solver.pool
+import solver.profiling
+import solver.state
 
 if __name__ == "__main__":
-    solver.gui.main.start_gui(plugins)
+    parser = argparse.ArgumentParser(description="Create and solve puzzles.")
+    parser.add_argument("--batch", nargs="+", metavar="PATH",
+        help="solve saved puzzles in these directories or globs without the GUI")
+    parser.add_argument("--inspect", nargs="+", metavar="PATH",
+        help="show the headers of saved puzzles without loading them")
+    parser.add_argument("--scan", nargs="*", metavar="PATH",
+        help="add saved puzzles to the library, or rescan it when no paths are given")
+    parser.add_argument("--search", metavar="TEXT",
+        help="list puzzles in the library whose path contains TEXT")
+    parser.add_argument("--benchmark", nargs="?", metavar="DIR",
+        const=os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks"),
+        help="time solving the puzzles in a benchmark corpus (default: the bundled one)")
+    parser.add_argument("--baseline", metavar="FILE",
+        help="benchmark results to compare with (default: baseline.json in the corpus)")
+    parser.add_argument("--threshold", type=float, default=100 * solver.benchmark.THRESHOLD, metavar="PCT",
+        help="percentage a benchmark metric may grow by before failing (default: %(default)g)")
+    parser.add_argument("--repeat", type=int, default=1, metavar="N",
+        help="times to solve each benchmark puzzle, keeping the median (default: 1)")
+    parser.add_argument("--save-baseline", action="store_true",
+        help="save the benchmark results as the new baseline")
+    parser.add_argument("--profile", choices=solver.profiling.MODES,
+        help="profile each solve inside its solving process")
+    parser.add_argument("--profile-dir", metavar="DIR",
+        help="where profiles are written (default: the user's cache directory)")
+    parser.add_argument("--stats", action="store_true",
+        help="show percentiles of recorded solve times for each plugin")
+    parser.add_argument("--checkpoint-interval", type=float, metavar="SECONDS",
+        default=solver.checkpoint.settings["interval"],
+        help="how often long solves save a checkpoint to resume from (default: %(default)g)")
+    parser.add_argument("--no-checkpoints", action="store_true",
+        help="neither save nor resume from checkpoints")
+    parser.add_argument("--no-race", action="store_true",
+        help="use a single strategy even for puzzles that offer several")
+    parser.add_argument("--watchdog", action="store_true",
+        help="show how long the interface is kept busy, and log it on exit")
+    parser.add_argument("--jobs", type=int, metavar="N",
+        help="number of processes for batch solving (default: all cores)")
+    parser.add_argument("--workers", type=int, metavar="N",
+        help="number of warm solver processes kept by the GUI (default: all cores)")
+    parser.add_argument("--start-method", choices=solver.pool.START_METHODS,
+        help="how solver processes are started (default: platform default)")
+    args = parser.parse_args()
+
+    solver.pool.configure(args.workers, args.start_method)
+    solver.profiling.settings["directory"] = args.profile_dir
+    solver.checkpoint.settings["interval"] = args.checkpoint_interval
+    solver.checkpoint.settings["enabled"] = not args.no_checkpoints
+    solver.state.profile.change(args.profile)
+    solver.state.racing.change(not args.no_race)
+
+    if args.batch:
+        sys.exit(solver.batch.run(plugins, args.batch, args.jobs,
+            profile=solver.profiling.request(args.profile)))
+    if args.benchmark:
+        sys.exit(solver.benchmark.run(plugins, args.benchmark, args.baseline,
+            args.threshold / 100, args.repeat, args.save_baseline))
+    if args.inspect:
+        sys.exit(solver.batch.inspect(args.inspect))
+    if args.scan != None:
+        sys.exit(solver.batch.scan(plugins, args.scan))
+    if args.stats:
+        sys.exit(solver.batch.stats())
+    if args.search != None:
+        sys.exit(solver.batch.search(args.search))
+    solver.gui.main.start_gui(plugins, args.watchdog)
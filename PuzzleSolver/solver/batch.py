@@ -0,0 +1,183 @@
+"""
+Headless solving of saved puzzles, spread over a pool of processes.
+
+"""
+
+# PuzzleSolver
+# Copyright (C) 2010  Andy Gurden
+#
+#     This file is part of PuzzleSolver.
+#
+#     PuzzleSolver is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     PuzzleSolver is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with PuzzleSolver.  If not, see <http://www.gnu.org/licenses/>.
+
+import importlib
+import os
+import sys
+import time
+
+from . import checkpoint
+from . import library
+from . import plugin
+from . import pool
+from . import profiling
+from . import progress
+from . import registry
+from . import saveformat
+from . import telemetry
+
+_types = None # Extension to puzzle type, set up in each worker
+_profile = None # Profiling for each solve, from profiling.request
+
+def puzzle_types(module):
+    """Map file extensions to puzzle types for all plugins inside module."""
+
+    types = {}
+    for info in registry.discover(module):
+        if info.extension != None:
+            types.setdefault(info.extension, registry.LazyPuzzleType(info))
+    return types
+
+def plugin_ids(types):
+    """Map file extensions to plugin ids, from the result of puzzle_types."""
+
+    return {ext: p.pluginId() for ext, p in types.items()}
+
+def _init_worker(modulename, profile=None, checkpoints=None):
+    global _types, _profile
+    _types = puzzle_types(importlib.import_module(modulename))
+    _profile = profile
+    if checkpoints != None: # Not inherited by spawned workers
+        checkpoint.settings.update(checkpoints)
+
+def _solve_file(filename):
+    """
+    Solve a single file inside a worker.
+
+    Returns (filename, outcome, error, seconds, profile files, telemetry
+    entry), with the outcome from telemetry.OUTCOMES and error saying why
+    it failed, if it did. This leaves the entry, if any, to be recorded by the parent so only one
+    process writes the log.
+
+    """
+
+    p = _types.get(os.path.splitext(filename)[1])
+    started = time.perf_counter()
+    used = telemetry.begin()
+    counters = progress.Progress()
+    context = plugin.SolveContext(plugin.NeverCancelled(), None, counters)
+    run = None
+    captured = None
+    outcome, error = "failed", None
+    try:
+        puzzle = saveformat.read(filename, p)
+        run = telemetry.Run(p, "batch", puzzle)
+        # Batch solves interrupted part way resume on the next run
+        context.checkpointer = checkpoint.for_puzzle(p, puzzle, "batch", filename)
+        with profiling.capture(_profile, os.path.basename(filename)) as captured:
+            outcome = "unsolved" if p.solvePuzzle(puzzle, context) == None else "solved"
+    except NotImplementedError:
+        error = "unsupported"
+    except (saveformat.SaveFormatError, IOError):
+        error = "unreadable"
+    except Exception as e:
+        error = type(e).__name__
+    taken = time.perf_counter() - started
+    if run != None:
+        run.finish(outcome, counters.values[progress.NODES], telemetry.usage(used), False, error)
+    if context.checkpointer != None and error == None:
+        context.checkpointer.clear()
+    context.close()
+    return (filename, outcome, error, taken, captured.files if captured != None else [],
+        run.entry if run != None else None)
+
+def run(module, paths, jobs=None, out=sys.stdout, profile=None):
+    """
+    Solve all saved puzzles found in paths and write results to out.
+
+    Lines are written as each puzzle finishes, so are not in file order.
+    Each solve is profiled if profile comes from profiling.request.
+    Returns an exit status, non-zero if any puzzle failed to solve.
+
+    """
+
+    types = puzzle_types(module)
+    files = [f for f in library.find_files(paths) if os.path.splitext(f)[1] in types]
+    if not files:
+        print("No saved puzzles found.", file=out)
+        return 1
+
+    lib = library.Library()
+    lib.index(files, plugin_ids(types))
+
+    counts = {}
+    started = time.perf_counter()
+    with pool.context().Pool(jobs, _init_worker,
+            (module.__name__, profile, dict(checkpoint.settings))) as workers:
+        for filename, outcome, error, taken, profiles, entry in workers.imap_unordered(_solve_file, files):
+            if entry != None:
+                telemetry.record(entry)
+            counts[outcome] = counts.get(outcome, 0) + 1
+            lib.record(filename, outcome, taken)
+            print("%9.3fs  %-24s %s" % (taken, outcome if error == None else
+                "%s (%s)" % (outcome, error), filename), file=out, flush=True)
+            for profile in profiles:
+                print("%10s  profile      %s" % ("", profile), file=out, flush=True)
+    taken = time.perf_counter() - started
+    lib.close()
+
+    summary = ", ".join("%d %s" % (n, o) for o, n in sorted(counts.items()))
+    print("%d puzzles in %.3fs: %s" % (len(files), taken, summary), file=out, flush=True)
+    return 0 if counts.get("solved", 0) == len(files) else 1
+
+def inspect(paths, out=sys.stdout):
+    """Write the header of each saved puzzle in paths, without loading them."""
+
+    for filename in library.find_files(paths):
+        try:
+            header = saveformat.read_header(filename)
+        except (saveformat.SaveFormatError, IOError) as e:
+            print("%-40s unreadable (%s)" % (filename, e), file=out)
+            continue
+        if header == None:
+            print("%-40s legacy pickle" % filename, file=out)
+        else:
+            print("%-40s %s v%d %s %d/%d bytes" % (filename, header.plugin, header.version,
+                header.codec or "uncompressed", header.storedSize, header.rawSize), file=out)
+    return 0
+
+def scan(module, paths, out=sys.stdout):
+    """Add saved puzzles under paths to the library, or rescan it if paths is empty."""
+
+    lib = library.Library()
+    ids = plugin_ids(puzzle_types(module))
+    changed, removed = lib.scan(paths, ids) if paths else lib.rescan(ids)
+    lib.close()
+    print("%d puzzles added or changed, %d removed." % (changed, removed), file=out)
+    return 0
+
+def stats(out=sys.stdout):
+    """Write percentiles of solve times per plugin from the telemetry log."""
+
+    return telemetry.summarise(out)
+
+def search(text, out=sys.stdout):
+    """Write library entries whose path contains text."""
+
+    lib = library.Library()
+    for entry in lib.search(text):
+        taken = "%.3fs" % entry.bestTime if entry.bestTime != None else "-"
+        print("%-12s %9s  %-20s %s" % (entry.status or "unsolved", taken,
+            entry.plugin or "?", entry.path), file=out)
+    lib.close()
+    return 0
@@ -0,0 +1,228 @@
+"""
+Solver throughput benchmarks over a corpus of saved puzzles.
+
+The corpus is a directory of puzzles saved by each plugin, kept under
+version control next to a baseline of earlier results. Every puzzle is
+solved headlessly the way the GUI's solvers run, as a task in a fresh
+worker pool, recording wall time, CPU time, peak memory and search nodes.
+
+A metric regresses when it grows by more than the threshold, 25% unless
+given, and by more than its SLACK. Times depend on the machine, so the
+baseline also holds how long a fixed piece of work took when it was
+saved. On a slower machine the baseline's times are scaled up to match,
+so the bundled baseline can be checked anywhere. They are never scaled
+down, as many solvers spend much of their time waiting rather than
+computing.
+
+"""
+
+# PuzzleSolver
+# Copyright (C) 2010  Andy Gurden
+#
+#     This file is part of PuzzleSolver.
+#
+#     PuzzleSolver is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     PuzzleSolver is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with PuzzleSolver.  If not, see <http://www.gnu.org/licenses/>.
+
+import importlib
+import json
+import math
+import os
+import statistics
+import sys
+import time
+
+from . import batch
+from . import library
+from . import plugin
+from . import pool
+from . import progress
+from . import saveformat
+
+BASELINE_NAME = "baseline.json"
+BASELINE_VERSION = 2
+
+METRICS = ("wall", "cpu", "rss", "nodes")
+
+# Default fraction a metric may grow by before it counts as a regression
+THRESHOLD = 0.25
+
+# Smallest growth that counts for each metric, to ignore noise on tiny values
+SLACK = {"wall": 0.05, "cpu": 0.05, "rss": 4 << 20, "nodes": 0}
+
+# Metrics that depend on how fast the machine is
+TIMES = ("wall", "cpu")
+
+# Size of the fixed piece of work timed by calibrate
+CALIBRATION_LOOPS = 200000
+
+def calibrate(repeat=5):
+    """Get the median seconds taken by a fixed piece of pure Python work."""
+
+    taken = []
+    for i in range(repeat):
+        started = time.perf_counter()
+        total = 0
+        for j in range(CALIBRATION_LOOPS):
+            total += j * j % 7
+        taken.append(time.perf_counter() - started)
+    return statistics.median(taken)
+
+def _solve_saved(context, modulename, filename):
+    """Task solving one saved puzzle, returning its outcome."""
+
+    ptype = batch.puzzle_types(importlib.import_module(modulename))[os.path.splitext(filename)[1]]
+    puzzle = saveformat.read(filename, ptype)
+    try:
+        return "unsolved" if ptype.solvePuzzle(puzzle, context) == None else "solved"
+    except NotImplementedError:
+        return "failed (unsupported)"
+
+def _measure(modulename, filename):
+    """
+    Solve one saved puzzle as a task in a fresh worker, as PooledSolver
+    does, and return its metrics.
+
+    """
+
+    workers = pool.WorkerPool(1, pool.context().get_start_method())
+    counters = progress.Progress()
+    try:
+        wall = time.perf_counter()
+        job = workers.submit(plugin._run_task, None, counters, None, None,
+            _solve_saved, (modulename, filename))
+        try:
+            outcome, used, profiles = job.join()
+        except pool.JobError as e:
+            outcome, used = "failed (" + e.exception() + ")", {}
+        return {
+            "outcome": outcome,
+            "wall": time.perf_counter() - wall,
+            "cpu": used.get("cpu", math.nan),
+            "rss": used.get("worker_rss", math.nan),
+            "nodes": counters.values[progress.NODES],
+        }
+    finally:
+        counters.close()
+        workers.shutdown()
+
+def load_baseline(filename):
+    """
+    Read a baseline file, or return None if there is none.
+
+    Returns {"results": {puzzle: metrics}, "calibration": seconds}.
+
+    """
+
+    try:
+        with open(filename) as file:
+            baseline = json.load(file)
+    except (IOError, ValueError):
+        return None
+    if baseline.get("version") != BASELINE_VERSION:
+        return None
+    return {"results": baseline.get("results", {}), "calibration": baseline.get("calibration")}
+
+def save_baseline(filename, results, calibration):
+    with open(filename, "w") as file:
+        json.dump({"version": BASELINE_VERSION, "calibration": calibration, "results": results},
+            file, indent=1, sort_keys=True)
+        file.write("\n")
+
+def scale(calibration, baseCalibration):
+    """Get how much to scale up the baseline's times, from the two calibrate results."""
+
+    if not calibration or not baseCalibration:
+        return 1.0
+    return max(1.0, calibration / baseCalibration)
+
+def compare(result, base, threshold=THRESHOLD, slower=1.0):
+    """
+    Get the metrics of result that regressed from base, as {metric: fraction grown}.
+
+    Times in base are first multiplied by slower, from scale.
+
+    """
+
+    worse = {}
+    for metric in METRICS:
+        old, new = base.get(metric), result[metric]
+        if old == None or new != new: # Missing, or not measured (NaN)
+            continue
+        if metric in TIMES:
+            old *= slower
+        if new > old * (1 + threshold) and new - old > SLACK[metric]:
+            worse[metric] = (new - old) / old if old else float("inf")
+    return worse
+
+def run(module, corpus, baselineFile=None, threshold=THRESHOLD, repeat=1, save=False, out=sys.stdout):
+    """
+    Benchmark every plugin of module over the saved puzzles in corpus.
+
+    Each puzzle is solved repeat times and the median of each metric is
+    kept. Puzzles are compared against the baseline only if their contents
+    are unchanged since it was saved, and a puzzle without a baseline
+    counts as failed unless one is being saved. Returns an exit status,
+    non-zero if any puzzle failed or any metric regressed.
+
+    """
+
+    baselineFile = baselineFile or os.path.join(corpus, BASELINE_NAME)
+    types = batch.puzzle_types(module)
+    files = [f for f in library.find_files([corpus]) if os.path.splitext(f)[1] in types]
+    if not files:
+        print("No saved puzzles found in the corpus.", file=out)
+        return 1
+    baseline = load_baseline(baselineFile)
+    calibration = calibrate()
+    slower = scale(calibration, baseline["calibration"]) if baseline != None else 1.0
+    if slower > 1.0:
+        print("Machine is %.2f times slower than the baseline's, scaling its times to match." % slower,
+            file=out)
+
+    results = {}
+    failed = 0
+    for filename in files:
+        key = os.path.relpath(filename, corpus).replace(os.sep, "/")
+        # A fresh worker each time, so peak memory is for that puzzle alone
+        runs = [_measure(module.__name__, filename) for i in range(repeat)]
+        result = {metric: statistics.median(r[metric] for r in runs) for metric in METRICS}
+        result["hash"] = library.file_hash(filename)
+        outcome = next((r["outcome"] for r in runs if r["outcome"] != "solved"), "solved")
+        results[key] = result
+
+        notes = []
+        bad = outcome != "solved"
+        if bad:
+            notes.append(outcome)
+        base = baseline["results"].get(key) if baseline != None else None
+        if base == None or base.get("hash") != result["hash"]:
+            notes.append("no baseline")
+            bad = bad or not save
+        else:
+            worse = compare(result, base, threshold, slower)
+            if worse:
+                bad = True
+                notes.extend("%s +%.0f%%" % (m, 100 * f) for m, f in sorted(worse.items()))
+        print("%-32s %8.3fs wall %8.3fs cpu %7.1fMB %10d nodes  %s" % (key, result["wall"],
+            result["cpu"], result["rss"] / (1 << 20), result["nodes"], ", ".join(notes) or "ok"),
+            file=out, flush=True)
+        failed += bad
+
+    if save:
+        save_baseline(baselineFile, results, calibration)
+        print("Baseline saved to " + baselineFile, file=out)
+    elif baseline == None:
+        print("No baseline to compare with, save one with --save-baseline.", file=out)
+    print("%d puzzles, %d failed or regressed." % (len(files), failed), file=out)
+    return 1 if failed else 0
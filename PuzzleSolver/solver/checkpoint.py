@@ -0,0 +1,158 @@
+"""
+Checkpoints that let a long solve carry on after the program is restarted.
+
+A task that supports them saves its search frontier through its
+SolveContext every so often, and again when it is cancelled. The next solve
+of the same puzzle by the same solver gets that frontier back through
+SolveContext.resumed instead of starting over. Checkpoints are found by the
+content hash of the puzzle, and removed once a solve finishes by itself
+without failing.
+
+Each checkpoint is a compressed pickle, written to a temporary file that
+then replaces the old one, so a crash part way through never leaves a
+broken checkpoint behind.
+
+"""
+
+# PuzzleSolver
+# Copyright (C) 2010  Andy Gurden
+#
+#     This file is part of PuzzleSolver.
+#
+#     PuzzleSolver is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     PuzzleSolver is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with PuzzleSolver.  If not, see <http://www.gnu.org/licenses/>.
+
+import hashlib
+import os
+import pickle
+import struct
+import tempfile
+import time
+import zlib
+
+from . import saveformat
+from .utility import paths
+
+MAGIC = b"PZCK"
+VERSION = 1
+
+# Magic, version and the length of the key that follows
+_HEADER = struct.Struct("<4sBH")
+
+EXTENSION = ".ckpt"
+
+settings = {
+    "directory": None, # Where checkpoints are kept, None for the default
+    "interval": 60.0, # Seconds between checkpoints of a running solve
+    "enabled": True,
+}
+
+def directory():
+    return settings["directory"] or paths.data_file("checkpoints")
+
+def for_puzzle(ptype, puzzle, solver, source=None):
+    """
+    Get the Checkpointer for a puzzle solved by the named solver.
+
+    source is the file the puzzle was read from, if identical puzzles from
+    different files may be solved at once and so need their own
+    checkpoints.
+
+    Returns None if checkpoints are off or the puzzle cannot be saved, and
+    so has no content hash.
+
+    """
+
+    if not settings["enabled"] or ptype == None:
+        return None
+    try:
+        digest = saveformat.content_hash(ptype, puzzle)
+    except Exception:
+        return None
+    if source != None:
+        solver += "-" + hashlib.sha1(os.path.abspath(source).encode("utf-8")).hexdigest()[:12]
+    return Checkpointer(digest + ":" + solver)
+
+class Checkpointer:
+    """
+    Reads and writes the checkpoint for one puzzle and solver.
+
+    It is made where the solve is started and handed to the solving
+    process, which is the only one to save.
+
+    """
+
+    def __init__(self, key, interval=None):
+        self.key = key
+        digest, _, solver = key.partition(":")
+        self.filename = os.path.join(directory(), "%s-%s%s" % (digest[:32], solver, EXTENSION))
+        self.interval = settings["interval"] if interval == None else interval
+        self._last = None
+
+    def exists(self):
+        return os.path.exists(self.filename)
+
+    def load(self):
+        """Get (state, counters) from the checkpoint, or None if there is no usable one."""
+
+        try:
+            with open(self.filename, "rb") as file:
+                data = file.read()
+            magic, version, keySize = _HEADER.unpack_from(data)
+            start = _HEADER.size + keySize
+            if magic != MAGIC or version != VERSION or data[_HEADER.size:start] != self.key.encode("utf-8"):
+                return None
+            return pickle.loads(zlib.decompress(data[start:]))
+        except Exception: # Missing, or from something that has since changed
+            return None
+
+    def due(self):
+        """Has the interval passed since the last save, or since the first call."""
+
+        now = time.monotonic()
+        if self._last == None:
+            self._last = now
+        return now - self._last >= self.interval
+
+    def save(self, state, counters):
+        """Atomically replace the checkpoint with state and progress counters."""
+
+        self._last = time.monotonic()
+        key = self.key.encode("utf-8")
+        data = _HEADER.pack(MAGIC, VERSION, len(key)) + key + zlib.compress(
+            pickle.dumps((state, counters), pickle.HIGHEST_PROTOCOL))
+        folder = os.path.dirname(self.filename)
+        try:
+            os.makedirs(folder, exist_ok=True)
+            handle, temp = tempfile.mkstemp(EXTENSION + ".tmp", dir=folder)
+        except OSError: # Never worth failing a solve over
+            return
+        try:
+            with os.fdopen(handle, "wb") as file:
+                file.write(data)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temp, self.filename)
+        except OSError:
+            try:
+                os.remove(temp)
+            except OSError:
+                pass
+
+    def clear(self):
+        """Remove the checkpoint, once the solve no longer needs it."""
+
+        try:
+            os.remove(self.filename)
+        except OSError:
+            pass
@@ -0,0 +1,259 @@
+"""
+Exact cover search with dancing links, for plugins to build solvers on.
+
+A puzzle is described as constraints, each of which must be satisfied
+exactly once, and options, each of which satisfies some constraints. A
+solution is a set of options that together satisfy every constraint once.
+Sudoku, polyomino tilings, pentominoes and N-queens all fit this shape.
+
+Optional constraints may be satisfied at most once instead, which is how
+for example the diagonals of N-queens are handled.
+
+"""
+
+# PuzzleSolver
+# Copyright (C) 2010  Andy Gurden
+#
+#     This file is part of PuzzleSolver.
+#
+#     PuzzleSolver is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     PuzzleSolver is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with PuzzleSolver.  If not, see <http://www.gnu.org/licenses/>.
+
+from .progress import NODES, DEPTH, BACKTRACKS, BEST
+
+# Nodes visited between checks for cancellation and progress updates
+CHECK_EVERY = 1024
+
+class ExactCover:
+    """
+    Knuth's Algorithm X over dancing links.
+
+    Nodes are not objects but indexes into flat parallel lists of links,
+    which keeps them small and the inner loops free of attribute lookups.
+    Node 0 is the root, and each constraint has a header node whose size
+    entry counts the options still able to satisfy it.
+
+    """
+
+    def __init__(self):
+        self._left = [0]
+        self._right = [0]
+        self._up = [0]
+        self._down = [0]
+        self._column = [0]
+        self._size = [0]
+        self._option = [-1] # Option number for each node, -1 for headers
+        self._constraints = {}
+        self.options = []
+
+    def addConstraint(self, name, optional=False):
+        """Declare a constraint that must be satisfied once, or at most once if optional."""
+
+        if name in self._constraints:
+            raise ValueError("Constraint already declared: %r" % (name,))
+        c = len(self._left)
+        if optional: # Not in the header list so never chosen to branch on
+            self._left.append(c)
+            self._right.append(c)
+        else:
+            last = self._left[0]
+            self._left.append(last)
+            self._right.append(0)
+            self._right[last] = c
+            self._left[0] = c
+        self._up.append(c)
+        self._down.append(c)
+        self._column.append(c)
+        self._size.append(0)
+        self._option.append(-1)
+        self._constraints[name] = c
+        return c
+
+    def addOption(self, name, constraints):
+        """
+        Declare an option satisfying each of the named constraints.
+
+        Raises KeyError for an undeclared constraint and ValueError for one
+        named twice, before anything is added.
+
+        """
+
+        columns = [self._constraints[cname] for cname in constraints]
+        if not columns:
+            raise ValueError("Option satisfies no constraints: %r" % (name,))
+        if len(set(columns)) != len(columns):
+            raise ValueError("Option names a constraint twice: %r" % (name,))
+
+        left, right, up, down = self._left, self._right, self._up, self._down
+        number = len(self.options)
+        first = None
+        for c in columns:
+            n = len(left)
+            if first == None:
+                first = n
+                left.append(n)
+                right.append(n)
+            else:
+                left.append(left[first])
+                right.append(first)
+                right[left[first]] = n
+                left[first] = n
+            up.append(up[c])
+            down.append(c)
+            down[up[c]] = n
+            up[c] = n
+            self._column.append(c)
+            self._size.append(0)
+            self._option.append(number)
+            self._size[c] += 1
+        self.options.append(name)
+
+    def solutions(self, context=None):
+        """Generate every solution as a list of option names."""
+
+        options = self.options
+        optionOf = self._option
+        for chosen in self._search(context):
+            yield [options[optionOf[r]] for r in chosen]
+
+    def first(self, context=None):
+        """Get the first solution found, or None if there is none or context was cancelled first."""
+
+        for solution in self.solutions(context):
+            return solution
+        return None
+
+    def count(self, limit=None, context=None):
+        """
+        Count the solutions, stopping early once there are limit of them.
+
+        Returns None if context was cancelled before the count was complete.
+
+        """
+
+        found = 0
+        for chosen in self._search(context):
+            found += 1
+            if found == limit:
+                return found
+        if context != None and context.cancelled():
+            return None
+        return found
+
+    def _search(self, context):
+        """
+        Generate the nodes of the chosen rows for each solution.
+
+        The yielded list is reused, so must be copied if kept. If context
+        is given its progress is updated and the search ends early once it
+        is cancelled. Links are always restored when the generator ends.
+
+        """
+
+        L, R, U, D, C, S = self._left, self._right, self._up, self._down, self._column, self._size
+
+        def cover(c):
+            R[L[c]] = R[c]
+            L[R[c]] = L[c]
+            i = D[c]
+            while i != c:
+                j = R[i]
+                while j != i:
+                    D[U[j]] = D[j]
+                    U[D[j]] = U[j]
+                    S[C[j]] -= 1
+                    j = R[j]
+                i = D[i]
+
+        def uncover(c):
+            i = U[c]
+            while i != c:
+                j = L[i]
+                while j != i:
+                    S[C[j]] += 1
+                    D[U[j]] = j
+                    U[D[j]] = j
+                    j = L[j]
+                i = U[i]
+            R[L[c]] = c
+            L[R[c]] = c
+
+        def coverRow(r):
+            j = R[r]
+            while j != r:
+                cover(C[j])
+                j = R[j]
+
+        def uncoverRow(r):
+            j = L[r]
+            while j != r:
+                uncover(C[j])
+                j = L[j]
+
+        values = context.progress.values if context != None else None
+        nodes = backtracks = found = 0
+        columns = []
+        chosen = []
+        try:
+            while True:
+                # Every chosen row is fully covered here
+                nodes += 1
+                if values != None and nodes % CHECK_EVERY == 0:
+                    values[NODES] += CHECK_EVERY
+                    values[DEPTH] = len(chosen)
+                    if context.cancelled():
+                        return
+
+                if R[0] == 0:
+                    found += 1
+                    if values != None:
+                        values[BEST] = found
+                    yield chosen
+                    descend = False
+                else:
+                    # Branch on the constraint with fewest options left
+                    c = R[0]
+                    best = S[c]
+                    j = R[c]
+                    while j != 0 and best > 1:
+                        if S[j] < best:
+                            c, best = j, S[j]
+                        j = R[j]
+                    cover(c)
+                    columns.append(c)
+                    chosen.append(D[c])
+                    descend = True
+
+                while True:
+                    if not descend:
+                        if not chosen:
+                            return
+                        r = chosen[-1]
+                        uncoverRow(r)
+                        chosen[-1] = D[r]
+                        backtracks += 1
+                    r = chosen[-1]
+                    if r == columns[-1]: # Ran out of options here
+                        uncover(columns.pop())
+                        chosen.pop()
+                        descend = False
+                        continue
+                    coverRow(r)
+                    break
+        finally:
+            while chosen:
+                uncoverRow(chosen.pop())
+                uncover(columns.pop())
+            if values != None:
+                values[NODES] += nodes % CHECK_EVERY
+                values[BACKTRACKS] += backtracks
@@ -0,0 +1,245 @@
+"""
+Compact grid of cells for puzzles played on a board.
+
+"""
+
+# PuzzleSolver
+# Copyright (C) 2010  Andy Gurden
+#
+#     This file is part of PuzzleSolver.
+#
+#     PuzzleSolver is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     PuzzleSolver is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with PuzzleSolver.  If not, see <http://www.gnu.org/licenses/>.
+
+import array
+import struct
+import sys
+
+# rows, cols, values, box rows, box cols, has candidates
+_HEADER = struct.Struct("<HHBBBB")
+
+_layouts = {}
+
+class Layout:
+    """Cell indexes of each unit for one shape of grid, shared between grids."""
+
+    def __init__(self, rows, cols, boxRows, boxCols):
+        self.rows = tuple(tuple(range(r * cols, (r + 1) * cols)) for r in range(rows))
+        self.cols = tuple(tuple(range(c, rows * cols, cols)) for c in range(cols))
+        if boxRows and boxCols:
+            self.boxes = tuple(
+                tuple((br + r) * cols + bc + c for r in range(boxRows) for c in range(boxCols))
+                for br in range(0, rows, boxRows) for bc in range(0, cols, boxCols))
+        else:
+            self.boxes = ()
+        self.units = self.rows + self.cols + self.boxes
+
+        unitsOf = [[] for i in range(rows * cols)]
+        for unit in self.units:
+            for cell in unit:
+                unitsOf[cell].append(unit)
+        self.unitsOf = tuple(tuple(u) for u in unitsOf)
+        self.peers = tuple(tuple(sorted(set(p for u in us for p in u) - {cell}))
+            for cell, us in enumerate(self.unitsOf))
+
+def layout(rows, cols, boxRows=0, boxCols=0):
+    """Get the Layout for a shape of grid."""
+
+    key = (rows, cols, boxRows, boxCols)
+    if key not in _layouts:
+        _layouts[key] = Layout(rows, cols, boxRows, boxCols)
+    return _layouts[key]
+
+class Grid:
+    """
+    Rows and columns of small values, with a set of candidates per cell.
+
+    Cells are addressed by index (row * cols + col) and hold 0 when empty
+    or a value from 1 to values. Candidates are bitmasks with bit v - 1 set
+    when v is still possible. Boxes are only present when a box shape is
+    given, as in Sudoku.
+
+    Values and candidates live in a bytearray and an array, so a grid costs
+    a few bytes per cell. snapshot is cheap, sharing the storage until
+    either grid is next changed, which suits saving state when backtracking.
+
+    """
+
+    __slots__ = ("rows", "cols", "values", "boxRows", "boxCols", "layout",
+        "_cells", "_candidates", "_shared")
+
+    def __init__(self, rows, cols, values, boxRows=0, boxCols=0, cells=None, candidates=None):
+        if not 0 < values <= 64:
+            raise ValueError("Grids hold from 1 to 64 values.")
+        self.rows = rows
+        self.cols = cols
+        self.values = values
+        self.boxRows = boxRows
+        self.boxCols = boxCols
+        self.layout = layout(rows, cols, boxRows, boxCols)
+        self._cells = bytearray(cells) if cells != None else bytearray(rows * cols)
+        if len(self._cells) != rows * cols:
+            raise ValueError("Wrong number of cells for the grid.")
+        if candidates != None:
+            self._candidates = array.array("Q", candidates)
+        else:
+            full = self.full()
+            self._candidates = array.array("Q",
+                (full if v == 0 else 1 << (v - 1) for v in self._cells))
+        self._shared = False
+
+    @classmethod
+    def fromRows(cls, rows, values, boxRows=0, boxCols=0):
+        """Make a grid from a list of lists of values."""
+
+        return cls(len(rows), len(rows[0]) if rows else 0, values, boxRows, boxCols,
+            [v for row in rows for v in row])
+
+    def full(self):
+        """Get the candidate mask with every value possible."""
+
+        return (1 << self.values) - 1
+
+    def index(self, row, col):
+        return row * self.cols + col
+
+    def __len__(self):
+        return len(self._cells)
+
+    def __getitem__(self, cell):
+        return self._cells[cell]
+
+    def __setitem__(self, cell, value):
+        self.set(cell, value)
+
+    def __iter__(self):
+        return iter(self._cells)
+
+    def __eq__(self, other):
+        return (isinstance(other, Grid) and self.shape() == other.shape()
+            and self._cells == other._cells and self._candidates == other._candidates)
+
+    def shape(self):
+        return (self.rows, self.cols, self.values, self.boxRows, self.boxCols)
+
+    def set(self, cell, value):
+        """Fill a cell, or empty it with 0, resetting its candidates."""
+
+        self._own()
+        self._cells[cell] = value
+        self._candidates[cell] = self.full() if value == 0 else 1 << (value - 1)
+
+    def candidates(self, cell):
+        """Get the candidate mask of a cell."""
+
+        return self._candidates[cell]
+
+    def setCandidates(self, cell, mask):
+        self._own()
+        self._candidates[cell] = mask
+
+    def eliminate(self, cell, value):
+        """Rule out a value for a cell and return whether it was possible."""
+
+        bit = 1 << (value - 1)
+        if not self._candidates[cell] & bit:
+            return False
+        self._own()
+        self._candidates[cell] &= ~bit
+        return True
+
+    def candidateValues(self, cell):
+        """Get the values still possible for a cell, in order."""
+
+        mask = self._candidates[cell]
+        return [v for v in range(1, self.values + 1) if mask & (1 << (v - 1))]
+
+    def empty(self):
+        """Get the indexes of the empty cells."""
+
+        return [i for i, v in enumerate(self._cells) if v == 0]
+
+    def row(self, r):
+        return [self._cells[i] for i in self.layout.rows[r]]
+
+    def column(self, c):
+        return [self._cells[i] for i in self.layout.cols[c]]
+
+    def box(self, b):
+        return [self._cells[i] for i in self.layout.boxes[b]]
+
+    def snapshot(self):
+        """Get a copy of the grid, which shares storage until either changes."""
+
+        copy = Grid.__new__(Grid)
+        copy.rows, copy.cols, copy.values = self.rows, self.cols, self.values
+        copy.boxRows, copy.boxCols, copy.layout = self.boxRows, self.boxCols, self.layout
+        copy._cells = self._cells
+        copy._candidates = self._candidates
+        copy._shared = self._shared = True
+        return copy
+
+    def restore(self, snapshot):
+        """Go back to the contents of a snapshot of this grid."""
+
+        self._cells = snapshot._cells
+        self._candidates = snapshot._candidates
+        self._shared = snapshot._shared = True
+
+    def _own(self):
+        if self._shared:
+            self._cells = bytearray(self._cells)
+            self._candidates = array.array("Q", self._candidates)
+            self._shared = False
+
+    def toBytes(self, candidates=False):
+        """Get the grid as bytes, for PuzzleType.encodePuzzle."""
+
+        header = _HEADER.pack(self.rows, self.cols, self.values, self.boxRows,
+            self.boxCols, 1 if candidates else 0)
+        data = header + bytes(self._cells)
+        if candidates:
+            masks = self._candidates
+            if sys.byteorder != "little":
+                masks = array.array("Q", masks)
+                masks.byteswap()
+            data += masks.tobytes()
+        return data
+
+    @classmethod
+    def fromBytes(cls, data):
+        """Make a grid from the result of toBytes, such as in PuzzleType.decodePuzzle."""
+
+        data = memoryview(data).cast("B")
+        if len(data) < _HEADER.size:
+            raise ValueError("Grid data is truncated.")
+        rows, cols, values, boxRows, boxCols, hasCandidates = _HEADER.unpack_from(data)
+        count = rows * cols
+        end = _HEADER.size + count
+        candidates = None
+        if hasCandidates:
+            candidates = array.array("Q")
+            candidates.frombytes(data[end:end + 8 * count])
+            if sys.byteorder != "little":
+                candidates.byteswap()
+            end += 8 * count
+        if len(data) != end or (candidates != None and len(candidates) != count):
+            raise ValueError("Grid data is the wrong size.")
+        return cls(rows, cols, values, boxRows, boxCols, data[_HEADER.size:_HEADER.size + count], candidates)
+
+    def __reduce__(self):
+        return (Grid.fromBytes, (self.toBytes(True),))
+
+    def __repr__(self):
+        return "Grid(%d, %d, %d, %d, %d, %r)" % (self.rows, self.cols, self.values,
+            self.boxRows, self.boxCols, bytes(self._cells))
@@ -23,6 +23,7 @@ Contains the control panel for loading/saving puzzles etc.
 
 import tkinter
 
+from . librarybrowser import LibraryBrowser
 from . puzzlesaver import PuzzleSaver
 import solver.state
 
@@ -34,6 +35,7 @@ class ControlPanel(tkinter.Frame):
         self.grid_columnconfigure(0, weight=1)
         self.grid_columnconfigure(1, weight=1)
         self.grid_columnconfigure(2, weight=1)
+        self.grid_columnconfigure(3, weight=1)
         self.grid_rowconfigure(1, weight=1)
         self.cleanBtn = tkinter.Button(self, text="Clean", command=self.clean)
         self.cleanBtn.grid(column=0, row=0, sticky="nsew")
@@ -41,6 +43,8 @@ class ControlPanel(tkinter.Frame):
         self.saveBtn.grid(column=1, row=0, sticky="nsew")
         self.loadBtn = tkinter.Button(self, text="Load", command=self.load)
         self.loadBtn.grid(column=2, row=0, sticky="nsew")
+        self.libraryBtn = tkinter.Button(self, text="Library", command=self.browse)
+        self.libraryBtn.grid(column=3, row=0, sticky="nsew")
 
         solver.state.puzzle.onChange(self.puzzleChosen)
         solver.state.view.onChange(self.viewChanged)
@@ -56,11 +60,15 @@ class ControlPanel(tkinter.Frame):
         if solver.state.wiping.attempt():
             PuzzleSaver().load(self)
 
+    def browse(self):
+        LibraryBrowser(self)
+
     def puzzleChosen(self, puzzle):
         state = tkinter.NORMAL if puzzle != None else tkinter.DISABLED
         self.cleanBtn.configure(state=state)
         self.saveBtn.configure(state=state)
         self.loadBtn.configure(state=state)
+        self.libraryBtn.configure(state=state)
 
     def viewChanged(self, view):
         puzzle = solver.state.view.value().getPuzzle()
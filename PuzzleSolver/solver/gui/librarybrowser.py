@@ -0,0 +1,94 @@
+"""
+Window for browsing and searching the puzzle library.
+
+"""
+
+# PuzzleSolver
+# Copyright (C) 2010  Andy Gurden
+#
+#     This file is part of PuzzleSolver.
+#
+#     PuzzleSolver is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     PuzzleSolver is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with PuzzleSolver.  If not, see <http://www.gnu.org/licenses/>.
+
+import tkinter
+from tkinter import filedialog
+
+import solver.library
+import solver.state
+
+from . puzzlesaver import PuzzleSaver
+
+class LibraryBrowser(tkinter.Toplevel):
+    """Lists saved puzzles of the current type, filtered as you type."""
+
+    def __init__(self, master):
+        tkinter.Toplevel.__init__(self, master)
+        self.title("Puzzle Library")
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(1, weight=1)
+
+        self.puzzle = solver.state.puzzle.value()
+        self.library = solver.library.Library()
+        self.entries = []
+
+        self.text = tkinter.StringVar()
+        self.text.trace_add("write", lambda *_: self.refresh())
+        tkinter.Entry(self, textvariable=self.text).grid(row=0, column=0, sticky="nsew")
+        tkinter.Button(self, text="Add Folder", command=self.addFolder).grid(row=0, column=1, sticky="nsew")
+        tkinter.Button(self, text="Rescan", command=self.rescan).grid(row=0, column=2, sticky="nsew")
+
+        self.results = tkinter.Listbox(self, width=80, height=20, font="TkFixedFont")
+        self.results.grid(row=1, column=0, columnspan=3, sticky="nsew")
+        scroll = tkinter.Scrollbar(self, command=self.results.yview)
+        scroll.grid(row=1, column=3, sticky="ns")
+        self.results.config(yscrollcommand=scroll.set)
+        self.results.bind("<Double-Button-1>", self.choose)
+
+        self.protocol("WM_DELETE_WINDOW", self.close)
+        self.refresh()
+
+    def plugins(self):
+        return {info.extension: info.module
+            for info in solver.state.puzzle.allowable if info.extension != None}
+
+    def refresh(self):
+        self.entries = self.library.search(self.text.get(), plugin=self.puzzle.pluginId())
+        self.results.delete(0, tkinter.END)
+        for entry in self.entries:
+            taken = "%.3fs" % entry.bestTime if entry.bestTime != None else "-"
+            self.results.insert(tkinter.END, "%-10s %9s  %s" % (entry.status or "unsolved", taken, entry.path))
+
+    def addFolder(self):
+        folder = filedialog.askdirectory(parent=self)
+        if folder:
+            self.library.scan([folder], self.plugins())
+            self.refresh()
+
+    def rescan(self):
+        self.library.rescan(self.plugins())
+        self.refresh()
+
+    def choose(self, event):
+        if solver.state.puzzle.value() is not self.puzzle: # Type changed under us
+            self.close()
+            return
+        selected = self.results.curselection()
+        if selected and solver.state.wiping.attempt():
+            PuzzleSaver().loadFile(self.entries[selected[0]].path)
+
+    def close(self):
+        if self.library != None:
+            self.library.close()
+            self.library = None
+            self.destroy()
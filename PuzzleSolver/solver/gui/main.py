@@ -24,6 +24,8 @@ Contains the main window for the puzzle solver.
 import tkinter
 
 import solver.plugin
+import solver.pool
+import solver.registry
 import solver.state
 
 from . controlpanel import ControlPanel
@@ -32,6 +34,7 @@ from . modechoice import ModeChoice
 from . solverbutton import SolverButton
 from . viewframe import ViewFrame
 from . puzzlesaver import PuzzleSaver
+from . watchdog import Watchdog
 
 class SolverGUI(tkinter.Frame):
     """Main window for the puzzle solver."""
@@ -57,10 +60,14 @@ class SolverGUI(tkinter.Frame):
         vw.grid(sticky="nsew", row=1, column=1, columnspan=2)
 
 
-def start_gui(pluginmodule):
-    solver.state.puzzle.allowable = solver.plugin.load_plugins(pluginmodule)
-    solver.state.puzzle.allowable = [P() for P in solver.state.puzzle.allowable for i in range(10)]
-    solver.state.puzzle.allowable += [None]
+def start_gui(pluginmodule, watchdog=False):
+    catalogue = solver.registry.Catalogue(solver.registry.discover(pluginmodule))
+    solver.state.puzzle.allowable = catalogue
+
+    # Warm up solver processes with the framework imported, and each plugin
+    # once it is chosen, while the user is still setting up a puzzle
+    workers = solver.pool.start(["solver.plugin"])
+    solver.state.puzzle.onChange(lambda p: p != None and workers.warm([p.pluginId()]))
 
     APP_TITLE = "Puzzle Solver"
 
@@ -79,5 +86,14 @@ def start_gui(pluginmodule):
     root.protocol("WM_DELETE_WINDOW", solver.state.quitting.attempt)
     appwin = SolverGUI(root)
     appwin.pack(expand=True, fill=tkinter.BOTH)
+
+    if watchdog:
+        dog = Watchdog(root)
+        dog.start()
+        solver.state.quitting.onChange(lambda _: dog.stop(), priority=-1)
+
     appwin.mainloop()
+    solver.plugin.reap_all()
+    if watchdog:
+        dog.report()
 #    root.destroy()
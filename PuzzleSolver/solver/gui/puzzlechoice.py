@@ -36,20 +36,22 @@ class PuzzleChoice(tkinter.Frame):
         self.grid_rowconfigure(1, weight=1)
         tkinter.Label(self, text="Choose a puzzle type:").grid(row=0, sticky="new")
 
+        # Buttons only need the plugin info, puzzle types are made when chosen
+        self.catalogue = solver.state.puzzle.allowable
         self.selector = ButtonSelector(self, vertical=True, selected=self.changePuzzle)
-        for plugin in solver.state.puzzle.allowable:
-            if plugin != None:
-                self.selector.add(plugin.name(), plugin)
+        for info in self.catalogue:
+            self.selector.add(info.name, info)
         self.selector.grid(row=1, sticky="nsew")
 
         solver.state.puzzle.onChange(self.setSelected)
 
-    def changePuzzle(self, puzzle):
-        if solver.state.puzzle.change(None):
-            solver.state.mode.change("CREATE")
-            solver.state.puzzle.change(puzzle)
-        else:
-            self.selector.selection(solver.state.puzzle.value())
+    def changePuzzle(self, info):
+        with solver.state.transaction():
+            if solver.state.puzzle.change(None):
+                solver.state.mode.change("CREATE")
+                solver.state.puzzle.change(self.catalogue.get(info))
+                return
+        self.setSelected(solver.state.puzzle.value())
 
     def setSelected(self, puzzle):
-        self.selector.selection(puzzle)
+        self.selector.selection(self.catalogue.info(puzzle))
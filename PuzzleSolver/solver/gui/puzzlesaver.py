@@ -21,6 +21,8 @@ Dialogs and such for dumping and retriving puzzles to HDD.
 #     You should have received a copy of the GNU General Public License
 #     along with PuzzleSolver.  If not, see <http://www.gnu.org/licenses/>.
 
+import solver.library
+import solver.saveformat
 import solver.state
 
 import pickle
@@ -64,15 +66,15 @@ class PuzzleSaver:
             filename += ext
 
         try:
-            with open(filename, "wb") as file:
-                pickle.dump(puzzle, file)
-        except pickle.PickleError:
+            solver.saveformat.write(filename, solver.state.puzzle.value(), puzzle)
+        except (pickle.PickleError, solver.saveformat.SaveFormatError):
             messagebox.showwarning("Whoops", "Could not convert this puzzle to a saveable form.")
             return False
         except IOError:
             messagebox.showwarning("Whoops", "Could not write this puzzle to file.")
             return False
         self.view.saved()
+        solver.library.saved(filename, solver.state.puzzle.value().pluginId())
         messagebox.showinfo("Finished", "Puzzle written successfully.")
         return True
 
@@ -89,11 +91,12 @@ class PuzzleSaver:
             return False
         if not filename.endswith(ext):
             filename += ext
+        return self.loadFile(filename)
 
+    def loadFile(self, filename):
         try:
-            with open(filename, "rb") as file:
-                puzzle = pickle.load(file)
-        except pickle.PickleError:
+            puzzle = solver.saveformat.read(filename, solver.state.puzzle.value())
+        except solver.saveformat.SaveFormatError:
             messagebox.showwarning("Whoops", "The file was corrupted or of an unreadable format.")
             return False
         except IOError:
@@ -22,21 +22,39 @@ Contains the solver button code.
 #     along with PuzzleSolver.  If not, see <http://www.gnu.org/licenses/>.
 
 import tkinter
-from tkinter import messagebox
 
+import solver.portfolio
 import solver.state
 
 class SolverButton(tkinter.Frame):
     """Solver button widget."""
 
+    REFRESH_MS = 250 # How often to show the solver's status while it runs
+
+    # Profiling choices shown for solver.state.profile
+    PROFILES = (("No profiling", None), ("Profile spans", "spans"),
+        ("Profile with cProfile", "cprofile"), ("Profile by sampling", "sample"))
+
     def __init__(self, master):
         tkinter.Frame.__init__(self, master)
         self.grid_columnconfigure(0, weight=1)
         self.grid_rowconfigure(0, weight=1)
 
         self.selected = False
+        self.refreshing = None
+        self.stopping = None # Solver still winding down after being stopped
         self.btn = tkinter.Button(self, text="Solve", command=self.toggle)
         self.btn.grid(sticky="nsew")
+        self.info = tkinter.Label(self)
+        self.info.grid(row=1, sticky="nsew")
+        self.profile = tkinter.StringVar()
+        self.profileChanged(solver.state.profile.value())
+        self.profileMenu = tkinter.OptionMenu(self, self.profile,
+            *(label for label, mode in self.PROFILES), command=self.chooseProfile)
+        self.profileMenu.grid(row=2, sticky="nsew")
+        self.racing = tkinter.BooleanVar(value=solver.state.racing.value())
+        tkinter.Checkbutton(self, text="Race strategies", variable=self.racing,
+            command=self.chooseRacing).grid(row=3, sticky="nsw")
 
         self.pressed(solver.state.solving.value() != None)
 
@@ -44,10 +62,12 @@ class SolverButton(tkinter.Frame):
         solver.state.solving.onChange(self.solvingChanged)
         solver.state.solving.vitoChange(self.vitoSolving)
         solver.state.wiping.vitoChange(self.vitoWipe)
+        solver.state.profile.onChange(self.profileChanged)
+        solver.state.racing.onChange(self.racing.set)
 
     def toggle(self):
         cur = solver.state.solving.value()
-        solver.state.solving.change(solver.state.view.value().getSolver() if cur == None else None)
+        solver.state.solving.change(solver.portfolio.choose(solver.state.view.value()) if cur == None else None)
 
     def pressed(self, selected):
         if selected == self.selected:
@@ -65,20 +85,51 @@ class SolverButton(tkinter.Frame):
     def solvingChanged(self, solving):
         self.pressed(solving != None)
         if solving != None:
+            self.info.config(text="")
+            self.stopping = None
             solving.start()
+            if self.refreshing != None:
+                self.after_cancel(self.refreshing)
+            self.refreshing = self.after(self.REFRESH_MS, self.refresh)
+
+    def refresh(self):
+        self.refreshing = None
+        shown = solver.state.solving.value() or self.stopping
+        if shown == None:
+            return
+        self.info.config(text=shown.status() or "")
+        if shown is self.stopping and not shown.busy():
+            self.stopping = None
+        else:
+            self.refreshing = self.after(self.REFRESH_MS, self.refresh)
 
     def vitoSolving(self, solving):
         old = solver.state.solving.value()
         if solving == old:
             return False
         if solving == None and old != None:
-            # Cancelling a solve
-            worked = old.stop()
-            if not worked:
-                messagebox.showinfo("Whoops", "Sorry, the solving process could not be interrupted.")
-            return not worked
+            # Cancelling a solve, which never waits so the status shows how it goes
+            if not old.stop():
+                return True
+            self.info.config(text=old.status() or "")
+            if old.busy():
+                self.stopping = old
+                if self.refreshing == None:
+                    self.refreshing = self.after(self.REFRESH_MS, self.refresh)
+            return False
         else:
             return False
 
+    def chooseProfile(self, label):
+        if not solver.state.profile.change(dict(self.PROFILES)[label]):
+            self.profileChanged(solver.state.profile.value())
+
+    def profileChanged(self, mode):
+        self.profile.set(next(label for label, m in self.PROFILES if m == mode))
+
+    def chooseRacing(self):
+        if not solver.state.racing.change(self.racing.get()):
+            self.racing.set(solver.state.racing.value())
+
     def vitoWipe(self, _):
         return not solver.state.solving.change(None)
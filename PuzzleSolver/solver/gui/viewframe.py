@@ -36,7 +36,10 @@ class ViewFrame(tkinter.Frame):
         self.grid_columnconfigure(0, weight=1)
 
         self.content = None
+        self.contentView = None
+        self.frames = {} # Frames for views still in solver.state.views
 
+        solver.state.views.onEvict(self.onViewEvicted)
         solver.state.view.onChange(self.onViewChange)
         solver.state.puzzle.change(None)
 
@@ -45,10 +48,13 @@ class ViewFrame(tkinter.Frame):
         solver.state.quitting.vitoChange(self.vitoQuitting)
         solver.state.wiping.vitoChange(self.vitoWiping)
 
-    def setContent(self, frame):
+    def setContent(self, frame, view=None):
         if self.content != None:
             self.content.grid_forget()
+            if self.contentView not in self.frames:
+                self.content.destroy()
         self.content = frame
+        self.contentView = view
         self.content.grid(sticky="nsew")
 
     def vitoPuzzleOrModeChange(self, _):
@@ -61,8 +67,17 @@ class ViewFrame(tkinter.Frame):
         return not PuzzleSaver().check(self)
 
     def onViewChange(self, view):
-        frame = (
-            tkinter.Label(self, text="No puzzle type is currently selected.")
-            if view == None else view.getFrame(self))
-        self.setContent(frame)
+        frame = self.frames.get(view)
+        if frame == None:
+            frame = (
+                tkinter.Label(self, text="No puzzle type is currently selected.")
+                if view == None else view.getFrame(self))
+            if view in solver.state.views.values():
+                self.frames[view] = frame
+        self.setContent(frame, view)
+
+    def onViewEvicted(self, key, view):
+        frame = self.frames.pop(view, None)
+        if frame != None and frame is not self.content:
+            frame.destroy()
 
@@ -0,0 +1,139 @@
+"""
+Watches how long the Tk event loop is kept busy.
+
+A tick is scheduled with after every INTERVAL_MS and the time it fires
+late is recorded, so anything that blocks the loop shows up, whatever it
+is. Every change callback of a WatchedValue is timed too, so the slowest
+ones can be named. Times include any further changes a callback makes.
+
+Percentiles of the stalls and the slowest callbacks are shown in a small
+overlay in the corner of the window, and written to stderr on exit.
+
+"""
+
+# PuzzleSolver
+# Copyright (C) 2010  Andy Gurden
+#
+#     This file is part of PuzzleSolver.
+#
+#     PuzzleSolver is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     PuzzleSolver is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with PuzzleSolver.  If not, see <http://www.gnu.org/licenses/>.
+
+import collections
+import sys
+import time
+import tkinter
+
+import solver.state
+import solver.telemetry
+
+def callback_name(callback):
+    """Get a readable name for a callback, such as module.Class.method."""
+
+    name = getattr(callback, "__qualname__", None)
+    if name == None:
+        return repr(callback)
+    module = getattr(callback, "__module__", None)
+    return name if module == None else module + "." + name
+
+class Watchdog:
+    """Measures stalls of the event loop of widget's Tk."""
+
+    INTERVAL_MS = 50 # Between ticks
+    SAMPLES = 4000 # Most recent tick delays kept
+    SLOWEST = 5 # Callbacks named in the overlay
+    OVERLAY_MS = 1000 # How often the overlay is refreshed
+
+    def __init__(self, widget, overlay=True):
+        self.widget = widget
+        self.delays = collections.deque(maxlen=self.SAMPLES)
+        self.callbacks = {} # Name to [calls, total seconds, worst seconds]
+        self.label = tkinter.Label(widget, justify=tkinter.LEFT, anchor="w",
+            font="TkFixedFont", bg="black", fg="yellow") if overlay else None
+        self._due = None
+        self._job = None
+        self._refreshed = 0
+
+    def start(self):
+        solver.state.timer = self.timed
+        if self.label != None:
+            self.label.place(relx=1, rely=1, anchor="se")
+        self._schedule()
+
+    def stop(self):
+        if solver.state.timer == self.timed:
+            solver.state.timer = None
+        if self._job != None:
+            try:
+                self.widget.after_cancel(self._job)
+            except tkinter.TclError: # Already destroyed
+                pass
+            self._job = None
+
+    def _schedule(self):
+        self._due = time.perf_counter() + self.INTERVAL_MS / 1000
+        self._job = self.widget.after(self.INTERVAL_MS, self._tick)
+
+    def _tick(self):
+        now = time.perf_counter()
+        self.delays.append(max(0, now - self._due))
+        if self.label != None and now - self._refreshed >= self.OVERLAY_MS / 1000:
+            self._refreshed = now
+            self.label.config(text=self.summary())
+        self._schedule()
+
+    def timed(self, callback, seconds):
+        """Record a change callback taking seconds, for solver.state.timer."""
+
+        entry = self.callbacks.setdefault(callback_name(callback), [0, 0.0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+        entry[2] = max(entry[2], seconds)
+
+    def stalls(self):
+        """Get the (p50, p99, worst) seconds ticks were late, or None with no ticks yet."""
+
+        delays = sorted(self.delays)
+        if not delays:
+            return None
+        return (solver.telemetry.percentile(delays, 50),
+            solver.telemetry.percentile(delays, 99), delays[-1])
+
+    def slowest(self, n=None):
+        """Get [(name, calls, total, worst)] for callbacks, worst first."""
+
+        found = sorted(((name, calls, total, worst)
+            for name, (calls, total, worst) in self.callbacks.items()),
+            key=lambda c: c[3], reverse=True)
+        return found if n == None else found[:n]
+
+    def summary(self, n=SLOWEST):
+        stalls = self.stalls()
+        lines = ["UI stall p50 %.0fms p99 %.0fms worst %.0fms" % tuple(1000 * s for s in stalls)
+            if stalls != None else "UI stall -"]
+        lines.extend("%6.0fms %s" % (1000 * worst, name)
+            for name, calls, total, worst in self.slowest(n))
+        return "\n".join(lines)
+
+    def report(self, out=sys.stderr):
+        """Write the stalls and every timed callback to out."""
+
+        stalls = self.stalls()
+        if stalls == None:
+            print("Watchdog: no ticks recorded.", file=out)
+        else:
+            print("Watchdog: %d ticks, late by p50 %.1fms p99 %.1fms worst %.1fms" %
+                ((len(self.delays),) + tuple(1000 * s for s in stalls)), file=out)
+        for name, calls, total, worst in self.slowest():
+            print("  %8.1fms worst %8.1fms total %6d calls  %s" %
+                (1000 * worst, 1000 * total, calls, name), file=out)
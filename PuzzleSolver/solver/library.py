@@ -0,0 +1,246 @@
+"""
+Index of saved puzzles on disk.
+
+Keeps a small SQLite database of saved puzzle files with the plugin that
+saved them, their size, a hash of their contents and how solving them has
+gone, so they can be browsed and searched without opening each one. Files
+are only re-read when their size or modification time changes.
+
+"""
+
+# PuzzleSolver
+# Copyright (C) 2010  Andy Gurden
+#
+#     This file is part of PuzzleSolver.
+#
+#     PuzzleSolver is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     PuzzleSolver is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with PuzzleSolver.  If not, see <http://www.gnu.org/licenses/>.
+
+import glob
+import hashlib
+import logging
+import os
+import sqlite3
+
+from . import saveformat
+from .utility import paths
+
+LIBRARY_NAME = "library.sqlite"
+
+log = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS puzzles (
+    path TEXT PRIMARY KEY,
+    plugin TEXT,
+    size INTEGER NOT NULL,
+    mtime INTEGER NOT NULL,
+    hash TEXT NOT NULL, -- From file_hash
+    content TEXT, -- From saveformat.content_hash, NULL for legacy pickles
+    status TEXT,
+    best_time REAL
+);
+CREATE INDEX IF NOT EXISTS puzzles_plugin ON puzzles (plugin);
+CREATE INDEX IF NOT EXISTS puzzles_hash ON puzzles (hash);
+CREATE INDEX IF NOT EXISTS puzzles_content ON puzzles (content);
+CREATE TABLE IF NOT EXISTS roots (
+    path TEXT PRIMARY KEY
+);
+"""
+
+def find_files(paths):
+    """Expand the given directories and globs into a sorted list of files."""
+
+    files = set()
+    for path in paths:
+        if os.path.isdir(path):
+            for dirpath, dirnames, filenames in os.walk(path):
+                files.update(os.path.join(dirpath, f) for f in filenames)
+        else:
+            files.update(f for f in glob.glob(path, recursive=True) if os.path.isfile(f))
+    return sorted(files)
+
+def file_hash(filename):
+    """
+    Get a hash of a file's raw bytes, to tell whether it has changed.
+
+    This differs for the same puzzle saved with different compression, so
+    it cannot be matched with saveformat.content_hash, the hash of the
+    puzzle itself used by telemetry and checkpoints.
+
+    """
+
+    h = hashlib.sha256()
+    with open(filename, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+class Entry:
+    """One saved puzzle in the library."""
+
+    def __init__(self, path, plugin, size, mtime, file_hash, content_hash, status, best_time):
+        self.path = path
+        self.plugin = plugin
+        self.size = size
+        self.mtime = mtime
+        self.fileHash = file_hash
+        self.contentHash = content_hash
+        self.status = status
+        self.bestTime = best_time
+
+class Library:
+    """Index of saved puzzles, stored in filename or the user's data directory."""
+
+    def __init__(self, filename=None):
+        self.db = sqlite3.connect(filename or paths.data_file(LIBRARY_NAME))
+        self.db.executescript(_SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def index(self, files, plugins):
+        """
+        Bring the entries for files up to date and return how many changed.
+
+        plugins maps file extensions to plugin ids. Files with other
+        extensions are ignored, and the plugin id is taken from the file
+        header when there is one.
+
+        """
+
+        changed = 0
+        with self.db:
+            for filename in files:
+                ext = os.path.splitext(filename)[1]
+                if ext not in plugins:
+                    continue
+                filename = os.path.abspath(filename)
+                try:
+                    stat = os.stat(filename)
+                    row = self.db.execute("SELECT size, mtime, hash FROM puzzles WHERE path = ?",
+                        (filename,)).fetchone()
+                    if row != None and row[:2] == (stat.st_size, stat.st_mtime_ns):
+                        continue
+                    h = file_hash(filename)
+                    try:
+                        header = saveformat.read_header(filename)
+                        plugin = header.plugin if header != None else plugins[ext]
+                        content = saveformat.file_content_hash(filename)
+                    except saveformat.SaveFormatError:
+                        plugin = content = None
+                except IOError:
+                    continue
+
+                if row != None and row[2] == h: # Touched but not changed
+                    self.db.execute("UPDATE puzzles SET size = ?, mtime = ? WHERE path = ?",
+                        (stat.st_size, stat.st_mtime_ns, filename))
+                else:
+                    self.db.execute("INSERT OR REPLACE INTO puzzles "
+                        "(path, plugin, size, mtime, hash, content, status, best_time) "
+                        "VALUES (?, ?, ?, ?, ?, ?, NULL, NULL)",
+                        (filename, plugin, stat.st_size, stat.st_mtime_ns, h, content))
+                    changed += 1
+        return changed
+
+    def scan(self, roots, plugins):
+        """
+        Index everything under the given directories and globs, and drop
+        entries for files under them that no longer exist.
+
+        The roots are remembered for rescan. Returns (changed, removed).
+
+        """
+
+        with self.db:
+            for root in roots:
+                self.db.execute("INSERT OR IGNORE INTO roots (path) VALUES (?)",
+                    (os.path.abspath(root),))
+        changed = self.index(find_files(roots), plugins)
+
+        removed = 0
+        with self.db:
+            for root in roots:
+                root = os.path.abspath(root)
+                if not os.path.isdir(root):
+                    continue
+                prefix = os.path.join(root, "")
+                for (path,) in self.db.execute("SELECT path FROM puzzles WHERE substr(path, 1, ?) = ?",
+                        (len(prefix), prefix)).fetchall():
+                    if not os.path.exists(path):
+                        self.db.execute("DELETE FROM puzzles WHERE path = ?", (path,))
+                        removed += 1
+        return changed, removed
+
+    def rescan(self, plugins):
+        """Scan all remembered roots again."""
+
+        roots = [path for (path,) in self.db.execute("SELECT path FROM roots")]
+        return self.scan(roots, plugins)
+
+    def record(self, filename, outcome, seconds):
+        """Record the outcome of solving an indexed file, keeping the best time."""
+
+        self._record("path", os.path.abspath(filename), outcome, seconds)
+
+    def recordContent(self, content, outcome, seconds):
+        """Record the outcome of solving a puzzle, by content hash, for every file holding it."""
+
+        self._record("content", content, outcome, seconds)
+
+    def _record(self, column, key, outcome, seconds):
+        with self.db:
+            self.db.execute("UPDATE puzzles SET status = ?, best_time = CASE "
+                "WHEN ? != 'solved' THEN best_time "
+                "WHEN best_time IS NULL OR ? < best_time THEN ? "
+                "ELSE best_time END WHERE " + column + " = ?",
+                (outcome, outcome, seconds, seconds, key))
+
+    def search(self, text="", plugin=None, status=None, limit=500):
+        """Find entries whose path contains text, optionally of a plugin or status."""
+
+        query = ("SELECT path, plugin, size, mtime, hash, content, status, best_time FROM puzzles "
+            "WHERE path LIKE ? ESCAPE '\\'")
+        args = ["%" + text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"]
+        if plugin != None:
+            query += " AND plugin = ?"
+            args.append(plugin)
+        if status != None:
+            query += " AND status = ?"
+            args.append(status)
+        query += " ORDER BY path LIMIT ?"
+        args.append(limit)
+        return [Entry(*row) for row in self.db.execute(query, args)]
+
+def _update(change, *args):
+    """Apply a change to the user's library, which the GUI can carry on without."""
+
+    try:
+        lib = Library()
+        try:
+            change(lib, *args)
+        finally:
+            lib.close()
+    except (sqlite3.Error, OSError):
+        log.warning("Could not update the puzzle library", exc_info=True)
+
+def saved(filename, plugin):
+    """Index a file the GUI has just saved a puzzle of plugin's to."""
+
+    _update(Library.index, [filename], {os.path.splitext(filename)[1]: plugin})
+
+def solved(entry):
+    """Record a telemetry entry's solve for every indexed file holding its puzzle."""
+
+    if entry.get("hash") != None:
+        _update(Library.recordContent, entry["hash"], entry["outcome"], entry["wall"])
@@ -0,0 +1,365 @@
+"""
+Search a puzzle's tree across several processes at once.
+
+A plugin describes its search as a SearchProblem. The tree is expanded
+down to a split depth and the subtrees are shared out to worker processes
+through a queue. Workers that run out ask for more, and busy workers answer
+by handing over the shallowest branches still left on their stacks. The
+search stops everywhere once a solution is found, or in counting mode adds
+up the solutions found by each worker.
+
+Problems that reach the same state by different paths can give states a
+key, and each worker then skips states it has already explored, using a
+transposition.TranspositionTable.
+
+"""
+
+# PuzzleSolver
+# Copyright (C) 2010  Andy Gurden
+#
+#     This file is part of PuzzleSolver.
+#
+#     PuzzleSolver is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     PuzzleSolver is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with PuzzleSolver.  If not, see <http://www.gnu.org/licenses/>.
+
+import abc
+import os
+import queue
+import signal
+import threading
+import traceback
+
+from . import pool
+from . import progress
+from . import transposition
+from .plugin import PooledSolver
+from .progress import NODES, DEPTH, BEST
+
+# Nodes a worker visits between checking whether others are waiting for work
+SHARE_EVERY = 256
+
+# Subtrees to make per worker when splitting without a fixed depth
+SUBTREES_PER_WORKER = 8
+
+# Shared counters for each worker: nodes, solutions, then the table's STATS
+_NODES, _SOLUTIONS, _TABLE = 0, 1, 2
+_STRIDE = _TABLE + len(transposition.STATS)
+
+class SearchError(Exception):
+    """The search failed inside a worker, the message holds the traceback."""
+
+class SearchProblem(metaclass=abc.ABCMeta):
+    """
+    A search tree to explore. It and its states must be picklable.
+
+    States are explored depth first, so children should be given most
+    promising first.
+
+    """
+
+    @abc.abstractmethod
+    def root(self):
+        """Get the state at the top of the tree."""
+
+    @abc.abstractmethod
+    def children(self, state):
+        """Get the states reachable from state."""
+
+    @abc.abstractmethod
+    def isGoal(self, state):
+        """Is the state a solution."""
+
+    def solution(self, state):
+        """Get what should be returned for a goal state."""
+
+        return state
+
+    def key(self, state):
+        """
+        Get a 64 bit key for state, such as a transposition.Zobrist hash, or
+        None to always explore it.
+
+        States with the same key are taken to be the same, and are only
+        explored once by each worker when searching with a table.
+
+        """
+
+        return None
+
+class ParallelSearch:
+    """
+    Runs a SearchProblem in worker processes.
+
+    With depth the tree is split into every subtree at that depth, or
+    otherwise just deep enough to give each worker several subtrees.
+
+    With table each worker remembers the keys of explored states in a
+    transposition table of that many bytes. Counting must explore every
+    path, so cannot use one.
+
+    """
+
+    def __init__(self, problem, workers=None, depth=None, countAll=False, table=None):
+        if table and countAll:
+            raise ValueError("Counting solutions cannot skip repeated states.")
+        self.problem = problem
+        self.workers = workers if workers else (os.cpu_count() or 1)
+        self.depth = depth
+        self.countAll = countAll
+        self.table = table
+
+    def split(self):
+        """
+        Expand the tree breadth first into subtrees to share out.
+
+        Returns (subtrees, goals, depth) where goals are the goal states met
+        on the way and depth is how far down the subtrees start.
+
+        """
+
+        target = self.workers * SUBTREES_PER_WORKER
+        frontier = [self.problem.root()]
+        goals = []
+        depth = 0
+        while frontier and (depth < self.depth if self.depth != None else len(frontier) < target):
+            expanded = []
+            for state in frontier:
+                if self.problem.isGoal(state):
+                    goals.append(state)
+                else:
+                    expanded.extend(self.problem.children(state))
+            frontier = expanded
+            depth += 1
+            if goals and not self.countAll:
+                break
+        return frontier, goals, depth
+
+    def run(self, context=None):
+        """
+        Search for the first solution, or the number of solutions if counting.
+
+        Returns None if nothing was found or context (a SolveContext) was
+        cancelled first.
+
+        """
+
+        frontier, goals, depth = self.split()
+        if goals and not self.countAll:
+            return self.problem.solution(goals[0])
+        if not frontier:
+            return len(goals) if self.countAll else None
+
+        ctx = pool.context()
+        tasks = ctx.Queue()
+        results = ctx.Queue()
+        stop = ctx.RawValue("b", 0)
+        hungry = ctx.Value("i", 0)
+        pending = ctx.Value("i", len(frontier))
+        counters = ctx.RawArray("q", _STRIDE * self.workers)
+        for state in frontier:
+            tasks.put(state)
+
+        procs = [ctx.Process(target=_explore, args=(self.problem, self.countAll, self.table, i,
+                    tasks, results, stop, hungry, pending, counters), daemon=True)
+                 for i in range(self.workers)]
+        previous = self._killWith(procs)
+        for proc in procs:
+            proc.start()
+
+        found = None
+        count = len(goals)
+        failure = None
+        finished = 0
+        try:
+            while finished < len(procs):
+                try:
+                    message = results.get(timeout=0.1)
+                except queue.Empty:
+                    if context != None and context.cancelled():
+                        stop.value = 1
+                    if not any(p.is_alive() for p in procs) and results.empty():
+                        break # Workers died without reporting
+                    self._report(context, counters, depth)
+                    continue
+                kind, value = message
+                if kind == "solution":
+                    if found == None:
+                        found = value
+                    stop.value = 1
+                elif kind == "failed":
+                    failure = value
+                    stop.value = 1
+                    finished += 1
+                else:
+                    count += value
+                    finished += 1
+        finally:
+            stop.value = 1
+            tasks.cancel_join_thread()
+            for proc in procs:
+                proc.join(1)
+                if proc.is_alive():
+                    proc.terminate()
+                    proc.join()
+            self._report(context, counters, depth)
+            tasks.close()
+            results.close()
+            if previous != None:
+                signal.signal(signal.SIGTERM, previous)
+
+        if failure != None:
+            raise SearchError(failure)
+        if context != None and context.cancelled():
+            return None
+        return count if self.countAll else found
+
+    def _killWith(self, procs):
+        """
+        Make sure procs die with this process if it is terminated, as when a
+        pool worker is killed for not stopping in time.
+
+        Returns the SIGTERM handler to put back, or None if it was not changed.
+
+        """
+
+        if threading.current_thread() is not threading.main_thread():
+            return None
+        owner = os.getpid()
+        def terminated(signum, frame):
+            if os.getpid() == owner: # Forked workers have this handler too
+                for proc in procs:
+                    if proc.pid != None:
+                        proc.terminate()
+                for proc in procs:
+                    if proc.pid != None:
+                        proc.join(1)
+                        if proc.is_alive():
+                            proc.kill()
+                            proc.join()
+            signal.signal(signum, signal.SIG_DFL)
+            os.kill(os.getpid(), signum)
+        previous = signal.signal(signal.SIGTERM, terminated)
+        return signal.SIG_DFL if previous == None else previous
+
+    def _report(self, context, counters, depth):
+        if context != None:
+            values = context.progress.values
+            values[NODES] = sum(counters[_NODES::_STRIDE])
+            values[DEPTH] = depth
+            values[BEST] = sum(counters[_SOLUTIONS::_STRIDE])
+            if self.table and transposition.STATS[0] in context.progress.fields:
+                transposition.report(context.progress, [sum(counters[_TABLE + i::_STRIDE])
+                    for i in range(len(transposition.STATS))])
+
+def _explore(problem, countAll, table, index, tasks, results, stop, hungry, pending, counters):
+    """Main loop for a search worker."""
+
+    tasks.cancel_join_thread() # Leftover shared branches must not block exit
+    table = transposition.TranspositionTable(table) if table else None
+    base = _STRIDE * index
+    count = 0
+    waiting = False
+    try:
+        while not stop.value:
+            try:
+                stack = [tasks.get(timeout=0.05)]
+            except queue.Empty:
+                if pending.value == 0:
+                    break
+                if not waiting:
+                    waiting = True
+                    with hungry.get_lock():
+                        hungry.value += 1
+                continue
+            if waiting:
+                waiting = False
+                with hungry.get_lock():
+                    hungry.value -= 1
+
+            visited = 0
+            while stack and not stop.value:
+                state = stack.pop()
+                visited += 1
+                if table != None:
+                    key = problem.key(state)
+                    if key != None and table.visit(key):
+                        continue
+                if problem.isGoal(state):
+                    count += 1
+                    counters[base + _SOLUTIONS] = count
+                    if not countAll:
+                        results.put(("solution", problem.solution(state)))
+                        stop.value = 1
+                        break
+                    continue
+                children = list(problem.children(state))
+                children.reverse()
+                stack.extend(children)
+
+                if visited % SHARE_EVERY == 0:
+                    counters[base + _NODES] += SHARE_EVERY
+                    if table != None:
+                        counters[base + _TABLE:base + _STRIDE] = table.stats()
+                    wanted = hungry.value
+                    if wanted > 0 and len(stack) > 1:
+                        # The bottom of the stack holds the biggest subtrees
+                        shared = stack[:min(wanted, len(stack) - 1)]
+                        del stack[:len(shared)]
+                        with pending.get_lock():
+                            pending.value += len(shared)
+                        for branch in shared:
+                            tasks.put(branch)
+            counters[base + _NODES] += visited % SHARE_EVERY
+            if table != None:
+                counters[base + _TABLE:base + _STRIDE] = table.stats()
+            with pending.get_lock():
+                pending.value -= 1
+    except Exception:
+        stop.value = 1
+        results.put(("failed", traceback.format_exc()))
+        return
+    finally:
+        if waiting:
+            with hungry.get_lock():
+                hungry.value -= 1
+    results.put(("done", count))
+
+class ParallelSolver(PooledSolver):
+    """
+    PooledSolver whose task runs a ParallelSearch from the pool worker.
+
+    Subclasses give the SearchProblem through problem, and receive the
+    first solution (or count) through solved as usual. Setting table to a
+    size in bytes searches with transposition tables, whose statistics are
+    then shown in the status.
+
+    """
+
+    workers = None
+    depth = None
+    countAll = False
+    table = None
+
+    @property
+    def fields(self):
+        return transposition.FIELDS if self.table else progress.FIELDS
+
+    @abc.abstractmethod
+    def problem(self):
+        """Get the SearchProblem to solve."""
+
+    def task(self):
+        return _search, (self.problem(), self.workers, self.depth, self.countAll, self.table)
+
+def _search(context, problem, workers, depth, countAll, table=None):
+    return ParallelSearch(problem, workers, depth, countAll, table).run(context)
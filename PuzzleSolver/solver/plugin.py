@@ -22,9 +22,18 @@ Various base classes for plugins.
 #     along with PuzzleSolver.  If not, see <http://www.gnu.org/licenses/>.
 
 import abc
+import multiprocessing
 import os
+import time
 import tkinter
 
+from . import checkpoint
+from . import library
+from . import pool
+from . import profiling
+from . import progress
+from . import telemetry
+
 class PuzzleType(metaclass=abc.ABCMeta):
     """Entire plugin."""
 
@@ -36,6 +45,50 @@ class PuzzleType(metaclass=abc.ABCMeta):
     def get(self, mode):
         """Get the a new puzzle pane for the given mode."""
 
+    def extension(self):
+        """
+        Get either the file extension used to save puzzles of this type, or None.
+
+        This should match getExtension on the views, but is available without
+        a GUI so saved puzzles can be matched to their plugin.
+
+        """
+
+        return None
+
+    def solvePuzzle(self, puzzle, context=None):
+        """
+        Solve a loaded puzzle object without a GUI.
+
+        Returns the solved puzzle, or None if there is no solution. Plugins
+        that cannot solve without a GUI should leave this unimplemented.
+        If a SolveContext is given its progress counters should be kept up
+        to date, as for a PooledSolver task.
+
+        """
+
+        raise NotImplementedError
+
+    def pluginId(self):
+        """Get the id written into saved files, the plugin's module name."""
+
+        return type(self).__module__
+
+    def encodePuzzle(self, puzzle):
+        """Get a compact bytes form of the puzzle for saving, or None to pickle it."""
+
+        return None
+
+    def decodePuzzle(self, data):
+        """
+        Rebuild a puzzle from the bytes given by encodePuzzle.
+
+        data may be a memoryview into the file, so should not be kept.
+
+        """
+
+        raise NotImplementedError
+
 class PuzzleView(metaclass=abc.ABCMeta):
     """Functionality for a single mode."""
 
@@ -51,6 +104,17 @@ class PuzzleView(metaclass=abc.ABCMeta):
     def getSolver(self):
         """Get the solver for this view if one exists."""
 
+    def getSolvers(self):
+        """
+        Get every strategy this view can solve with, to be raced together.
+
+        Views with only one strategy can leave this returning getSolver.
+
+        """
+
+        solver = self.getSolver()
+        return [] if solver == None else [solver]
+
     @abc.abstractmethod
     def getExtension(self):
         """Get either the file extension used to save the puzzles below, or None"""
@@ -75,6 +139,32 @@ class PuzzleView(metaclass=abc.ABCMeta):
     def load(self, puzzle):
         """Load the given puzzle if possible and return if successful."""
 
+    def rehydrate(self):
+        """
+        Called when a cached view is shown again instead of being rebuilt.
+
+        Views can use this to refresh anything that may have gone stale.
+
+        """
+
+    def release(self):
+        """Called when the view is dropped from the cache and will not be shown again."""
+
+    def applyPartial(self, changes):
+        """
+        Show part of a solution while a solver is still running.
+
+        changes maps whatever the view uses for cells to their new values,
+        or None for cells that are no longer fixed, and holds only what
+        changed since the last call. Only those cells should be redrawn.
+        They are shown apart from the puzzle itself, which must not be
+        changed by them.
+
+        """
+
+    def clearPartial(self):
+        """Stop showing the partial solution, once its solver has stopped or finished."""
+
 class Solver(metaclass=abc.ABCMeta):
     """Functionality for a puzzle solver, changed will be performed on the underlying view."""
 
@@ -86,29 +176,491 @@ class Solver(metaclass=abc.ABCMeta):
     def stop(self):
         """Stop the solver and return success (in stopping)."""
 
+    def status(self):
+        """Get a short description of how the solver is doing, or None."""
+
+        return None
+
+    def busy(self):
+        """Is the solver still running, or winding down after stop."""
+
+        return False
+
+class SolverChannel:
+    """
+    Carries updates from a solving process back to the GUI.
+
+    The solving process calls send, sendPartial and finish, while the GUI
+    listens on a widget and is woken by Tk only when something has arrived.
+    Updates that arrive together are merged so only the newest is passed
+    on, while partial solutions are merged into one set of changes. At most
+    MESSAGES are read at a time, so a solver sending faster than the GUI
+    reads cannot keep it from redrawing.
+
+    """
+
+    MESSAGES = 100 # Read in one go, before the rest of the Tk loop runs
+    PAUSE_MS = 10 # Before reading more once MESSAGES were read
+
+    _UPDATE, _PARTIAL, _FINISH = range(3)
+
+    def __init__(self):
+        self._reader, self._writer = multiprocessing.Pipe(False)
+        self._widget = None
+
+    def __getstate__(self):
+        # Only the sending end makes sense inside another process
+        return {"_reader": None, "_writer": self._writer, "_widget": None}
+
+    def send(self, item):
+        """Send an update to the GUI from the solving process."""
+
+        self._send((self._UPDATE, item))
+
+    def sendPartial(self, changes):
+        """Send changes to the partial solution to the GUI, as a dictionary."""
+
+        self._send((self._PARTIAL, changes))
+
+    def finish(self):
+        """Tell the GUI that the solving process is done."""
+
+        self._send((self._FINISH, None))
+
+    def _send(self, message):
+        try:
+            self._writer.send(message)
+        except OSError: # The GUI has stopped listening
+            pass
+
+    def listen(self, widget, update, finished, partial=None):
+        """
+        Call update with new items, partial with changes to the partial
+        solution, then finished, from widget's Tk loop.
+
+        This should be called once the solving process has been given the
+        channel, so the pipe closes if that process goes away.
+
+        """
+
+        self._writer.close()
+        self._widget = widget
+        self._update = update
+        self._partial = partial
+        self._finished = finished
+        if self._handlers():
+            self._watch()
+        else: # No file handlers on Windows, so fall back to polling
+            self._poll()
+
+    def close(self):
+        """Stop listening and release the pipe."""
+
+        if self._widget != None and self._handlers():
+            self._widget.tk.deletefilehandler(self._reader.fileno())
+        self._widget = None
+        self._reader.close()
+        self._writer.close()
+
+    def _handlers(self):
+        return hasattr(self._widget.tk, "createfilehandler")
+
+    def _watch(self):
+        if self._widget != None:
+            self._widget.tk.createfilehandler(self._reader.fileno(), tkinter.READABLE, self._ready)
+
+    def _poll(self):
+        if self._widget == None:
+            return
+        if self._reader.poll():
+            self._ready()
+        if self._widget != None:
+            self._widget.after(50, self._poll)
+
+    def _ready(self, *_):
+        done = updated = False
+        changes = {}
+        read = 0
+        try:
+            while not done and read < self.MESSAGES and self._reader.poll():
+                kind, item = self._reader.recv()
+                read += 1
+                if kind == self._UPDATE:
+                    latest, updated = item, True
+                elif kind == self._PARTIAL:
+                    changes.update(item)
+                else:
+                    done = True
+        except EOFError: # Solving process went away without finishing
+            done = True
+
+        if changes and self._partial != None:
+            self._partial(changes)
+        if updated:
+            self._update(latest)
+        if done:
+            self.close()
+            self._finished()
+        elif read == self.MESSAGES and self._widget != None and self._handlers():
+            # Let Tk catch up before reading the rest, polling already waits
+            self._widget.tk.deletefilehandler(self._reader.fileno())
+            self._widget.after(self.PAUSE_MS, self._watch)
+
+class NeverCancelled:
+    """Cancel token for solves nothing can stop, such as those without a GUI."""
+
+    def cancelled(self):
+        return False
+
+class SolveContext:
+    """
+    Everything a task running in a worker needs to talk to the GUI.
+
+    token says when to give up, channel carries updates back to the
+    view, and progress holds live counters for the GUI to sample.
+    Without a GUI channel is None and updates are dropped. checkpointer
+    is a checkpoint.Checkpointer if the solve can be resumed later.
+
+    """
+
+    PARTIAL_RATE = 20 # Most partial solutions sent to the view each second
+
+    def __init__(self, token, channel, progress, checkpointer=None):
+        self.token = token
+        self.channel = channel
+        self.progress = progress
+        self.checkpointer = checkpointer
+        self._partial = {}
+        self._partialSent = 0.0
+
+    def cancelled(self):
+        """Has the solve been asked to stop."""
+
+        return self.token.cancelled()
+
+    def send(self, item):
+        """Send an update to the view."""
+
+        if self.channel != None:
+            self.channel.send(item)
+
+    def sendPartial(self, changes):
+        """
+        Send changes to the partial solution shown by the view.
+
+        changes is a dictionary as taken by PuzzleView.applyPartial. They
+        are merged and held back so at most PARTIAL_RATE are sent each
+        second, and anything left is sent when the task returns. Tasks can
+        call this whenever they fix or unfix cells, and flushPartial if they
+        may go quiet for a while.
+
+        """
+
+        if self.channel == None:
+            return
+        self._partial.update(changes)
+        now = time.perf_counter()
+        if now - self._partialSent >= 1 / self.PARTIAL_RATE:
+            self.flushPartial(now)
+
+    def flushPartial(self, now=None):
+        """Send any held back partial solution now."""
+
+        if self._partial and self.channel != None:
+            self.channel.sendPartial(self._partial)
+            self._partial = {}
+            self._partialSent = time.perf_counter() if now == None else now
+
+    def resumed(self):
+        """
+        Get the state saved by the last checkpoint of this solve, or None.
+
+        The progress counters are restored to what they were at the time.
+
+        """
+
+        if self.checkpointer == None:
+            return None
+        saved = self.checkpointer.load()
+        if saved == None:
+            return None
+        state, counters = saved
+        if len(counters) == len(self.progress.values):
+            for i, value in enumerate(counters):
+                self.progress.values[i] = value
+        return state
+
+    def wantsCheckpoint(self):
+        """
+        Should the task save a checkpoint now, because one is due or the
+        solve has been cancelled.
+
+        This is cheap enough to check wherever cancelled is.
+
+        """
+
+        return self.checkpointer != None and (self.checkpointer.due() or self.cancelled())
+
+    def checkpoint(self, state):
+        """Save state for the solve to be resumed from, if checkpoints are on."""
+
+        if self.checkpointer != None:
+            self.checkpointer.save(state, self.progress.values.tolist())
+
+    def close(self):
+        self.progress.close()
+
+class PooledSolver(Solver):
+    """
+    Solver that runs its search in the shared worker pool.
+
+    Subclasses give the function to run through task, and receive anything
+    it sends down its channel through update. Stopping cancels the search
+    cooperatively, then kills the worker if it has not given up after
+    GRACE seconds. Every solve is recorded in the telemetry log.
+
+    Subclasses whose tasks save checkpoints through their SolveContext set
+    checkpoints, and a solve of the same puzzle that was stopped or lost
+    before it finished is then resumed.
+
+    When raced against other strategies, race is the portfolio.Portfolio
+    that decides whether its result is used.
+
+    """
+
+    GRACE = 2.0
+    REAP_MS = 50 # How often a stopping task is checked on
+
+    # Progress counters to share, subclasses may add their own at the end
+    fields = progress.FIELDS
+
+    checkpoints = False
+
+    def __init__(self, widget):
+        Solver.__init__(self)
+        self.widget = widget
+        self.channel = SolverChannel()
+        self.progress = None
+        self.job = None
+        self.stopping = None # When stop was called
+        self.stopped = None # Seconds the task took to stop
+        self.checkpointer = None
+        self.view = None
+        self.race = None
+        self.profiles = [] # Files written by profiling the task
+
+    @abc.abstractmethod
+    def task(self):
+        """
+        Get (func, args) to run in a worker.
+
+        It is called as func(context, *args) with a SolveContext, and should
+        return early once context.cancelled() is set.
+
+        """
+
+    def update(self, item):
+        """
+        Receive an update sent by the running task.
+
+        Subclasses showing updates in the view should only do so while
+        shown is true.
+
+        """
+
+    def shown(self):
+        """Should the view show this solver's progress, false for strategies raced behind the favourite."""
+
+        return self.race == None or self.race.shows(self)
+
+    def partial(self, changes):
+        """Receive changes to the partial solution, passing them to the view by default."""
+
+        if self.view != None and self.shown():
+            self.view.applyPartial(changes)
+
+    def _clearPartial(self):
+        if self.view != None and self.shown():
+            self.view.clearPartial()
+
+    def strategy(self):
+        """Get a name for how this solver goes about it, unique within its plugin."""
+
+        return type(self).__name__
+
+    def solved(self, result):
+        """Receive what the task returned, if it finished by itself."""
+
+    def release(self):
+        """Free anything held for the solve, once it has finished or stopped."""
+
+        self._clearPartial()
+        if self.progress != None:
+            self.progress.close()
+            self.progress = None
+
+    def start(self):
+        """Start the solver."""
+
+        from . import state # Circular import
+
+        func, args = self.task()
+        self.progress = progress.Progress(self.fields)
+        self.view = state.view.value()
+        self.run = telemetry.Run(state.puzzle.value(), state.mode.value(),
+            self.view.getPuzzle(), strategy=self.strategy(),
+            race=len(self.race.racing) if self.race != None else None)
+        if self.checkpoints:
+            self.checkpointer = checkpoint.for_puzzle(state.puzzle.value(),
+                self.view.getPuzzle(), self.strategy())
+        profile = profiling.request(state.profile.value())
+        self.job = pool.get().submit(_run_task, self.channel, self.progress,
+            self.checkpointer, profile, func, args)
+        self.channel.listen(self.widget, self.update, self.finished, self.partial)
+
+    def stop(self):
+        """
+        Stop the solver and return success (in stopping).
+
+        This does not wait: the task is asked to give up and checked on from
+        the Tk loop, then killed if it is still going after GRACE seconds.
+
+        """
+
+        if self.job == None or self.run.done:
+            self.release()
+            return True
+        if self.stopping == None:
+            self.channel.close()
+            self._clearPartial()
+            self.stopping = time.perf_counter()
+            self._finishedFirst = self.job.done()
+            self.job.requestCancel()
+            _stopping.add(self)
+            self._reap()
+        return True
+
+    def _reap(self):
+        if not self.job.reap(self.GRACE):
+            try:
+                self.widget.after(self.REAP_MS, self._reap)
+                return
+            except tkinter.TclError: # Widget is gone, so wait here instead
+                self.job.cancel(self.GRACE)
+        self._stopped()
+
+    def _stopped(self):
+        """Record the solve once its task has stopped, then release it."""
+
+        _stopping.discard(self)
+        if self.run.done:
+            return
+        self.stopped = time.perf_counter() - self.stopping
+        outcome, used = "cancelled", None
+        if not self.job.forced:
+            try:
+                result, used, self.profiles = self.job.join()
+                if self._finishedFirst: # Finished before stop, but was never used
+                    outcome = "unsolved" if result is None or result is False else "solved"
+            except pool.JobError:
+                pass
+        extra = {"won": False} if self.race != None else {}
+        self.run.finish(outcome, self.nodes(), used, **extra)
+        if self.checkpointer != None and self.race != None and self.race.obsolete(self):
+            self.checkpointer.clear() # Only once the task can no longer save one
+            self.checkpointer = None
+        self.release()
+
+    def busy(self):
+        """Is the solver still running, or winding down after stop."""
+
+        return self.job != None and not self.run.done
+
+    def status(self):
+        """Get a short description of how the solver is doing, or None."""
+
+        if self.stopping != None and self.stopped == None:
+            return "Stopping"
+        if self.stopped != None:
+            if self.job.forced:
+                return "Killed after %.2fs" % self.stopped
+            if self.checkpointer != None:
+                return self.addProfiles("Stopped in %.2fs, will resume" % self.stopped)
+            return self.addProfiles("Stopped in %.2fs" % self.stopped)
+        elif self.progress != None:
+            return self.progress.describe()
+        return self.addProfiles(None)
+
+    def addProfiles(self, status):
+        """Add where the task's profile was written to status."""
+
+        if not self.profiles:
+            return status
+        written = "Profile written to %s: %s" % (os.path.dirname(self.profiles[0]),
+            ", ".join(os.path.basename(f) for f in self.profiles))
+        return written if status == None else status + ". " + written
+
+    def nodes(self):
+        """Get the nodes searched so far, or None once released."""
+
+        return self.progress.values[progress.NODES] if self.progress != None else None
+
+    def finished(self):
+        """Called once the task has finished by itself."""
+
+        from . import state # Circular import
+
+        try:
+            try:
+                result, used, self.profiles = self.job.join()
+            except pool.JobError as e:
+                self.run.finish("failed", self.nodes(), error=e.exception())
+                library.solved(self.run.entry)
+                raise
+            if self.checkpointer != None: # Kept after failing, so a retry resumes
+                self.checkpointer.clear()
+            solved = not (result is None or result is False)
+            use = self.race == None or self.race.finishing(self, solved)
+            extra = {"won": solved and use} if self.race != None else {}
+            self.run.finish("solved" if solved else "unsolved", self.nodes(), used, **extra)
+            library.solved(self.run.entry) # Files holding this puzzle show how it went
+            if use:
+                self.solved(result)
+        finally:
+            self.release()
+            if self.race != None:
+                self.race.finished(self)
+            elif state.solving.value() is self:
+                state.solving.change(None)
+
+_stopping = set() # PooledSolvers winding down after stop
+
+def reap_all():
+    """Wait for every stopping solver to finish winding down, as the GUI closes."""
+
+    for solver in list(_stopping):
+        solver.job.cancel(solver.GRACE)
+        solver._stopped()
+
+def _run_task(token, channel, progress, checkpointer, profile, func, args):
+    """
+    Run a PooledSolver's task, returning (result, resource use, profile files).
+
+    channel may be None when nothing is listening, as for benchmarks.
+
+    """
 
-def find_plugins(module):
-    """Find all plugin names for the given package."""
-
-    mod_names = set()
-    for path in module.__path__:
-        if os.path.isdir(path):
-            mod_files = os.listdir(path)
-            for file in mod_files:
-                if file.endswith(".py") and file != "__init__.py":
-                    mod_names.add(file[:-3])
-    return mod_names
-
-def load_plugins(module):
-    """Load all the plugins inside module."""
-
-    plugins = list(find_plugins(module))
-    if not plugins:
-        return []
-    else:
-        m = __import__(module.__name__, globals(), locals(), fromlist=plugins)
-        mods = (getattr(m, p, None) for p in plugins)
-        return [getattr(m, "Puzzle") for m in mods if hasattr(m, "Puzzle")]
+    context = SolveContext(token, channel, progress, checkpointer)
+    started = telemetry.begin()
+    try:
+        with profiling.capture(profile, func.__module__.rpartition(".")[2]) as captured:
+            result = func(context, *args)
+        return result, telemetry.usage(started), captured.files if captured != None else []
+    finally:
+        context.flushPartial()
+        context.close()
+        if channel != None:
+            channel.finish()
 
 class DummyView(PuzzleView):
     """Functionality for a single mode."""
@@ -0,0 +1,410 @@
+"""
+Pool of warm worker processes for solvers to run inside.
+
+Starting a fresh process for every solve means paying for interpreter
+startup and module imports each time. Workers here are started once, with
+the solver framework already imported, and then run one job after another.
+
+"""
+
+# PuzzleSolver
+# Copyright (C) 2010  Andy Gurden
+#
+#     This file is part of PuzzleSolver.
+#
+#     PuzzleSolver is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     PuzzleSolver is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with PuzzleSolver.  If not, see <http://www.gnu.org/licenses/>.
+
+import atexit
+import importlib
+import io
+import multiprocessing
+import os
+from multiprocessing import connection
+from multiprocessing import reduction
+from multiprocessing import resource_tracker
+import time
+import traceback
+
+START_METHODS = ("fork", "forkserver", "spawn")
+
+class JobError(Exception):
+    """A job failed inside its worker, the message holds the traceback."""
+
+    def exception(self):
+        """Get the name of the exception raised, from the last line of the traceback."""
+
+        return str(self).strip().splitlines()[-1].partition(":")[0]
+
+class CancelToken:
+    """
+    Tells a job running in a worker that it should give up.
+
+    Checking cancelled is just a read of shared memory, so it is cheap enough
+    for a solver to call on every step of its search.
+
+    """
+
+    def __init__(self, flag):
+        self._flag = flag
+
+    def cancelled(self):
+        """Has the job been asked to stop."""
+
+        return self._flag.value != 0
+
+class _TaskPickler(reduction.ForkingPickler):
+    """Pickles a task, keeping the duplicates made of any pipe ends in it."""
+
+    def __init__(self, file):
+        reduction.ForkingPickler.__init__(self, file)
+        self.handles = []
+
+    def reducer_override(self, obj):
+        if type(obj) is not connection.Connection:
+            return NotImplemented
+        rebuild, args = connection.reduce_connection(obj)
+        self.handles.append(args[0])
+        return rebuild, args
+
+def _release(handles):
+    """Close duplicated pipe ends that will never be sent to a worker."""
+
+    for handle in handles:
+        try:
+            os.close(handle.detach())
+        except OSError:
+            pass
+
+class Job:
+    """Handle on a function submitted to the pool, which may be queued until a worker is free."""
+
+    def __init__(self, pool, task, handles=()):
+        self._pool = pool
+        self._task = task # Pickled function and arguments, until sent to a worker
+        self._handles = list(handles) # Pipe ends duplicated for the task, until sent
+        self._worker = None
+        self._result = None
+        self._error = None
+        self._finished = False
+        self._cancelled = None # When cancelling was asked for
+        self.forced = False
+
+    def done(self):
+        """Has the job finished."""
+
+        if not self._finished and self._worker != None:
+            self._worker.collect(0)
+        return self._finished
+
+    def join(self):
+        """Wait for the job to finish and return its result."""
+
+        while not self._finished:
+            if self._worker == None:
+                self._pool._wait()
+            else:
+                self._worker.collect(None)
+        if self._error != None:
+            raise JobError(self._error)
+        return self._result
+
+    def cancel(self, grace=2.0):
+        """
+        Stop the job and return how many seconds that took.
+
+        The job's cancel token is set first, and if it has not returned after
+        grace seconds its worker is killed and replaced, and forced is set.
+        A job still queued is dropped, closing the pipe ends duplicated for it.
+
+        """
+
+        started = time.perf_counter()
+        self.requestCancel()
+        if not self._finished:
+            self._worker.collect(max(0, grace - (time.perf_counter() - self._cancelled)))
+        self.reap(0) # Grace is over
+        return time.perf_counter() - started
+
+    def requestCancel(self):
+        """Set the job's cancel token without waiting, then call reap until it is done."""
+
+        if self._cancelled == None:
+            self._cancelled = time.perf_counter()
+            if self._worker == None and not self._finished:
+                self._pool._dequeue(self)
+            elif not self.done():
+                self._worker.flag.value = 1
+
+    def reap(self, grace=2.0):
+        """
+        Check on a job whose cancel was requested, without waiting.
+
+        Returns whether the job is over, killing its worker and setting forced
+        if it is still running grace seconds after requestCancel.
+
+        """
+
+        if self.done():
+            return True
+        if time.perf_counter() - self._cancelled < grace:
+            return False
+        self._worker.kill()
+        self.forced = True
+        return True
+
+    def _finish(self, result, error):
+        self._result = result
+        self._error = error
+        self._finished = True
+
+class _Worker:
+    """One process inside the pool and the job it is running."""
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.flag = pool.context.RawValue("b", 0)
+        self.conn, child = pool.context.Pipe()
+        self.proc = pool.context.Process(target=_work, args=(child, self.flag, pool.preload))
+        self.proc.start()
+        child.close()
+        self.job = None
+
+    def alive(self):
+        return self.conn != None and self.proc.is_alive()
+
+    def run(self, job):
+        self.job = job
+        job._worker = self
+        self.flag.value = 0
+        task, job._task, job._handles = job._task, None, []
+        self.conn.send_bytes(task) # The worker takes the duplicated pipe ends
+
+    def collect(self, timeout):
+        """Pick up the result of the current job, waiting up to timeout seconds."""
+
+        if self.job == None or self.conn == None:
+            return
+        if not self.conn.poll(timeout):
+            return
+        try:
+            ok, value = self.conn.recv()
+        except (EOFError, OSError):
+            ok, value = False, "Worker process exited while running the job."
+            self.close()
+        self._finish(ok, value)
+
+    def kill(self):
+        """Kill the worker and its job outright, then replace it in the pool."""
+
+        self.proc.terminate()
+        self.proc.join()
+        self.close()
+        self._finish(False, "Worker process was killed while running the job.")
+        self.pool.replenish()
+
+    def _finish(self, ok, value):
+        job, self.job = self.job, None
+        if job != None:
+            job._finish(value if ok else None, None if ok else value)
+        self.pool._dispatch()
+
+    def stop(self):
+        """Ask the worker to exit once it is idle, otherwise kill it."""
+
+        if self.conn == None:
+            return
+        if self.job == None:
+            try:
+                self.conn.send(None)
+            except OSError:
+                pass
+            self.proc.join(1)
+        if self.proc.is_alive():
+            self.proc.terminate()
+            self.proc.join()
+        self.close()
+
+    def close(self):
+        if self.conn != None:
+            self.conn.close()
+            self.conn = None
+
+class WorkerPool:
+    """
+    Keeps size warm processes ready to run jobs.
+
+    No more than size jobs run at once. Jobs submitted while every worker
+    is busy are queued, and sent to a worker as soon as one is free.
+
+    """
+
+    def __init__(self, size=None, method=None, preload=()):
+        self.size = size if size else (os.cpu_count() or 1)
+        self.context = multiprocessing.get_context(method)
+        self.preload = tuple(preload)
+        self._workers = []
+        self._queue = []
+        # Workers must share our resource tracker, or shared memory they
+        # attach to would be freed when they exit
+        resource_tracker.ensure_running()
+        self.replenish()
+
+    def replenish(self):
+        """Replace any workers that have died."""
+
+        self._workers = [w for w in self._workers if w.alive()]
+        while len(self._workers) < self.size:
+            self._workers.append(_Worker(self))
+        self._dispatch()
+
+    def warm(self, modules):
+        """
+        Import modules in every worker, ahead of the jobs that need them.
+
+        Workers import them before their next job, and workers started
+        later import them when they start.
+
+        """
+
+        modules = [m for m in modules if m not in self.preload]
+        if not modules:
+            return
+        self.preload += tuple(modules)
+        for w in self._workers:
+            if w.alive():
+                try:
+                    w.conn.send(modules)
+                except OSError:
+                    pass # Replaced once it is noticed to be dead
+
+    def submit(self, func, *args):
+        """
+        Run func(token, *args) in a worker and return a Job for it.
+
+        token is the CancelToken for the job. func and args must be picklable,
+        so func should be defined at the top level of a module. They are
+        pickled straight away, so may be changed or closed even if the job
+        is queued.
+
+        """
+
+        data = io.BytesIO()
+        pickler = _TaskPickler(data)
+        pickler.dump((func, args))
+        job = Job(self, data.getvalue(), pickler.handles)
+        for w in self._workers:
+            w.collect(0) # Free workers whose jobs have finished unnoticed
+        self._queue.append(job)
+        self.replenish()
+        return job
+
+    def _dispatch(self):
+        """Send queued jobs to idle workers."""
+
+        while self._queue:
+            worker = next((w for w in self._workers if w.job == None and w.alive()), None)
+            if worker == None:
+                return
+            worker.run(self._queue.pop(0))
+
+    def _dequeue(self, job):
+        self._queue.remove(job)
+        _release(job._handles)
+        job._task, job._handles = None, []
+        job._finish(None, "Job was cancelled before it started.")
+
+    def _wait(self):
+        """Wait for any busy worker to finish its job, so queued jobs can go."""
+
+        busy = [w for w in self._workers if w.job != None and w.conn != None]
+        if not busy:
+            self.replenish()
+            return
+        ready = connection.wait([w.conn for w in busy])
+        for w in busy:
+            if w.conn in ready:
+                w.collect(0)
+        self.replenish() # In case any died
+
+    def shutdown(self):
+        """Stop all workers, killing any that are still busy, and drop queued jobs."""
+
+        for job in list(self._queue):
+            self._dequeue(job)
+        for w in self._workers:
+            w.stop()
+        self._workers = []
+
+def _work(conn, flag, preload):
+    """Main loop for a worker process."""
+
+    token = CancelToken(flag)
+    _import(preload)
+
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            return
+        if task == None:
+            return
+        if isinstance(task, list): # Modules to warm up with
+            _import(task)
+            continue
+        func, args = task
+        try:
+            reply = (True, func(token, *args))
+        except Exception:
+            reply = (False, traceback.format_exc())
+        del task, func, args
+        conn.send(reply)
+
+def _import(modules):
+    for name in modules:
+        try:
+            importlib.import_module(name)
+        except Exception:
+            traceback.print_exc()
+
+# SHARED POOL
+
+_settings = {"size": None, "method": None}
+_pool = None
+
+def configure(size=None, method=None):
+    """Set up the shared pool, this must be done before it is started."""
+
+    if _pool != None:
+        raise RuntimeError("The worker pool has already been started.")
+    _settings["size"] = size
+    _settings["method"] = method
+
+def context():
+    """Get the multiprocessing context for the configured start method."""
+
+    return multiprocessing.get_context(_settings["method"])
+
+def start(preload=()):
+    """Start the shared pool if needed, importing preload in each worker."""
+
+    global _pool
+    if _pool == None:
+        _pool = WorkerPool(_settings["size"], _settings["method"], preload)
+        atexit.register(_pool.shutdown)
+    return _pool
+
+def get():
+    """Get the shared pool, starting it if needed."""
+
+    return start()
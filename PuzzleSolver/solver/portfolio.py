@@ -0,0 +1,155 @@
+"""
+Racing several solving strategies on the same puzzle.
+
+How long a strategy takes varies hugely from puzzle to puzzle, so a view
+can offer more than one through PuzzleView.getSolvers. A Portfolio starts
+them together in the worker pool and keeps whichever solution arrives
+first, stopping the rest. Each strategy's solve is recorded in the
+telemetry log along with whether it won, and strategies that have won most
+often are raced first when there are more of them than workers.
+
+"""
+
+# PuzzleSolver
+# Copyright (C) 2010  Andy Gurden
+#
+#     This file is part of PuzzleSolver.
+#
+#     PuzzleSolver is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     PuzzleSolver is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with PuzzleSolver.  If not, see <http://www.gnu.org/licenses/>.
+
+from . import pool
+from . import telemetry
+from .plugin import Solver
+
+def choose(view):
+    """Get the solver to run for view, racing its strategies if racing is on."""
+
+    from . import state # Circular import
+
+    if not state.racing.value():
+        return view.getSolver()
+    solvers = view.getSolvers()
+    if len(solvers) > 1:
+        return Portfolio(solvers)
+    return solvers[0] if solvers else None
+
+def rank(plugin, solvers):
+    """Sort PooledSolvers by how many races their strategy has won, most first."""
+
+    wins = telemetry.wins(plugin)
+    return sorted(solvers, key=lambda s: -wins.get(s.strategy(), 0))
+
+class Portfolio(Solver):
+    """
+    Races PooledSolvers against each other, using the first solution.
+
+    At most one strategy is run per worker in the pool. Only the favourite,
+    the one that has won most before, shows its partial solutions, which
+    are cleared if it loses. If none finds a solution, the last to finish
+    passes on its result. Strategies are stopped without waiting for them,
+    so some may still be winding down once the race is decided.
+
+    """
+
+    def __init__(self, solvers):
+        Solver.__init__(self)
+        self.solvers = list(solvers)
+        self.racing = []
+        self.pending = [] # Racing strategies that have not finished or been stopped
+        self.winner = None
+        self.solved = False # Whether the winner found a solution
+        self.stopped = False
+
+    def start(self):
+        """Start the solver."""
+
+        from . import state # Circular import
+
+        ptype = state.puzzle.value()
+        ranked = rank(ptype.pluginId() if ptype != None else None, self.solvers)
+        self.racing = ranked[:max(1, pool.get().size)]
+        self.pending = list(self.racing)
+        for solver in self.racing:
+            solver.race = self
+        for solver in self.racing:
+            solver.start()
+
+    def stop(self):
+        """Stop every strategy still running and return success (in stopping)."""
+
+        self.stopped = True
+        self.pending = []
+        return all([solver.stop() for solver in self.racing])
+
+    def busy(self):
+        """Is any strategy still running, or winding down after being stopped."""
+
+        return any(solver.busy() for solver in self.racing)
+
+    def shows(self, solver):
+        """Should solver's partial solutions be shown in the view."""
+
+        return bool(self.racing) and solver is self.racing[0]
+
+    def finishing(self, solver, solved):
+        """
+        Called as a strategy finishes by itself, returning whether its
+        result should be used.
+
+        The first solution wins and stops the others. Stopping does not
+        wait, and clears the favourite's partial solution if it lost.
+
+        """
+
+        if solver in self.pending:
+            self.pending.remove(solver)
+        if self.winner != None or (not solved and self.pending):
+            return False
+        self.winner = solver
+        self.solved = solved
+        others, self.pending = self.pending, []
+        for other in others:
+            other.stop()
+        return True
+
+    def obsolete(self, solver):
+        """Is solver's checkpoint no longer needed, because another strategy solved the puzzle."""
+
+        return self.solved and self.winner is not solver
+
+    def finished(self, solver):
+        """Called once a strategy that finished by itself has been released."""
+
+        from . import state # Circular import
+
+        if solver in self.pending: # Failed without finishing
+            self.pending.remove(solver)
+        if not self.pending and state.solving.value() is self:
+            state.solving.change(None)
+
+    def status(self):
+        """Get a short description of how the race is going, or None."""
+
+        if self.winner != None:
+            return self.winner.addProfiles("%s: %s" % (self.winner.strategy(),
+                self.winner.run.entry.get("outcome")))
+        if self.stopped:
+            if self.busy():
+                return "Stopping %d strategies" % len([s for s in self.racing if s.busy()])
+            taken = [s.stopped for s in self.racing if s.stopped != None]
+            return "Stopped %d strategies in %.2fs" % (len(self.racing), max(taken or [0]))
+        if not self.racing:
+            return None
+        nodes = sum(s.nodes() or 0 for s in self.racing)
+        return "Racing %d strategies, %d nodes" % (len(self.pending), nodes)
@@ -0,0 +1,217 @@
+"""
+Optional profiling of solves, inside the process doing the solving.
+
+Plugins can mark out hot code with span and count, which do next to
+nothing unless profiling is on:
+
+    with profiling.span("propagate"):
+        ...
+    profiling.count("nodes")
+
+A solve is profiled in one of these modes:
+
+    spans    - only the spans and counters, written as JSON
+    cprofile - cProfile of everything, written as a .prof file for pstats
+               or snakeviz
+    sample   - the solving thread's stack sampled every few milliseconds,
+               written as folded stacks for flamegraph.pl or speedscope
+
+The spans and counters are written in every mode.
+
+"""
+
+# PuzzleSolver
+# Copyright (C) 2010  Andy Gurden
+#
+#     This file is part of PuzzleSolver.
+#
+#     PuzzleSolver is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     PuzzleSolver is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with PuzzleSolver.  If not, see <http://www.gnu.org/licenses/>.
+
+import contextlib
+import cProfile
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+from .utility import paths
+
+MODES = ("spans", "cprofile", "sample")
+
+# Seconds between stack samples in sample mode
+SAMPLE_INTERVAL = 0.005
+
+settings = {"directory": None} # Where profiles are written, None for the default
+
+log = logging.getLogger(__name__)
+
+enabled = False
+_spans = {} # Name to [calls, seconds]
+_counters = {}
+
+class _Span:
+    __slots__ = ("name", "started")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        taken = time.perf_counter() - self.started
+        entry = _spans.get(self.name)
+        if entry == None:
+            _spans[self.name] = [1, taken]
+        else:
+            entry[0] += 1
+            entry[1] += taken
+        return False
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NO_SPAN = _NoSpan()
+
+def span(name):
+    """Time the block of a with statement under name, when profiling."""
+
+    return _Span(name) if enabled else _NO_SPAN
+
+def count(name, n=1):
+    """Add n to the counter name, when profiling."""
+
+    if enabled:
+        _counters[name] = _counters.get(name, 0) + n
+
+def request(mode):
+    """Get what to pass to capture in a worker for a mode, or None if off."""
+
+    if mode == None:
+        return None
+    return (mode, settings["directory"] or paths.cache_file("profiles"))
+
+def capture(profile, name):
+    """
+    Get a context manager that profiles its block, for a result of request.
+
+    name is used in the names of the files written. The with statement gets
+    the Capture, whose files are those written once the block is done, or
+    None if profiling is off.
+
+    """
+
+    if profile == None:
+        return contextlib.nullcontext()
+    return Capture(profile[0], name, profile[1])
+
+class Capture:
+    """
+    Profiles a block of code in the current process and writes the results.
+
+    The names of the files written are left in files for the caller to
+    report. Failing to write them is logged rather than raised, so never
+    fails the solve that was profiled.
+
+    """
+
+    def __init__(self, mode, name, directory):
+        if mode not in MODES:
+            raise ValueError("Unknown profiling mode: %r" % (mode,))
+        self.mode = mode
+        self.name = name
+        self.directory = directory
+        self.files = []
+        self._profile = None
+        self._sampler = None
+
+    def __enter__(self):
+        global enabled
+        _spans.clear()
+        _counters.clear()
+        enabled = True
+        if self.mode == "cprofile":
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        elif self.mode == "sample":
+            self._sampler = _Sampler(threading.get_ident())
+            self._sampler.start()
+        return self
+
+    def __exit__(self, *exc):
+        global enabled
+        enabled = False
+        if self._profile != None:
+            self._profile.disable()
+        if self._sampler != None:
+            self._sampler.stop()
+        try:
+            self._write()
+        except OSError:
+            log.exception("Could not write the profile of %s to %s", self.name, self.directory)
+        return False
+
+    def _write(self):
+        os.makedirs(self.directory, exist_ok=True)
+        base = os.path.join(self.directory, "%s-%s-%d" % (self.name,
+            time.strftime("%Y%m%d-%H%M%S"), os.getpid()))
+        with open(base + ".spans.json", "w") as file:
+            json.dump({
+                "spans": {n: {"calls": c, "seconds": s} for n, (c, s) in _spans.items()},
+                "counters": dict(_counters),
+            }, file, indent=1, sort_keys=True)
+        self.files.append(base + ".spans.json")
+        if self._profile != None:
+            self._profile.dump_stats(base + ".prof")
+            self.files.append(base + ".prof")
+        if self._sampler != None:
+            with open(base + ".folded", "w") as file:
+                for stack, n in sorted(self._sampler.stacks.items()):
+                    file.write("%s %d\n" % (stack, n))
+            self.files.append(base + ".folded")
+
+class _Sampler(threading.Thread):
+    """Counts the stacks of another thread, sampled at SAMPLE_INTERVAL."""
+
+    def __init__(self, target):
+        threading.Thread.__init__(self, daemon=True)
+        self.target = target
+        self.stacks = {}
+        self._stopping = threading.Event()
+
+    def run(self):
+        while not self._stopping.wait(SAMPLE_INTERVAL):
+            frame = sys._current_frames().get(self.target)
+            names = []
+            while frame != None:
+                code = frame.f_code
+                names.append("%s (%s:%d)" % (code.co_name,
+                    os.path.basename(code.co_filename), code.co_firstlineno))
+                frame = frame.f_back
+            if names:
+                stack = ";".join(reversed(names))
+                self.stacks[stack] = self.stacks.get(stack, 0) + 1
+
+    def stop(self):
+        self._stopping.set()
+        self.join()
@@ -0,0 +1,91 @@
+"""
+Live search counters shared between a solving process and the GUI.
+
+"""
+
+# PuzzleSolver
+# Copyright (C) 2010  Andy Gurden
+#
+#     This file is part of PuzzleSolver.
+#
+#     PuzzleSolver is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     PuzzleSolver is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with PuzzleSolver.  If not, see <http://www.gnu.org/licenses/>.
+
+import time
+
+from .sharedbuffer import SharedBuffer
+
+FIELDS = ("nodes", "depth", "backtracks", "best")
+NODES, DEPTH, BACKTRACKS, BEST = range(len(FIELDS))
+
+class Progress:
+    """
+    Counters a solver updates in shared memory and the GUI samples.
+
+    Only the solving process should write, which it does straight into
+    values using the field constants, for example values[NODES] += 1.
+    Nothing is locked or pickled, so this is cheap enough for inner loops.
+    Extra fields can be added after the standard ones.
+
+    """
+
+    def __init__(self, fields=FIELDS, buffer=None):
+        self.fields = tuple(fields)
+        if buffer == None:
+            buffer = SharedBuffer(8 * len(self.fields))
+            buffer.view[:] = bytes(buffer.size)
+        self._buffer = buffer
+        self.values = buffer.cast("q")
+        self._last = None
+
+    def __getstate__(self):
+        return {"fields": self.fields, "buffer": self._buffer}
+
+    def __setstate__(self, state):
+        self.__init__(state["fields"], state["buffer"])
+
+    def __getitem__(self, field):
+        return self.values[self.fields.index(field)]
+
+    def sample(self):
+        """
+        Get a dictionary of the current counters, plus the node rate since
+        the last sample in "rate".
+
+        """
+
+        now = time.perf_counter()
+        result = dict(zip(self.fields, self.values.tolist()))
+        nodes = result["nodes"]
+        if self._last == None:
+            result["rate"] = 0.0
+        else:
+            elapsed = now - self._last[0]
+            result["rate"] = (nodes - self._last[1]) / elapsed if elapsed > 0 else 0.0
+        self._last = (now, nodes)
+        return result
+
+    def describe(self):
+        """Sample the counters as a short line of text."""
+
+        s = self.sample()
+        text = "%d nodes (%.0f/s), depth %d, %d backtracks, best %d" % (
+            s["nodes"], s["rate"], s["depth"], s["backtracks"], s["best"])
+        for field in self.fields[len(FIELDS):]:
+            text += ", %s %d" % (field.replace("_", " "), s[field])
+        return text
+
+    def close(self):
+        """Release the shared memory, freeing it if this side created it."""
+
+        self._buffer.close()
@@ -0,0 +1,238 @@
+"""
+Candidate elimination for grid puzzles where no value repeats in a unit.
+
+Works on Grids from solver.grid, such as Sudoku and Latin squares, where
+each row, column and box holds each value at most once, and units as long
+as the number of values hold every value exactly once. Repeatedly:
+
+    - a cell with one candidate removes it from all its peers,
+    - a value with one possible cell in a full unit is placed there,
+
+until nothing changes or a contradiction is found.
+
+Each grid is done in turn with Python ints as bitmasks. When NumPy is
+installed and there are enough grids of the same shape, their bitmasks are
+instead kept as one array (grids x cells) and each rule is applied to all
+of them at once, with grids dropping out as they settle or turn out to be
+impossible. For a few grids the NumPy overhead costs more than it saves.
+
+"""
+
+# PuzzleSolver
+# Copyright (C) 2010  Andy Gurden
+#
+#     This file is part of PuzzleSolver.
+#
+#     PuzzleSolver is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     PuzzleSolver is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with PuzzleSolver.  If not, see <http://www.gnu.org/licenses/>.
+
+import abc
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from .plugin import PooledSolver
+
+# Fewest grids of one shape worth propagating with NumPy by default
+STACK_MIN = 16
+
+def propagate(grid, vectorised=None):
+    """
+    Eliminate candidates in grid, filling cells left with only one.
+
+    Returns False if the grid turned out to be impossible. vectorised
+    chooses NumPy or not, by default it is only used for big stacks.
+
+    """
+
+    return propagate_many([grid], vectorised)[0]
+
+def propagate_many(grids, vectorised=None):
+    """Propagate each of grids, returning a list of which are still possible."""
+
+    if vectorised == False or (vectorised == None and (numpy == None or len(grids) < STACK_MIN)):
+        return [_propagate_masks(grid) for grid in grids]
+
+    # Grids of the same shape are stacked together
+    result = [None] * len(grids)
+    shapes = {}
+    for i, grid in enumerate(grids):
+        shapes.setdefault(grid.shape(), []).append(i)
+    for indexes in shapes.values():
+        if vectorised or len(indexes) >= STACK_MIN:
+            ok = _propagate_stack([grids[i] for i in indexes])
+        else:
+            ok = [_propagate_masks(grids[i]) for i in indexes]
+        for i, possible in zip(indexes, ok):
+            result[i] = possible
+    return result
+
+def _store(grid, masks):
+    for cell, mask in enumerate(masks):
+        if mask != grid.candidates(cell):
+            if mask and not mask & (mask - 1) and grid[cell] == 0:
+                grid.set(cell, mask.bit_length())
+            else:
+                grid.setCandidates(cell, mask)
+
+def _propagate_masks(grid):
+    """Propagate one grid using Python ints as bitmasks."""
+
+    layout = grid.layout
+    peers = layout.peers
+    full = grid.full()
+    units = [unit for unit in layout.units if len(unit) == grid.values]
+    masks = [grid.candidates(cell) for cell in range(len(grid))]
+    ok = True
+    changed = True
+    while ok and changed:
+        changed = False
+        for cell, mask in enumerate(masks):
+            if mask == 0:
+                ok = False
+                break
+            if mask & (mask - 1) == 0:
+                for peer in peers[cell]:
+                    if masks[peer] & mask:
+                        masks[peer] &= ~mask
+                        changed = True
+        if not ok:
+            break
+
+        for unit in units:
+            once = twice = 0
+            for cell in unit:
+                mask = masks[cell]
+                twice |= once & mask
+                once |= mask
+            if once != full:
+                ok = False
+                break
+            hidden = once & ~twice
+            if hidden:
+                for cell in unit:
+                    found = masks[cell] & hidden
+                    if found and found != masks[cell]:
+                        if found & (found - 1):
+                            ok = False
+                            break
+                        masks[cell] = found
+                        changed = True
+                if not ok:
+                    break
+
+    _store(grid, masks)
+    return ok
+
+_tensors = {}
+
+def _layout_tensors(grid):
+    """Get the padded peer indexes and full unit groups for a shape of grid."""
+
+    key = grid.shape()
+    if key not in _tensors:
+        layout = grid.layout
+        cells = len(grid)
+        # Cells with fewer peers are padded with an extra cell that stays 0
+        width = max([len(ps) for ps in layout.peers] or [0])
+        peers = numpy.full((cells, width), cells, dtype=numpy.intp)
+        for cell, ps in enumerate(layout.peers):
+            peers[cell, :len(ps)] = ps
+        # Each group covers each cell at most once, so can be assigned to
+        groups = [numpy.array(g, dtype=numpy.intp)
+            for g in (layout.rows, layout.cols, layout.boxes)
+            if g and len(g[0]) == grid.values]
+        _tensors[key] = (peers, groups)
+    return _tensors[key]
+
+def _propagate_stack(grids):
+    """Propagate grids of the same shape together as one NumPy array of bitmasks."""
+
+    peers, groups = _layout_tensors(grids[0])
+    cells = len(grids[0])
+    full = numpy.uint64(grids[0].full())
+    zero = numpy.uint64(0)
+    one = numpy.uint64(1)
+
+    # grids x cells, with an extra cell always 0 for padding peers
+    masks = numpy.zeros((len(grids), cells + 1), dtype=numpy.uint64)
+    masks[:, :cells] = [[g.candidates(c) for c in range(cells)] for g in grids]
+    bad = numpy.zeros(len(grids), dtype=bool)
+
+    # Grids still changing, which are all each sweep works on. Those that
+    # stop changing or are found impossible are copied back and dropped.
+    live = numpy.arange(len(grids))
+    work = masks
+    while len(live):
+        before = work.copy()
+        broken = numpy.zeros(len(live), dtype=bool)
+
+        single = numpy.where((work & (work - one)) == zero, work, zero)
+        work[:, :cells] &= ~numpy.bitwise_or.reduce(single[:, peers], axis=2)
+
+        for group in groups:
+            unit = work[:, group] # grids x units x cells
+            once = numpy.zeros(unit.shape[:2], dtype=numpy.uint64)
+            twice = numpy.zeros_like(once)
+            for i in range(unit.shape[2]):
+                twice |= once & unit[:, :, i]
+                once |= unit[:, :, i]
+            broken |= (once != full).any(axis=1)
+            found = unit & (once & ~twice)[:, :, None]
+            broken |= ((found & (found - one)) != zero).any(axis=(1, 2))
+            work[:, group] = numpy.where(found != zero, found, unit)
+
+        broken |= (work[:, :cells] == zero).any(axis=1)
+        bad[live] = broken
+        going = ~broken & (work != before).any(axis=1)
+        if not going.all():
+            masks[live[~going]] = work[~going]
+            live = live[going]
+            work = work[going]
+
+    for grid, row in zip(grids, masks[:, :cells].tolist()):
+        _store(grid, row)
+    return (~bad).tolist()
+
+class PropagationSolver(PooledSolver):
+    """
+    PooledSolver that propagates the puzzle's Grid in a worker.
+
+    Subclasses give the grid through grid, and receive the propagated grid
+    through propagated, or contradiction if it cannot be solved.
+
+    """
+
+    @abc.abstractmethod
+    def grid(self):
+        """Get the Grid to propagate."""
+
+    def propagated(self, grid):
+        """Receive the grid after propagation."""
+
+    def contradiction(self):
+        """Called when the grid turned out to be impossible."""
+
+    def task(self):
+        return _propagate_task, (self.grid(),)
+
+    def solved(self, result):
+        if result == None:
+            self.contradiction()
+        else:
+            self.propagated(result)
+
+def _propagate_task(context, grid):
+    return grid if propagate(grid) else None
@@ -0,0 +1,209 @@
+"""
+Discovers plugins without importing them.
+
+Each plugin module can declare a MANIFEST dictionary literal at its top
+level, giving its "name", file "extension" and "modes". This is read from
+the source without running it, and the results are cached between runs
+until the file changes. The module itself is only imported once the
+puzzle type is really used.
+
+"""
+
+# PuzzleSolver
+# Copyright (C) 2010  Andy Gurden
+#
+#     This file is part of PuzzleSolver.
+#
+#     PuzzleSolver is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     PuzzleSolver is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with PuzzleSolver.  If not, see <http://www.gnu.org/licenses/>.
+
+import ast
+import importlib
+import json
+import logging
+import os
+
+from . import plugin
+from .utility import paths
+
+CACHE_NAME = "plugins.json"
+
+log = logging.getLogger(__name__)
+
+class PluginInfo:
+    """What is known about a plugin before it is imported."""
+
+    def __init__(self, module, name, extension, modes):
+        self.module = module
+        self.name = name
+        self.extension = extension
+        self.modes = tuple(modes)
+        self._cls = None
+
+    def load(self):
+        """Import the plugin and return its Puzzle class."""
+
+        if self._cls == None:
+            self._cls = importlib.import_module(self.module).Puzzle
+        return self._cls
+
+class LazyPuzzleType(plugin.PuzzleType):
+    """Stands in for a plugin's PuzzleType until it is first needed."""
+
+    def __init__(self, info):
+        plugin.PuzzleType.__init__(self)
+        self.info = info
+        self._puzzle = None
+
+    def puzzle(self):
+        """Get the real puzzle type, importing the plugin if needed."""
+
+        if self._puzzle == None:
+            self._puzzle = self.info.load()()
+        return self._puzzle
+
+    def name(self):
+        return self.info.name
+
+    def get(self, mode):
+        return self.puzzle().get(mode)
+
+    def extension(self):
+        return self.info.extension
+
+    def solvePuzzle(self, puzzle, context=None):
+        return self.puzzle().solvePuzzle(puzzle, context)
+
+    def pluginId(self):
+        return self.info.module
+
+    def encodePuzzle(self, puzzle):
+        return self.puzzle().encodePuzzle(puzzle)
+
+    def decodePuzzle(self, data):
+        return self.puzzle().decodePuzzle(data)
+
+class Catalogue:
+    """
+    All known puzzle types, each created on first use and then shared.
+
+    None is always allowed as a member, meaning no puzzle type.
+
+    """
+
+    def __init__(self, infos):
+        self.infos = list(infos)
+        self._types = {}
+
+    def get(self, info):
+        """Get the shared puzzle type for the given PluginInfo."""
+
+        if info not in self._types:
+            self._types[info] = LazyPuzzleType(info)
+        return self._types[info]
+
+    def info(self, puzzle):
+        """Get the PluginInfo for a puzzle type from this catalogue, or None."""
+
+        return puzzle.info if puzzle != None and puzzle in self else None
+
+    def __contains__(self, puzzle):
+        return puzzle == None or self._types.get(getattr(puzzle, "info", None)) is puzzle
+
+    def __iter__(self):
+        return iter(self.infos)
+
+def read_manifest(filename):
+    """
+    Read the MANIFEST from a plugin's source, or None if it has none.
+
+    Raises SyntaxError, ValueError, KeyError or TypeError if the source or
+    its MANIFEST is broken.
+
+    """
+
+    with open(filename, "rb") as file:
+        tree = ast.parse(file.read(), filename)
+    for node in tree.body:
+        if (isinstance(node, ast.Assign) and len(node.targets) == 1 and
+                isinstance(node.targets[0], ast.Name) and node.targets[0].id == "MANIFEST"):
+            manifest = ast.literal_eval(node.value)
+            return {
+                "name": str(manifest["name"]),
+                "extension": manifest.get("extension"),
+                "modes": list(manifest.get("modes", ())),
+            }
+    return None
+
+def _import_manifest(modname):
+    """Build a manifest for a plugin that has none by importing it."""
+
+    m = importlib.import_module(modname)
+    if not hasattr(m, "Puzzle"):
+        return None
+    p = m.Puzzle()
+    return {"name": p.name(), "extension": p.extension(), "modes": []}
+
+def _load_cache():
+    try:
+        with open(paths.cache_file(CACHE_NAME)) as file:
+            return json.load(file)
+    except (IOError, ValueError):
+        return {}
+
+def _save_cache(cache):
+    try:
+        filename = paths.cache_file(CACHE_NAME)
+        with open(filename + ".tmp", "w") as file:
+            json.dump(cache, file)
+        os.replace(filename + ".tmp", filename)
+    except IOError as e: # Only a cache, so discovery carries on without it
+        log.warning("Could not save the plugin cache: %s", e)
+
+def discover(module):
+    """Get a PluginInfo for every plugin inside module, sorted by name."""
+
+    cache = _load_cache()
+    found = {}
+    dirty = False
+    for path in module.__path__:
+        if not os.path.isdir(path):
+            continue
+        for file in sorted(os.listdir(path)):
+            modname = file[:-3]
+            if not file.endswith(".py") or file == "__init__.py" or modname in found:
+                continue
+            filename = os.path.abspath(os.path.join(path, file))
+            stat = os.stat(filename)
+            entry = cache.get(filename)
+            if entry == None or entry["mtime"] != stat.st_mtime_ns or entry["size"] != stat.st_size:
+                try:
+                    manifest = read_manifest(filename)
+                    if manifest == None:
+                        manifest = _import_manifest(module.__name__ + "." + modname)
+                except Exception: # One broken plugin should not stop the rest
+                    log.exception("Skipping plugin %s, it could not be read", modname)
+                    continue
+                entry = {"mtime": stat.st_mtime_ns, "size": stat.st_size, "manifest": manifest}
+                cache[filename] = entry
+                dirty = True
+            found[modname] = entry["manifest"]
+
+    for filename in [f for f in cache if not os.path.exists(f)]:
+        del cache[filename]
+        dirty = True
+    if dirty:
+        _save_cache(cache)
+    infos = [PluginInfo(module.__name__ + "." + modname, **manifest)
+        for modname, manifest in found.items() if manifest != None]
+    return sorted(infos, key=lambda info: info.name)
@@ -0,0 +1,608 @@
+"""
+Boolean satisfiability engine, for plugins whose puzzles reduce to CNF.
+
+Plugins create variables and add clauses to a SatEngine, using DIMACS style
+literals (v for a variable being true, -v for it being false), then solve.
+Helpers cover the cardinality and connectivity rules most grid puzzles
+need. Everything is pure Python so no external solver is required.
+
+"""
+
+# PuzzleSolver
+# Copyright (C) 2010  Andy Gurden
+#
+#     This file is part of PuzzleSolver.
+#
+#     PuzzleSolver is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     PuzzleSolver is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with PuzzleSolver.  If not, see <http://www.gnu.org/licenses/>.
+
+import abc
+import heapq
+
+from .plugin import PooledSolver
+from .progress import NODES, DEPTH, BACKTRACKS, BEST
+
+# Conflicts or decisions between checks for cancellation and progress updates
+CHECK_EVERY = 256
+
+def luby(i):
+    """Get the ith term (from 0) of the Luby sequence 1 1 2 1 1 2 4 1 1 2 ..."""
+
+    size, seq = 1, 0
+    while size < i + 1:
+        seq += 1
+        size = 2 * size + 1
+    while size - 1 != i:
+        size = (size - 1) >> 1
+        seq -= 1
+        i = i % size
+    return 1 << seq
+
+class SatEngine:
+    """
+    Conflict driven clause learning SAT solver.
+
+    Propagation uses two watched literals per clause, conflicts are learnt
+    from at the first unique implication point, branching follows VSIDS
+    activity with saved phases, and restarts follow the Luby sequence.
+
+    Internally literal v is 2v and -v is 2v+1, so negation is l ^ 1 and
+    per-literal state lives in flat lists. Clauses may be added between
+    calls to solve, and learnt clauses are kept across them.
+
+    """
+
+    RESTART_BASE = 100
+    DECAY = 0.95
+
+    def __init__(self):
+        self.vars = 0
+        self.decisions = 0
+        self.conflicts = 0
+        self._value = [0, 0] # Per literal, 1 true, -1 false, 0 unassigned
+        self._level = [0]
+        self._reason = [None]
+        self._activity = [0.0]
+        self._phase = [1] # Polarity last assigned, as the low bit of a literal
+        self._seen = bytearray(1)
+        self._watches = [[], []]
+        self._clauses = []
+        self._learnts = [] # (lbd, clause)
+        self._maxLearnts = 2000
+        self._trail = []
+        self._limits = [] # Trail length at each decision
+        self._head = 0
+        self._heap = []
+        self._inc = 1.0
+        self._ok = True
+        self._checks = []
+        self._model = None
+        self._context = None
+        self._cancelled = False
+        self._deepest = 0
+
+    def newVar(self):
+        """Create a variable and return its number."""
+
+        self.vars += 1
+        v = self.vars
+        self._value += (0, 0)
+        self._level.append(0)
+        self._reason.append(None)
+        self._activity.append(0.0)
+        self._phase.append(1)
+        self._seen.append(0)
+        self._watches += ([], [])
+        heapq.heappush(self._heap, (-0.0, v))
+        return v
+
+    def newVars(self, count):
+        """Create count variables and return their numbers."""
+
+        return [self.newVar() for i in range(count)]
+
+    def _lit(self, x):
+        if x == 0 or abs(x) > self.vars:
+            raise ValueError("No such variable: %r" % (x,))
+        return 2 * x if x > 0 else -2 * x + 1
+
+    def addClause(self, lits):
+        """
+        Require at least one of the literals to be true.
+
+        Returns False if the formula is now known to be unsatisfiable.
+
+        """
+
+        if not self._ok:
+            return False
+        value = self._value
+        clause = []
+        chosen = set()
+        for x in lits:
+            l = self._lit(x)
+            if value[l] == 1 or (l ^ 1) in chosen:
+                return True # Already satisfied, or a tautology
+            if value[l] == -1 or l in chosen:
+                continue
+            chosen.add(l)
+            clause.append(l)
+
+        if not clause:
+            self._ok = False
+        elif len(clause) == 1:
+            self._assign(clause[0], None)
+            self._ok = self._propagate() == None
+        else:
+            self._watches[clause[0]].append(clause)
+            self._watches[clause[1]].append(clause)
+            self._clauses.append(clause)
+        return self._ok
+
+    # Encoding helpers
+
+    def atLeastOne(self, lits):
+        """Require at least one of the literals to be true."""
+
+        return self.addClause(lits)
+
+    def atMostOne(self, lits):
+        """Require at most one of the literals to be true."""
+
+        lits = list(lits)
+        if len(lits) <= 5:
+            for i, a in enumerate(lits):
+                for b in lits[i+1:]:
+                    self.addClause((-a, -b))
+            return self._ok
+        return self.atMost(lits, 1)
+
+    def exactlyOne(self, lits):
+        """Require exactly one of the literals to be true."""
+
+        lits = list(lits)
+        return self.atLeastOne(lits) and self.atMostOne(lits)
+
+    def atMost(self, lits, k):
+        """Require at most k of the literals to be true, with a sequential counter."""
+
+        lits = list(lits)
+        n = len(lits)
+        if k < 0:
+            return self.addClause(())
+        if k >= n:
+            return self._ok
+        if k == 0:
+            for x in lits:
+                self.addClause((-x,))
+            return self._ok
+
+        # s[i][j] means at least j+1 of the first i+1 literals are true
+        s = [self.newVars(k) for i in range(n - 1)]
+        self.addClause((-lits[0], s[0][0]))
+        for j in range(1, k):
+            self.addClause((-s[0][j],))
+        for i in range(1, n - 1):
+            x = lits[i]
+            self.addClause((-x, s[i][0]))
+            self.addClause((-s[i-1][0], s[i][0]))
+            for j in range(1, k):
+                self.addClause((-x, -s[i-1][j-1], s[i][j]))
+                self.addClause((-s[i-1][j], s[i][j]))
+            self.addClause((-x, -s[i-1][k-1]))
+        self.addClause((-lits[n-1], -s[n-2][k-1]))
+        return self._ok
+
+    def atLeast(self, lits, k):
+        """Require at least k of the literals to be true."""
+
+        lits = list(lits)
+        if k <= 0:
+            return self._ok
+        return self.atMost([-x for x in lits], len(lits) - k)
+
+    def exactly(self, lits, k):
+        """Require exactly k of the literals to be true."""
+
+        lits = list(lits)
+        return self.atMost(lits, k) and self.atLeast(lits, k)
+
+    def requireConnected(self, edges, nodes=None):
+        """
+        Require the graph formed by the true edges to be connected.
+
+        edges maps (a, b) node pairs to literals. nodes optionally maps nodes
+        to a literal saying the node is used, or None if it is always used.
+        Other nodes count as used when any of their edges is true.
+
+        This is checked lazily: whenever a solution is found with more than
+        one component, clauses cutting those components apart are added and
+        solving continues.
+
+        """
+
+        edges = dict(edges)
+        nodes = dict(nodes or {})
+        incident = {}
+        for (a, b), lit in edges.items():
+            incident.setdefault(a, []).append((b, lit))
+            incident.setdefault(b, []).append((a, lit))
+        self._checks.append(lambda value: _disconnected(value, edges, nodes, incident))
+
+    # Solving
+
+    def solve(self, context=None):
+        """
+        Search for a solution.
+
+        Returns True once one is found, False if there is none, or None if
+        context (a SolveContext) was cancelled first. Its progress counters
+        show decisions as nodes, conflicts as backtracks, and the most
+        variables assigned at once as best.
+
+        """
+
+        self._context = context
+        self._cancelled = False
+        self._model = None
+        try:
+            while self._ok:
+                result = self._solve()
+                if result != True:
+                    return result
+                extra = [clause for check in self._checks for clause in check(self.value)]
+                if not extra:
+                    return True
+                for clause in extra:
+                    self.addClause(clause)
+                self._model = None
+            return False
+        finally:
+            self._context = None
+            self._report()
+
+    def value(self, x):
+        """Get whether a literal is true in the solution found."""
+
+        if self._model == None:
+            raise ValueError("No solution has been found.")
+        return self._model[x] == 1 if x > 0 else self._model[-x] == 0
+
+    def model(self):
+        """Get the variables that are true in the solution found."""
+
+        if self._model == None:
+            raise ValueError("No solution has been found.")
+        return [v for v in range(1, self.vars + 1) if self._model[v]]
+
+    def _solve(self):
+        restarts = 0
+        while True:
+            result = self._search(self.RESTART_BASE * luby(restarts))
+            restarts += 1
+            if result == True:
+                value = self._value
+                self._model = bytearray(value[2*v] == 1 for v in range(self.vars + 1))
+            self._cancelUntil(0)
+            if result == False:
+                self._ok = False
+                return False
+            if result == True:
+                return True
+            if self._cancelled:
+                return None
+
+    def _search(self, budget):
+        """Search until a solution, no solution, or budget conflicts (then None)."""
+
+        conflicts = 0
+        limits = self._limits
+        while True:
+            conflict = self._propagate()
+            if conflict != None:
+                self.conflicts += 1
+                conflicts += 1
+                if not limits:
+                    return False
+                learnt, back, lbd = self._analyze(conflict)
+                self._cancelUntil(back)
+                if len(learnt) == 1:
+                    self._assign(learnt[0], None)
+                else:
+                    self._watches[learnt[0]].append(learnt)
+                    self._watches[learnt[1]].append(learnt)
+                    self._learnts.append((lbd, learnt))
+                    self._assign(learnt[0], learnt)
+                self._inc /= self.DECAY
+                if self.conflicts % CHECK_EVERY == 0 and self._check():
+                    return None
+            else:
+                if conflicts >= budget:
+                    return None
+                if len(self._learnts) - len(self._trail) >= self._maxLearnts:
+                    self._reduce()
+                lit = self._pick()
+                if lit == None:
+                    return True
+                self.decisions += 1
+                if self.decisions % CHECK_EVERY == 0 and self._check():
+                    return None
+                limits.append(len(self._trail))
+                self._assign(lit, None)
+
+    def _check(self):
+        """Update progress and return whether the search should stop."""
+
+        if len(self._trail) > self._deepest:
+            self._deepest = len(self._trail)
+        if self._context == None:
+            return False
+        self._report()
+        self._cancelled = self._context.cancelled()
+        return self._cancelled
+
+    def _report(self):
+        if self._context != None:
+            values = self._context.progress.values
+            values[NODES] = self.decisions
+            values[DEPTH] = len(self._limits)
+            values[BACKTRACKS] = self.conflicts
+            values[BEST] = self._deepest
+
+    def _assign(self, lit, reason):
+        self._value[lit] = 1
+        self._value[lit ^ 1] = -1
+        self._level[lit >> 1] = len(self._limits)
+        self._reason[lit >> 1] = reason
+        self._trail.append(lit)
+
+    def _propagate(self):
+        """Propagate assignments on the trail, returning a conflicting clause or None."""
+
+        value, level, reason = self._value, self._level, self._reason
+        watches, trail = self._watches, self._trail
+        depth = len(self._limits)
+        head = self._head
+        while head < len(trail):
+            false = trail[head] ^ 1
+            head += 1
+            watching = watches[false]
+            i = j = 0
+            n = len(watching)
+            while i < n:
+                clause = watching[i]
+                i += 1
+                if clause[0] == false:
+                    clause[0], clause[1] = clause[1], false
+                first = clause[0]
+                if value[first] == 1:
+                    watching[j] = clause
+                    j += 1
+                    continue
+                for k in range(2, len(clause)):
+                    other = clause[k]
+                    if value[other] != -1:
+                        clause[1], clause[k] = other, false
+                        watches[other].append(clause)
+                        break
+                else:
+                    watching[j] = clause
+                    j += 1
+                    if value[first] == -1:
+                        while i < n:
+                            watching[j] = watching[i]
+                            i += 1
+                            j += 1
+                        del watching[j:]
+                        self._head = len(trail)
+                        return clause
+                    value[first] = 1
+                    value[first ^ 1] = -1
+                    level[first >> 1] = depth
+                    reason[first >> 1] = clause
+                    trail.append(first)
+            del watching[j:]
+        self._head = head
+        return None
+
+    def _analyze(self, conflict):
+        """Learn a clause from a conflict, returning (clause, backjump level, lbd)."""
+
+        seen, level, reason, trail = self._seen, self._level, self._reason, self._trail
+        depth = len(self._limits)
+        learnt = [0]
+        pending = 0
+        lit = None
+        i = len(trail) - 1
+        clause = conflict
+        while True:
+            for q in (clause if lit == None else clause[1:]):
+                v = q >> 1
+                if not seen[v] and level[v] > 0:
+                    seen[v] = 1
+                    self._bump(v)
+                    if level[v] >= depth:
+                        pending += 1
+                    else:
+                        learnt.append(q)
+            while not seen[trail[i] >> 1]:
+                i -= 1
+            lit = trail[i]
+            i -= 1
+            seen[lit >> 1] = 0
+            pending -= 1
+            if pending == 0:
+                break
+            clause = reason[lit >> 1]
+        learnt[0] = lit ^ 1
+
+        # Drop literals already implied by the rest of the clause
+        kept = [learnt[0]]
+        for q in learnt[1:]:
+            r = reason[q >> 1]
+            if r == None or any(not seen[x >> 1] and level[x >> 1] > 0 for x in r[1:]):
+                kept.append(q)
+        for q in learnt[1:]:
+            seen[q >> 1] = 0
+
+        if len(kept) == 1:
+            return kept, 0, 1
+        best = max(range(1, len(kept)), key=lambda k: level[kept[k] >> 1])
+        kept[1], kept[best] = kept[best], kept[1]
+        lbd = len(set(level[q >> 1] for q in kept))
+        return kept, level[kept[1] >> 1], lbd
+
+    def _bump(self, v):
+        activity = self._activity
+        activity[v] += self._inc
+        if activity[v] > 1e100:
+            for i in range(len(activity)):
+                activity[i] *= 1e-100
+            self._inc *= 1e-100
+            self._rebuildHeap()
+        elif self._value[2 * v] == 0:
+            heapq.heappush(self._heap, (-activity[v], v))
+
+    def _rebuildHeap(self):
+        value, activity = self._value, self._activity
+        self._heap = [(-activity[v], v) for v in range(1, self.vars + 1) if value[2 * v] == 0]
+        heapq.heapify(self._heap)
+
+    def _pick(self):
+        """Choose the unassigned variable with the highest activity, as a literal."""
+
+        heap, value, activity = self._heap, self._value, self._activity
+        if len(heap) > 4 * self.vars + 1000:
+            self._rebuildHeap()
+            heap = self._heap
+        while heap:
+            a, v = heapq.heappop(heap)
+            if value[2 * v] == 0 and -a == activity[v]:
+                return 2 * v | self._phase[v]
+        return None
+
+    def _cancelUntil(self, depth):
+        limits = self._limits
+        if len(limits) <= depth:
+            return
+        value, reason, phase, activity = self._value, self._reason, self._phase, self._activity
+        trail, heap = self._trail, self._heap
+        start = limits[depth]
+        for i in range(len(trail) - 1, start - 1, -1):
+            lit = trail[i]
+            v = lit >> 1
+            value[lit] = value[lit ^ 1] = 0
+            reason[v] = None
+            phase[v] = lit & 1
+            heapq.heappush(heap, (-activity[v], v))
+        del trail[start:]
+        del limits[depth:]
+        self._head = start
+
+    def _reduce(self):
+        """Forget the less useful half of the learnt clauses."""
+
+        reason, value = self._reason, self._value
+        self._learnts.sort(key=lambda entry: entry[0])
+        half = len(self._learnts) // 2
+        kept = []
+        removed = set()
+        for i, (lbd, clause) in enumerate(self._learnts):
+            first = clause[0]
+            if i < half or lbd <= 2 or (reason[first >> 1] is clause and value[first] == 1):
+                kept.append((lbd, clause))
+            else:
+                removed.add(id(clause))
+        self._learnts = kept
+        self._watches = [[c for c in w if id(c) not in removed] for w in self._watches]
+        self._maxLearnts = int(self._maxLearnts * 1.1)
+
+def _disconnected(value, edges, nodes, incident):
+    """Get clauses cutting apart the components of a disconnected solution."""
+
+    used = set(n for n, lit in nodes.items() if lit == None or value(lit))
+    active = {}
+    for (a, b), lit in edges.items():
+        if value(lit):
+            used.add(a)
+            used.add(b)
+            active.setdefault(a, []).append(lit)
+            active.setdefault(b, []).append(lit)
+
+    components = []
+    unvisited = set(used)
+    while unvisited:
+        start = unvisited.pop()
+        component = {start}
+        stack = [start]
+        while stack:
+            for other, lit in incident.get(stack.pop(), ()):
+                if other in unvisited and value(lit):
+                    unvisited.discard(other)
+                    component.add(other)
+                    stack.append(other)
+        components.append(component)
+    if len(components) < 2:
+        return []
+
+    def witness(component):
+        # A literal true in this solution that is false unless the component is in use
+        if any(n in nodes and nodes[n] == None for n in component):
+            return [] # Always in use
+        for n in component:
+            if n in nodes and value(nodes[n]):
+                return [-nodes[n]]
+        return [-next(active[n][0] for n in component if n in active)]
+
+    clauses = []
+    for i, component in enumerate(components):
+        other = components[i - 1]
+        cut = set(lit for n in component for o, lit in incident.get(n, ()) if o not in component)
+        clauses.append(witness(component) + witness(other) + sorted(cut))
+    return clauses
+
+class SatSolver(PooledSolver):
+    """
+    PooledSolver that solves the puzzle as a SAT formula in a worker.
+
+    Subclasses give a picklable function through encoding, which adds the
+    puzzle's clauses to a fresh SatEngine in the worker, and then receive
+    the true variables of the solution through satisfied.
+
+    """
+
+    @abc.abstractmethod
+    def encoding(self):
+        """Get (encode, args) to be called as encode(engine, *args) in the worker."""
+
+    def satisfied(self, model):
+        """Receive the list of variables true in the solution."""
+
+    def unsatisfiable(self):
+        """Called when the puzzle has no solution."""
+
+    def task(self):
+        encode, args = self.encoding()
+        return _solve_formula, (encode, args)
+
+    def solved(self, result):
+        if result == False:
+            self.unsatisfiable()
+        elif result != None:
+            self.satisfied(result)
+
+def _solve_formula(context, encode, args):
+    engine = SatEngine()
+    encode(engine, *args)
+    result = engine.solve(context)
+    return engine.model() if result else result
@@ -0,0 +1,244 @@
+"""
+File format for saved puzzles.
+
+Every file starts with a fixed size header giving the plugin that saved it,
+the format version and the size of the body, so files can be listed and
+checked without reading the rest. The body is whatever the plugin encodes
+the puzzle as, compressed unless that would not make it smaller. Plugins that do not encode their own
+puzzles have them pickled instead, and files from before this format (a
+bare pickle) can still be read.
+
+"""
+
+# PuzzleSolver
+# Copyright (C) 2010  Andy Gurden
+#
+#     This file is part of PuzzleSolver.
+#
+#     PuzzleSolver is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     PuzzleSolver is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with PuzzleSolver.  If not, see <http://www.gnu.org/licenses/>.
+
+import bz2
+import hashlib
+import lzma
+import mmap
+import os
+import pickle
+import struct
+import tempfile
+import zlib
+
+MAGIC = b"PZSV"
+VERSION = 1
+
+# magic, version, codec, encoding, plugin id, raw size, stored size, padding
+_HEADER = struct.Struct("<4sHBB32sQQ8x")
+HEADER_SIZE = _HEADER.size
+
+# Bodies bigger than this are read through mmap rather than into memory
+MMAP_THRESHOLD = 1 << 20
+
+CODECS = {
+    None: (0, None, None),
+    "zlib": (1, zlib.compress, zlib.decompress),
+    "bz2": (2, bz2.compress, bz2.decompress),
+    "lzma": (3, lzma.compress, lzma.decompress),
+}
+_CODEC_NAMES = {num: name for name, (num, c, d) in CODECS.items()}
+
+ENCODED = 0 # Body from PuzzleType.encodePuzzle
+PICKLED = 1 # Body is a pickle, for plugins that do not encode
+
+class SaveFormatError(Exception):
+    """The file is not a readable puzzle."""
+
+class Header:
+    """Information about a saved puzzle, read without loading the puzzle."""
+
+    def __init__(self, plugin, codec, encoding, rawSize, storedSize, version=VERSION):
+        self.plugin = plugin
+        self.codec = codec
+        self.encoding = encoding
+        self.rawSize = rawSize
+        self.storedSize = storedSize
+        self.version = version
+
+    def pack(self):
+        plugin = self.plugin.encode("utf-8")
+        if len(plugin) > 32:
+            raise SaveFormatError("Plugin id is too long: " + self.plugin)
+        return _HEADER.pack(MAGIC, self.version, CODECS[self.codec][0],
+            self.encoding, plugin, self.rawSize, self.storedSize)
+
+    @classmethod
+    def unpack(cls, data):
+        if len(data) < HEADER_SIZE or data[:4] != MAGIC:
+            return None
+        magic, version, codec, encoding, plugin, raw, stored = _HEADER.unpack_from(data)
+        if version > VERSION:
+            raise SaveFormatError("File is from a newer version of the format.")
+        if codec not in _CODEC_NAMES:
+            raise SaveFormatError("Unknown compression in file.")
+        try:
+            plugin = plugin.rstrip(b"\0").decode("utf-8")
+        except UnicodeDecodeError:
+            raise SaveFormatError("Plugin id in file is corrupted.")
+        return cls(plugin, _CODEC_NAMES[codec], encoding, raw, stored, version)
+
+def encode(ptype, puzzle, codec="zlib"):
+    """
+    Get the bytes for a whole saved puzzle.
+
+    The body is left uncompressed if codec does not make it any smaller.
+
+    """
+
+    body = ptype.encodePuzzle(puzzle)
+    encoding = ENCODED
+    if body == None:
+        body = pickle.dumps(puzzle, pickle.HIGHEST_PROTOCOL)
+        encoding = PICKLED
+    raw = len(body)
+    compress = CODECS[codec][1]
+    if compress != None:
+        packed = compress(body)
+        if len(packed) < raw:
+            body = packed
+        else:
+            codec = None
+    return Header(ptype.pluginId(), codec, encoding, raw, len(body)).pack() + body
+
+def content_hash(ptype, puzzle):
+    """
+    Get a hash of a puzzle's contents, the same however it was saved or loaded.
+
+    Telemetry and checkpoints key puzzles by this. It is not the same as
+    library.file_hash, which hashes the bytes of a saved file.
+
+    """
+
+    return hashlib.sha256(encode(ptype, puzzle, None)).hexdigest()
+
+def file_content_hash(filename):
+    """
+    Get content_hash for the puzzle saved in filename, without its plugin.
+
+    Returns None for files saved before this format, whose puzzles can only
+    be hashed once loaded.
+
+    """
+
+    with open(filename, "rb") as file:
+        header = Header.unpack(file.read(HEADER_SIZE))
+        if header == None:
+            return None
+        body = _decompress(header, file.read(header.storedSize))
+    raw = Header(header.plugin, None, header.encoding, len(body), len(body))
+    return hashlib.sha256(raw.pack() + body).hexdigest()
+
+def write(filename, ptype, puzzle, codec="zlib"):
+    """
+    Save puzzle to filename, as encoded by the puzzle type ptype.
+
+    The file is written under a temporary name then moved into place, so a
+    failed save never leaves a broken file behind.
+
+    """
+
+    data = encode(ptype, puzzle, codec)
+    handle, temp = tempfile.mkstemp(".tmp", dir=os.path.dirname(os.path.abspath(filename)))
+    try:
+        os.chmod(temp, _file_mode(filename)) # Not just readable by us, as mkstemp leaves it
+        with os.fdopen(handle, "wb") as file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp, filename)
+    except BaseException:
+        try:
+            os.remove(temp)
+        except OSError:
+            pass
+        raise
+
+def _file_mode(filename):
+    """Get the permissions for a file saved as filename, kept from any file being replaced."""
+
+    try:
+        return os.stat(filename).st_mode & 0o777
+    except OSError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+def read_header(filename):
+    """
+    Read just the header of a saved puzzle.
+
+    Returns None for files saved before this format, which have no header.
+
+    """
+
+    with open(filename, "rb") as file:
+        return Header.unpack(file.read(HEADER_SIZE))
+
+def read(filename, ptype):
+    """Load a puzzle saved by the puzzle type ptype."""
+
+    with open(filename, "rb") as file:
+        header = Header.unpack(file.read(HEADER_SIZE))
+        if header == None: # Bare pickle from before this format
+            file.seek(0)
+            return _unpickle(file.read())
+        if header.plugin != ptype.pluginId():
+            raise SaveFormatError("File was saved by another plugin: " + header.plugin)
+
+        if header.storedSize < MMAP_THRESHOLD:
+            return _decode(header, file.read(header.storedSize), ptype)
+
+        if os.fstat(file.fileno()).st_size < HEADER_SIZE + header.storedSize:
+            raise SaveFormatError("File is truncated.")
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            body = memoryview(mapped)[HEADER_SIZE:HEADER_SIZE + header.storedSize]
+            try:
+                return _decode(header, body, ptype)
+            finally:
+                body.release()
+
+def _decompress(header, body):
+    if len(body) != header.storedSize:
+        raise SaveFormatError("File is truncated.")
+    decompress = CODECS[header.codec][2]
+    try:
+        if decompress != None:
+            body = decompress(body)
+    except (zlib.error, OSError, lzma.LZMAError, ValueError):
+        raise SaveFormatError("File body could not be decompressed.")
+    if len(body) != header.rawSize:
+        raise SaveFormatError("File body is the wrong size.")
+    return body
+
+def _decode(header, body, ptype):
+    body = _decompress(header, body)
+    if header.encoding == PICKLED:
+        return _unpickle(body)
+    try:
+        return ptype.decodePuzzle(body)
+    except Exception as e: # Plugins may fail in any way on a corrupt body
+        raise SaveFormatError("File body could not be decoded.") from e
+
+def _unpickle(data):
+    try:
+        return pickle.loads(data)
+    except Exception as e: # Corrupt pickles fail in many different ways
+        raise SaveFormatError("File could not be unpickled.") from e
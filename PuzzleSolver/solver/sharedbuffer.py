@@ -0,0 +1,82 @@
+"""
+Shared memory buffers for handing puzzle data to a solving process.
+
+"""
+
+# PuzzleSolver
+# Copyright (C) 2010  Andy Gurden
+#
+#     This file is part of PuzzleSolver.
+#
+#     PuzzleSolver is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     PuzzleSolver is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with PuzzleSolver.  If not, see <http://www.gnu.org/licenses/>.
+
+from multiprocessing import shared_memory
+
+class SharedBuffer:
+    """
+    Fixed size block of memory seen by both the GUI and a solving process.
+
+    Pickling a buffer only sends its name, and unpickling attaches to the
+    same memory, so it can be passed as a task argument without copying
+    its contents. Both sides read and write through view, or a typed view
+    from cast, and the side that created it frees it with close.
+
+    """
+
+    def __init__(self, size, name=None):
+        self.size = size
+        self._owner = name == None
+        if self._owner:
+            self._shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        else:
+            self._shm = shared_memory.SharedMemory(name)
+        self._views = []
+        self.view = self._track(self._shm.buf[:size])
+
+    @classmethod
+    def publish(cls, data):
+        """Create a buffer holding a copy of the bytes-like data."""
+
+        data = memoryview(data).cast("B")
+        buffer = cls(len(data))
+        buffer.view[:] = data
+        return buffer
+
+    def __getstate__(self):
+        return {"size": self.size, "name": self._shm.name}
+
+    def __setstate__(self, state):
+        self.__init__(state["size"], state["name"])
+
+    def cast(self, format, shape=None):
+        """Get a view of the buffer as items of a struct format, like "q"."""
+
+        return self._track(self.view.cast(format, shape) if shape else self.view.cast(format))
+
+    def close(self):
+        """Release this side's views, freeing the memory if this side created it."""
+
+        if self._shm == None:
+            return
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+        self._shm = None
+
+    def _track(self, view):
+        self._views.append(view)
+        return view
@@ -23,31 +23,51 @@ Sorry for globals, these are needed for access by the entire program.
 #     You should have received a copy of the GNU General Public License
 #     along with PuzzleSolver.  If not, see <http://www.gnu.org/licenses/>.
 
+import collections
+import contextlib
+import time
+
 from . import plugin
+from . import profiling
+from .utility.lrucache import LRUCache
+
+_pending = None # Changes waiting for the current transaction to finish
+
+# When set, called as timer(callback, seconds) after each change callback
+timer = None
 
 class WatchedValue:
     """Keeps track of an updateable value."""
 
     def __init__(self, default, *allowable):
         self._value = default
-        self._callbacks = set()
-        self._vitos = set()
+        self._callbacks = []
+        self._vitos = []
         self.allowable = allowable if allowable else None
         self.default = default
 
-    def onChange(self, callback):
-        """Add a callback to be called with new value on change."""
+    def onChange(self, callback, priority=0):
+        """
+        Add a callback to be called with new value on change.
+
+        Callbacks with a lower priority are called first, and ones with the
+        same priority are called in the order they were added.
+
+        """
 
-        self._callbacks.add(callback)
+        self._callbacks.append((priority, len(self._callbacks), callback))
+        self._callbacks.sort(key=lambda c: c[:2])
 
     def vitoChange(self, callback):
         """Add a callback that can vito a change."""
 
-        self._vitos.add(callback)
+        self._vitos.append(callback)
         
     def value(self):
-        """Get the current value for this variable."""
+        """Get the current value for this variable, including uncommitted changes."""
 
+        if _pending != None and self in _pending:
+            return _pending[self]
         return self._value
 
     def change(self, to):
@@ -55,14 +75,29 @@ class WatchedValue:
         if self.allowable != None and to not in self.allowable:
             return False
 
+        if _pending != None and self in _pending and _pending[self] == to:
+            return True # Already agreed to in this transaction
+
         if any(vito(to) for vito in self._vitos):
             return False
 
-        for cb in self._callbacks:
-            cb(to)
-        self._value = to
+        if _pending != None:
+            _pending[self] = to
+        else:
+            self._commit(to)
         return True
 
+    def _commit(self, to):
+        for priority, order, cb in self._callbacks:
+            timed = timer
+            if timed == None:
+                cb(to)
+            else:
+                started = time.perf_counter()
+                cb(to)
+                timed(cb, time.perf_counter() - started)
+        self._value = to
+
     def attempt(self):
         """
         Change the variable to default.
@@ -74,6 +109,35 @@ class WatchedValue:
 
         return self.change(self.default)
 
+@contextlib.contextmanager
+def transaction():
+    """
+    Hold back change callbacks until the end of the block.
+
+    Vitos are still checked straight away, but callbacks are only called
+    once the outermost transaction finishes, and only once per variable with
+    its final value. Changes made by those callbacks are merged in too.
+    Repeating a change that is already waiting does not ask the vitos again,
+    so wiping.attempt() prompts at most once however many changes need it.
+
+    """
+
+    global _pending
+    if _pending != None: # Already inside one
+        yield
+        return
+
+    _pending = collections.OrderedDict()
+    try:
+        yield
+    finally:
+        try:
+            while _pending:
+                watched, to = _pending.popitem(last=False)
+                watched._commit(to)
+        finally:
+            _pending = None
+
 # GLOBAL STATE VARIABLES
 
 puzzle = WatchedValue(None)
@@ -81,15 +145,42 @@ mode = WatchedValue(None, "CREATE", "PLAY")
 quitting = WatchedValue(None)
 solving = WatchedValue(None) # Holds current solver or None
 wiping = WatchedValue(None) # Wiping puzzle info
+profile = WatchedValue(None, None, *profiling.MODES) # Profiling mode for new solves
+racing = WatchedValue(True, True, False) # Race views' strategies when they offer several
 
 view = WatchedValue(plugin.DummyView())
 
+# Recently used views, keyed by (puzzle, mode)
+VIEW_CACHE_SIZE = 6
+views = LRUCache(VIEW_CACHE_SIZE)
+views.onEvict(lambda key, v: v.release())
+
 def update_puzzle(p):
     update_view(p, mode.value())
 def update_mode(m):
     update_view(puzzle.value(), m)
 def update_view(p, m):
-    view.change(plugin.DummyView() if p == None or m == None else p.get(m))
-
-puzzle.onChange(update_puzzle)
-mode.onChange(update_mode)
+    if p == None or m == None:
+        switch_view(plugin.DummyView())
+        return
+    v = views.get((p, m))
+    if v == None:
+        v = p.get(m)
+        views.put((p, m), v)
+    elif v is view.value():
+        return
+    else:
+        v.rehydrate()
+    switch_view(v)
+def switch_view(v):
+    # Changes still unsaved when a view is left were thrown away by the user
+    old = view.value()
+    if old.changed():
+        for key, cached in views.items():
+            if cached is old:
+                views.remove(key)
+    view.change(v)
+
+# Keep the view in step before other callbacks see the new puzzle or mode
+puzzle.onChange(update_puzzle, priority=-1)
+mode.onChange(update_mode, priority=-1)
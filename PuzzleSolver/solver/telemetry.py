@@ -0,0 +1,228 @@
+"""
+Log of every solve, for tracking how long solving takes over time.
+
+Each solve appends one JSON object per line to a log in the user's data
+directory, which is rotated once it gets large. Records hold the plugin,
+mode and content hash of the puzzle, when the solve started and ended, its
+wall and CPU time, memory use, the search nodes visited and the outcome,
+one of OUTCOMES whether solved in the GUI or in a batch. Failed solves
+say why in error.
+
+Solvers run in long lived workers, whose peak memory only ever grows, so a
+record holds both that peak (worker_rss) and how much the solve raised it
+(rss_growth). A solve using less than an earlier one in the same worker
+has no growth.
+
+Writes and rotation are done under a lock file where fcntl is available,
+so several processes can share the log.
+
+"""
+
+# PuzzleSolver
+# Copyright (C) 2010  Andy Gurden
+#
+#     This file is part of PuzzleSolver.
+#
+#     PuzzleSolver is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     PuzzleSolver is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with PuzzleSolver.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+import math
+import os
+import sys
+import time
+
+try:
+    import fcntl
+    import resource
+except ImportError: # Not on Windows
+    fcntl = resource = None
+
+from . import saveformat
+from .utility import paths
+
+LOG_NAME = "telemetry.jsonl"
+MAX_BYTES = 4 << 20 # Size at which the log is rotated
+BACKUPS = 3 # Rotated logs kept, as telemetry.jsonl.1 and so on
+
+settings = {"filename": None, "enabled": True} # None for the default log
+
+PERCENTILES = (50, 90, 99)
+OUTCOMES = ("solved", "unsolved", "cancelled", "failed")
+
+_wins = None # Plugin to {strategy: races won}, read from the log when first needed
+
+def peak_rss():
+    """Get the most memory this process has used in bytes, or 0 if unknown."""
+
+    if resource == None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+def begin():
+    """Get what usage needs to measure a solve starting now in this process."""
+
+    return time.process_time(), peak_rss()
+
+def usage(start):
+    """Get resource use for a solve in this process, given begin from its start."""
+
+    cpu, rss = start
+    peak = peak_rss()
+    return {"cpu": time.process_time() - cpu, "worker_rss": peak, "rss_growth": peak - rss}
+
+def log_file():
+    return settings["filename"] or paths.data_file(LOG_NAME)
+
+def record(entry):
+    """Append a record to the log, rotating it first if it is full."""
+
+    if not settings["enabled"]:
+        return
+    line = json.dumps(entry, sort_keys=True) + "\n"
+    filename = log_file()
+    try:
+        with open(filename + ".lock", "a") as lock:
+            if fcntl != None:
+                fcntl.flock(lock, fcntl.LOCK_EX) # Released as it is closed
+            if os.path.exists(filename) and os.path.getsize(filename) + len(line) > MAX_BYTES:
+                for i in range(BACKUPS - 1, 0, -1):
+                    if os.path.exists("%s.%d" % (filename, i)):
+                        os.replace("%s.%d" % (filename, i), "%s.%d" % (filename, i + 1))
+                os.replace(filename, filename + ".1")
+            with open(filename, "a") as file:
+                file.write(line)
+    except IOError: # Never worth failing a solve over
+        return
+    if _wins != None:
+        _count_win(entry)
+
+def records(filename=None):
+    """Read every record from the log and its rotated copies, oldest first."""
+
+    filename = filename or log_file()
+    names = ["%s.%d" % (filename, i) for i in range(BACKUPS, 0, -1)] + [filename]
+    result = []
+    for name in names:
+        try:
+            with open(name) as file:
+                for line in file:
+                    try:
+                        result.append(json.loads(line))
+                    except ValueError: # Partly written line
+                        pass
+        except IOError:
+            pass
+    return result
+
+class Run:
+    """
+    Telemetry for one solve, written once it finishes.
+
+    The puzzle is hashed as it would be saved, so records for the same
+    puzzle match however it was loaded.
+
+    """
+
+    def __init__(self, ptype, mode, puzzle, **extra):
+        self.entry = {"plugin": ptype.pluginId() if ptype != None else None, "mode": mode}
+        self.entry.update(extra)
+        try:
+            self.entry["hash"] = saveformat.content_hash(ptype, puzzle)
+        except Exception: # Puzzles that cannot be saved have no hash
+            self.entry["hash"] = None
+        self.entry["start"] = time.time()
+        self._started = time.perf_counter()
+        self.done = False
+
+    def finish(self, outcome, nodes=None, used=None, write=True, error=None, **extra):
+        """
+        Complete the record, with resource use from usage in the solving process.
+
+        outcome is one of OUTCOMES, and error a short reason for a failure.
+
+        It is written to the log unless write is False, when the caller is
+        left to pass the entry to record, such as from another process.
+
+        """
+
+        if self.done:
+            return
+        self.done = True
+        self.entry.update(outcome=outcome, error=error, nodes=nodes, end=time.time(),
+            wall=time.perf_counter() - self._started, **extra)
+        self.entry.update(used or {"cpu": None, "worker_rss": None, "rss_growth": None})
+        if write:
+            record(self.entry)
+
+def _count_win(entry):
+    if entry.get("won"):
+        strategies = _wins.setdefault(entry.get("plugin"), {})
+        strategies[entry.get("strategy")] = strategies.get(entry.get("strategy"), 0) + 1
+
+def wins(plugin):
+    """Get how many races each strategy of a plugin has won, as {strategy: wins}."""
+
+    global _wins
+    if _wins == None:
+        _wins = {}
+        for entry in records():
+            _count_win(entry)
+    return dict(_wins.get(plugin, {}))
+
+def percentile(values, p):
+    """Get the pth percentile of sorted values, by nearest rank."""
+
+    if not values:
+        return None
+    return values[max(0, math.ceil(p / 100 * len(values)) - 1)]
+
+def summarise(out=sys.stdout, filename=None):
+    """Write percentiles of each plugin's solves from the log to out."""
+
+    plugins = {}
+    for entry in records(filename):
+        plugins.setdefault(entry.get("plugin") or "?", []).append(entry)
+    if not plugins:
+        print("No solves have been recorded.", file=out)
+        return 0
+
+    def stats(entries, field, format, scale=1):
+        values = sorted(e[field] / scale for e in entries if e.get(field) != None)
+        if not values:
+            return "-"
+        return " ".join(format % percentile(values, p) for p in PERCENTILES)
+
+    print("%-24s %6s  %-26s %-26s %-23s %-23s %s" % ("plugin", "runs", "wall p50/p90/p99 (s)",
+        "cpu p50/p90/p99 (s)", "grown p50/p90/p99 (MB)", "worker p50/p90/p99 (MB)",
+        "outcomes"), file=out)
+    for name, entries in sorted(plugins.items()):
+        outcomes = {}
+        for e in entries:
+            outcomes[e.get("outcome")] = outcomes.get(e.get("outcome"), 0) + 1
+        print("%-24s %6d  %-26s %-26s %-23s %-23s %s" % (name, len(entries),
+            stats(entries, "wall", "%8.3f"), stats(entries, "cpu", "%8.3f"),
+            stats(entries, "rss_growth", "%7.1f", 1 << 20),
+            stats(entries, "worker_rss", "%7.1f", 1 << 20),
+            ", ".join("%d %s" % (n, o) for o, n in sorted(outcomes.items(), key=str))), file=out)
+
+    for name, entries in sorted(plugins.items()):
+        won = {}
+        for e in entries:
+            if e.get("won"):
+                won[e.get("strategy")] = won.get(e.get("strategy"), 0) + 1
+        if won:
+            print("%s races won: %s" % (name, ", ".join("%s %d" % (s, n)
+                for s, n in sorted(won.items(), key=lambda w: -w[1]))), file=out)
+    return 0
@@ -0,0 +1,185 @@
+"""
+Memory of positions a search has already explored.
+
+Searches over moves often reach the same position by different orders of
+moves. Zobrist hashing gives each position a 64 bit key that can be updated
+as moves are made and undone, and a TranspositionTable remembers what was
+learnt about each key within a fixed amount of memory.
+
+"""
+
+# PuzzleSolver
+# Copyright (C) 2010  Andy Gurden
+#
+#     This file is part of PuzzleSolver.
+#
+#     PuzzleSolver is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     PuzzleSolver is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with PuzzleSolver.  If not, see <http://www.gnu.org/licenses/>.
+
+import array
+import random
+
+from . import progress
+
+# Statistics kept by a table, in the order given by TranspositionTable.stats
+STATS = ("table_hits", "table_misses", "table_used", "table_replaced")
+
+# Progress fields for solvers using a table, see report
+FIELDS = progress.FIELDS + STATS
+
+DEPTH_PREFERRED = "depth"
+ALWAYS_REPLACE = "always"
+
+# Bytes per entry, a key, a value and a depth
+ENTRY_SIZE = 8 + 8 + 4
+
+class Zobrist:
+    """
+    Random keys for each value of each cell of a board.
+
+    The key of a board is the XOR of the keys of its cells' values, so
+    changing one cell only needs two XORs. The same seed always gives the
+    same keys, so keys agree between processes and runs.
+
+    """
+
+    def __init__(self, cells, values, seed=0):
+        self.cells = cells
+        self.values = values
+        rand = random.Random(seed)
+        self.keys = array.array("Q", (rand.getrandbits(64) for i in range(cells * values)))
+
+    def key(self, cell, value):
+        """Get the key for one cell holding value."""
+
+        return self.keys[cell * self.values + value]
+
+    def hash(self, board):
+        """Get the key of a whole board, given as a sequence of cell values."""
+
+        keys, values = self.keys, self.values
+        h = 0
+        for cell, value in enumerate(board):
+            h ^= keys[cell * values + value]
+        return h
+
+    def change(self, h, cell, old, new):
+        """Get the key after one cell changes from old to new."""
+
+        base = cell * self.values
+        return h ^ self.keys[base + old] ^ self.keys[base + new]
+
+class TranspositionTable:
+    """
+    Fixed size table from position keys to a value and search depth.
+
+    The table holds a power of two number of entries fitting in budget
+    bytes, each key having one slot. When two keys want the same slot the
+    depth-preferred policy keeps whichever was searched deeper, while
+    always-replace keeps the newest. Lookups may very rarely return an
+    entry for another position whose key matches.
+
+    """
+
+    def __init__(self, budget=1 << 24, policy=DEPTH_PREFERRED):
+        if policy not in (DEPTH_PREFERRED, ALWAYS_REPLACE):
+            raise ValueError("Unknown replacement policy: %r" % (policy,))
+        self.budget = budget
+        size = 1
+        while size * 2 * ENTRY_SIZE <= budget:
+            size *= 2
+        self.size = size
+        self.policy = policy
+        self._mask = size - 1
+        self._keys = array.array("Q", bytes(8 * size))
+        self._values = array.array("q", bytes(8 * size))
+        self._depths = array.array("i", bytes(4 * size))
+        self.hits = 0
+        self.misses = 0
+        self.used = 0
+        self.replaced = 0
+
+    def lookup(self, key):
+        """Get (value, depth) stored for key, or None."""
+
+        key = key or 1 # Zero marks an empty slot
+        slot = key & self._mask
+        if self._keys[slot] == key:
+            self.hits += 1
+            return self._values[slot], self._depths[slot]
+        self.misses += 1
+        return None
+
+    def store(self, key, value, depth=0):
+        """Remember value for key, unless the policy keeps what is there."""
+
+        key = key or 1
+        slot = key & self._mask
+        old = self._keys[slot]
+        if old == 0:
+            self.used += 1
+        elif old != key:
+            if self.policy == DEPTH_PREFERRED and depth < self._depths[slot]:
+                return False
+            self.replaced += 1
+        self._keys[slot] = key
+        self._values[slot] = value
+        self._depths[slot] = depth
+        return True
+
+    def visit(self, key, depth=0):
+        """
+        Check for a position already explored to at least depth.
+
+        Otherwise records it as explored to depth and returns False, which
+        suits searches that only need to skip repeated positions.
+
+        """
+
+        found = self.lookup(key)
+        if found != None and found[1] >= depth:
+            return True
+        self.store(key, 0, depth)
+        return False
+
+    def clear(self):
+        """Forget every entry and reset the statistics."""
+
+        self.__init__(self.budget, self.policy)
+
+    def hitRate(self):
+        """Get the fraction of lookups that found an entry."""
+
+        probes = self.hits + self.misses
+        return self.hits / probes if probes else 0.0
+
+    def stats(self):
+        """Get the statistics named by STATS."""
+
+        return (self.hits, self.misses, self.used, self.replaced)
+
+    def report(self, progress):
+        """Copy the statistics into a Progress with the table fields of FIELDS."""
+
+        report(progress, self.stats())
+
+def report(progress, stats):
+    """
+    Copy statistics from TranspositionTable.stats, or summed from several
+    tables, into a Progress with the table fields of FIELDS.
+
+    """
+
+    base = progress.fields.index(STATS[0])
+    for i, value in enumerate(stats):
+        progress.values[base + i] = value
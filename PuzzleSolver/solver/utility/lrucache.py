@@ -0,0 +1,81 @@
+"""
+Size limited cache that drops the least recently used items.
+
+"""
+
+# PuzzleSolver
+# Copyright (C) 2010  Andy Gurden
+#
+#     This file is part of PuzzleSolver.
+#
+#     PuzzleSolver is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     PuzzleSolver is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with PuzzleSolver.  If not, see <http://www.gnu.org/licenses/>.
+
+import collections
+
+class LRUCache:
+    """Holds at most capacity items, evicting the least recently used."""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._items = collections.OrderedDict()
+        self._callbacks = []
+
+    def onEvict(self, callback):
+        """Add a callback to be called with (key, value) when an item is evicted."""
+
+        self._callbacks.append(callback)
+
+    def get(self, key, default=None):
+        """Get the item for key and mark it as recently used."""
+
+        if key not in self._items:
+            return default
+        self._items.move_to_end(key)
+        return self._items[key]
+
+    def put(self, key, value):
+        """Add or replace an item, evicting old ones if over capacity."""
+
+        self._items[key] = value
+        self._items.move_to_end(key)
+        while len(self._items) > self.capacity:
+            self._evict(*self._items.popitem(last=False))
+
+    def remove(self, key):
+        """Evict the item for key straight away, if there is one."""
+
+        if key in self._items:
+            self._evict(key, self._items.pop(key))
+
+    def clear(self):
+        """Evict everything."""
+
+        while self._items:
+            self._evict(*self._items.popitem(last=False))
+
+    def values(self):
+        return list(self._items.values())
+
+    def items(self):
+        return list(self._items.items())
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def __len__(self):
+        return len(self._items)
+
+    def _evict(self, key, value):
+        for cb in self._callbacks:
+            cb(key, value)
@@ -0,0 +1,44 @@
+"""
+Locations for files the solver keeps between runs.
+
+"""
+
+# PuzzleSolver
+# Copyright (C) 2010  Andy Gurden
+#
+#     This file is part of PuzzleSolver.
+#
+#     PuzzleSolver is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     PuzzleSolver is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with PuzzleSolver.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+
+APP_DIR = "puzzlesolver"
+
+def _base(env, fallback):
+    base = os.environ.get(env) or os.environ.get("LOCALAPPDATA")
+    if not base:
+        base = os.path.join(os.path.expanduser("~"), fallback)
+    path = os.path.join(base, APP_DIR)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def cache_file(name):
+    """Get the path for a file that can be thrown away and rebuilt."""
+
+    return os.path.join(_base("XDG_CACHE_HOME", ".cache"), name)
+
+def data_file(name):
+    """Get the path for a file that should be kept."""
+
+    return os.path.join(_base("XDG_DATA_HOME", os.path.join(".local", "share")), name)
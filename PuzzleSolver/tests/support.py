@@ -0,0 +1,117 @@
+"""
+Helpers shared by the tests.
+
+"""
+
+# PuzzleSolver
+# Copyright (C) 2010  Andy Gurden
+#
+#     This file is part of PuzzleSolver.
+#
+#     PuzzleSolver is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     PuzzleSolver is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with PuzzleSolver.  If not, see <http://www.gnu.org/licenses/>.
+
+import gc
+import os
+import tempfile
+import time
+import tkinter
+from unittest import mock
+
+import solver.plugin
+import solver.progress
+import solver.state
+import solver.telemetry
+
+def isolate(test):
+    """Point the user's data and cache directories of a TestCase at a temporary one."""
+
+    directory = tempfile.TemporaryDirectory()
+    test.addCleanup(directory.cleanup)
+    patch = mock.patch.dict(os.environ, {"XDG_DATA_HOME": directory.name,
+        "XDG_CACHE_HOME": directory.name})
+    patch.start()
+    test.addCleanup(patch.stop)
+    solver.telemetry._wins = None
+    test.addCleanup(setattr, solver.telemetry, "_wins", None)
+    return directory.name
+
+def tcl():
+    """
+    Get a new Tcl interpreter for a test.
+
+    Garbage from earlier tests is collected first, on this thread. Otherwise
+    their interpreters may be freed by a collection on one of
+    multiprocessing's threads, and Tcl aborts if freed off its own thread.
+
+    """
+
+    gc.collect()
+    return tkinter.Tcl()
+
+class FakeWidget:
+    """Stands in for a widget, with a Tk interpreter but no window."""
+
+    def __init__(self, tcl):
+        self.tk = tcl.tk
+        self.tcl = tcl
+        self.options = {}
+
+    def after(self, ms, func):
+        return self.tcl.after(ms, func)
+
+    def after_cancel(self, job):
+        self.tcl.after_cancel(job)
+
+    def config(self, **options):
+        self.options.update(options)
+
+class CancelAfter:
+    """Cancel token that cancels after being checked a number of times."""
+
+    def __init__(self, checks):
+        self.checks = checks
+
+    def cancelled(self):
+        self.checks -= 1
+        return self.checks < 0
+
+def context(test, token=None, fields=solver.progress.FIELDS):
+    """Get a SolveContext without a GUI, closed once the TestCase finishes."""
+
+    context = solver.plugin.SolveContext(token or solver.plugin.NeverCancelled(), None,
+        solver.progress.Progress(fields))
+    test.addCleanup(context.close)
+    return context
+
+def restore_state(test):
+    """Put solver.state back as it was once a TestCase finishes."""
+
+    watched = [w for w in vars(solver.state).values() if isinstance(w, solver.state.WatchedValue)]
+    saved = [(w, w._value, list(w._callbacks), list(w._vitos), w.allowable) for w in watched]
+    views = solver.state.views._items.copy()
+    def restore():
+        for w, value, callbacks, vitos, allowable in saved:
+            w._value, w._callbacks, w._vitos, w.allowable = value, callbacks, vitos, allowable
+        solver.state.views._items = views
+    test.addCleanup(restore)
+
+def pump(tcl, until, timeout=10.0):
+    """Run tcl's event loop until until() is true, failing after timeout seconds."""
+
+    ended = time.perf_counter() + timeout
+    while not until():
+        if time.perf_counter() > ended:
+            raise AssertionError("Timed out waiting on the event loop.")
+        if not tcl.dooneevent(tkinter._tkinter.DONT_WAIT):
+            time.sleep(0.005)
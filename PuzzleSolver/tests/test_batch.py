@@ -0,0 +1,127 @@
+"""
+Tests for solving saved puzzles without the GUI.
+
+"""
+
+# PuzzleSolver
+# Copyright (C) 2010  Andy Gurden
+#
+#     This file is part of PuzzleSolver.
+#
+#     PuzzleSolver is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     PuzzleSolver is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with PuzzleSolver.  If not, see <http://www.gnu.org/licenses/>.
+
+import importlib
+import io
+import os
+import sys
+import tempfile
+import types
+import unittest
+
+import solver.batch
+import solver.saveformat
+import solver.telemetry
+
+from . import support
+
+PLUGIN = """
+import solver.plugin
+
+MANIFEST = {"name": "Shout", "extension": ".shout", "modes": []}
+
+class Puzzle(solver.plugin.PuzzleType):
+
+    def name(self):
+        return "Shout"
+
+    def get(self, mode):
+        return None
+
+    def extension(self):
+        return ".shout"
+
+    def encodePuzzle(self, puzzle):
+        return puzzle.encode("utf-8")
+
+    def decodePuzzle(self, data):
+        return str(data, "utf-8")
+
+    def solvePuzzle(self, puzzle, context=None):
+        if puzzle == "fail":
+            raise RuntimeError("Failed on purpose")
+        if puzzle == "unsupported":
+            raise NotImplementedError
+        return None if puzzle == "impossible" else puzzle.upper()
+"""
+
+class BatchTest(unittest.TestCase):
+
+    def setUp(self):
+        support.isolate(self)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        package = os.path.join(directory.name, "batchplugins")
+        os.mkdir(package)
+        for name, source in (("__init__.py", ""), ("shout.py", PLUGIN)):
+            with open(os.path.join(package, name), "w") as file:
+                file.write(source)
+        sys.path.insert(0, directory.name)
+        self.addCleanup(sys.path.remove, directory.name)
+        self.addCleanup(lambda: [sys.modules.pop(m) for m in list(sys.modules)
+            if m.startswith("batchplugins")])
+        self.module = types.SimpleNamespace(__name__="batchplugins", __path__=[package])
+        self.ptype = importlib.import_module("batchplugins.shout").Puzzle()
+        self.corpus = os.path.join(directory.name, "corpus")
+        os.mkdir(self.corpus)
+
+    def save(self, *puzzles):
+        for puzzle in puzzles:
+            solver.saveformat.write(os.path.join(self.corpus, puzzle + ".shout"), self.ptype, puzzle)
+
+    def run_batch(self):
+        out = io.StringIO()
+        status = solver.batch.run(self.module, [self.corpus], jobs=2, out=out)
+        lines = out.getvalue().splitlines()
+        results = {os.path.basename(line.split()[-1]): " ".join(line.split()[1:-1])
+            for line in lines[:-1]}
+        return status, results, lines[-1]
+
+    def testAllSolved(self):
+        self.save("one", "two")
+        status, results, summary = self.run_batch()
+        self.assertEqual(status, 0)
+        self.assertEqual(results, {"one.shout": "solved", "two.shout": "solved"})
+        self.assertRegex(summary, r"^2 puzzles in [0-9.]+s: 2 solved$")
+
+    def testFailures(self):
+        self.save("good", "impossible", "fail", "unsupported")
+        with open(os.path.join(self.corpus, "corrupt.shout"), "wb") as file:
+            file.write(solver.saveformat.MAGIC + b"\0" * 4)
+        status, results, summary = self.run_batch()
+        self.assertEqual(status, 1)
+        self.assertEqual(results, {"good.shout": "solved", "impossible.shout": "unsolved",
+            "fail.shout": "failed (RuntimeError)", "unsupported.shout": "failed (unsupported)",
+            "corrupt.shout": "failed (unreadable)"})
+        self.assertIn("3 failed, 1 solved, 1 unsolved", summary)
+        recorded = {(e["outcome"], e["error"]) for e in solver.telemetry.records()}
+        self.assertEqual(recorded, {("solved", None), ("unsolved", None),
+            ("failed", "RuntimeError"), ("failed", "unsupported")}) # Unreadable has no record
+
+    def testNothingFound(self):
+        out = io.StringIO()
+        self.assertEqual(solver.batch.run(self.module, [self.corpus], out=out), 1)
+        self.assertEqual(out.getvalue(), "No saved puzzles found.\n")
+
+if __name__ == "__main__":
+    unittest.main()
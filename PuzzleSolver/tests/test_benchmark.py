@@ -0,0 +1,137 @@
+"""
+Tests for the benchmark harness and its regression checks.
+
+"""
+
+# PuzzleSolver
+# Copyright (C) 2010  Andy Gurden
+#
+#     This file is part of PuzzleSolver.
+#
+#     PuzzleSolver is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     PuzzleSolver is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with PuzzleSolver.  If not, see <http://www.gnu.org/licenses/>.
+
+import io
+import math
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from solver import benchmark
+from solver import saveformat
+
+import plugins
+import plugins.concrete
+
+from . import support
+
+BASE = {"wall": 1.0, "cpu": 1.0, "rss": 100 << 20, "nodes": 1000}
+
+def result(**changes):
+    r = dict(BASE)
+    r.update(changes)
+    return r
+
+class CompareTest(unittest.TestCase):
+
+    def testThreshold(self):
+        self.assertEqual(benchmark.compare(result(), BASE), {})
+        self.assertEqual(benchmark.compare(result(nodes=1250), BASE), {})
+        self.assertEqual(benchmark.compare(result(nodes=1251), BASE), {"nodes": 0.251})
+        self.assertEqual(benchmark.compare(result(nodes=1251), BASE, threshold=0.5), {})
+        self.assertEqual(set(benchmark.compare(result(wall=2.0, cpu=0.5), BASE)), {"wall"})
+
+    def testSlack(self):
+        tiny = dict(BASE, wall=0.01)
+        self.assertEqual(benchmark.compare(result(wall=0.05), tiny), {})
+        self.assertEqual(set(benchmark.compare(result(wall=0.07), tiny)), {"wall"})
+        self.assertEqual(benchmark.compare(result(rss=4 << 20), dict(BASE, rss=1 << 20)), {})
+
+    def testMissing(self):
+        self.assertEqual(benchmark.compare(result(cpu=math.nan, nodes=5000), {"cpu": 1.0}), {})
+        self.assertEqual(set(benchmark.compare(result(nodes=5000), {"nodes": 0})), {"nodes"})
+
+    def testScaledForSlowerMachine(self):
+        slower = benchmark.scale(0.2, 0.1)
+        self.assertEqual(slower, 2.0)
+        self.assertEqual(benchmark.compare(result(wall=2.4, cpu=2.4), BASE, slower=slower), {})
+        self.assertEqual(set(benchmark.compare(result(wall=2.6, nodes=2000), BASE, slower=slower)),
+            {"wall", "nodes"})
+
+    def testNeverScaledDown(self):
+        self.assertEqual(benchmark.scale(0.05, 0.1), 1.0)
+        self.assertEqual(benchmark.scale(0.1, None), 1.0)
+
+class BaselineTest(unittest.TestCase):
+
+    def setUp(self):
+        support.isolate(self)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.corpus = directory.name
+        self.baseline = os.path.join(self.corpus, benchmark.BASELINE_NAME)
+        saveformat.write(os.path.join(self.corpus, "one" + plugins.concrete.EXTENSION),
+            plugins.concrete.Puzzle(), "one")
+
+    def testSaveAndLoad(self):
+        benchmark.save_baseline(self.baseline, {"a": BASE}, 0.1)
+        self.assertEqual(benchmark.load_baseline(self.baseline), {"results": {"a": BASE}, "calibration": 0.1})
+        with open(self.baseline, "w") as file:
+            file.write('{"version": 1, "results": {}}')
+        self.assertEqual(benchmark.load_baseline(self.baseline), None)
+        os.remove(self.baseline)
+        self.assertEqual(benchmark.load_baseline(self.baseline), None)
+
+    def run_with(self, measured, **kwargs):
+        out = io.StringIO()
+        with mock.patch.object(benchmark, "_measure", return_value=dict(measured, outcome="solved")), \
+                mock.patch.object(benchmark, "calibrate", return_value=0.1):
+            status = benchmark.run(plugins, self.corpus, out=out, **kwargs)
+        return status, out.getvalue()
+
+    def testRegressionTracking(self):
+        status, out = self.run_with(BASE)
+        self.assertEqual(status, 1)
+        self.assertIn("no baseline", out)
+        self.assertEqual(self.run_with(BASE, save=True)[0], 0)
+        status, out = self.run_with(BASE)
+        self.assertEqual(status, 0)
+        self.assertIn("ok", out)
+        status, out = self.run_with(result(nodes=2000))
+        self.assertEqual(status, 1)
+        self.assertIn("nodes +100%", out)
+        self.assertEqual(self.run_with(result(nodes=2000), threshold=1.5)[0], 0)
+
+    def testBundledBaseline(self):
+        corpus = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks")
+        baseline = benchmark.load_baseline(os.path.join(corpus, benchmark.BASELINE_NAME))
+        self.assertNotEqual(baseline, None)
+        self.assertGreater(baseline["calibration"], 0)
+        for name in ("concrete/long.con", "concrete/short.con"):
+            self.assertEqual(set(baseline["results"][name]), set(benchmark.METRICS) | {"hash"})
+
+class MeasureTest(unittest.TestCase):
+
+    def testFailureThroughPool(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        filename = os.path.join(directory.name, "broken" + plugins.concrete.EXTENSION)
+        with open(filename, "wb") as file:
+            file.write(saveformat.MAGIC + b"\0" * 60)
+        measured = benchmark._measure("plugins", filename)
+        self.assertEqual(measured["outcome"], "failed (solver.saveformat.SaveFormatError)")
+        self.assertEqual(measured["nodes"], 0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+"""
+Tests for checkpoints that let long solves be resumed.
+
+"""
+
+# PuzzleSolver
+# Copyright (C) 2010  Andy Gurden
+#
+#     This file is part of PuzzleSolver.
+#
+#     PuzzleSolver is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     PuzzleSolver is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with PuzzleSolver.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import unittest
+from unittest import mock
+
+import solver.batch
+import solver.checkpoint
+import solver.plugin
+import solver.saveformat
+
+from . import support
+
+class FakeType(solver.plugin.PuzzleType):
+    """Checkpoints its puzzle, a dict, then does what the puzzle says."""
+
+    def name(self):
+        return "Fake"
+
+    def get(self, mode):
+        return None
+
+    def extension(self):
+        return ".fake"
+
+    def solvePuzzle(self, puzzle, context=None):
+        context.checkpoint(puzzle["state"])
+        if puzzle["fail"]:
+            raise RuntimeError("Failed on purpose")
+        return puzzle
+
+class CheckpointTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = support.isolate(self)
+        self.ptype = FakeType()
+
+    def testSaveAndLoad(self):
+        saver = solver.checkpoint.for_puzzle(self.ptype, {"a": 1}, "test")
+        self.assertEqual(saver.load(), None)
+        saver.save([1, 2], [3])
+        self.assertEqual(solver.checkpoint.for_puzzle(self.ptype, {"a": 1}, "test").load(), ([1, 2], [3]))
+        self.assertEqual(solver.checkpoint.for_puzzle(self.ptype, {"a": 2}, "test").load(), None)
+        self.assertEqual(solver.checkpoint.for_puzzle(self.ptype, {"a": 1}, "other").load(), None)
+        saver.clear()
+        self.assertFalse(saver.exists())
+
+    def testSources(self):
+        puzzle = {"a": 1}
+        first = solver.checkpoint.for_puzzle(self.ptype, puzzle, "batch", "one.fake")
+        second = solver.checkpoint.for_puzzle(self.ptype, puzzle, "batch", "two.fake")
+        self.assertNotEqual(first.filename, second.filename)
+        self.assertEqual(first.filename,
+            solver.checkpoint.for_puzzle(self.ptype, puzzle, "batch", "one.fake").filename)
+        first.save("first", [])
+        self.assertEqual(second.load(), None)
+
+    def batch(self, name, puzzle):
+        filename = os.path.join(self.directory, name)
+        solver.saveformat.write(filename, self.ptype, puzzle)
+        saver = solver.checkpoint.for_puzzle(self.ptype, puzzle, "batch", filename)
+        _, outcome, error, _, _, _ = solver.batch._solve_file(filename)
+        return (outcome, error), saver
+
+    def testBatchClearsOnlyOnSuccess(self):
+        patch = mock.patch.object(solver.batch, "_types", {".fake": self.ptype})
+        patch.start()
+        self.addCleanup(patch.stop)
+        outcome, saver = self.batch("good.fake", {"state": "good", "fail": False})
+        self.assertEqual(outcome, ("solved", None))
+        self.assertFalse(saver.exists())
+        outcome, saver = self.batch("bad.fake", {"state": "bad", "fail": True})
+        self.assertEqual(outcome, ("failed", "RuntimeError"))
+        self.assertEqual(saver.load()[0], "bad")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+"""
+Tests for the dancing links exact cover engine.
+
+"""
+
+# PuzzleSolver
+# Copyright (C) 2010  Andy Gurden
+#
+#     This file is part of PuzzleSolver.
+#
+#     PuzzleSolver is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     PuzzleSolver is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with PuzzleSolver.  If not, see <http://www.gnu.org/licenses/>.
+
+import itertools
+import random
+import unittest
+
+from solver import progress
+from solver.dlx import ExactCover
+
+from . import support
+
+# Number of ways to place n queens, from n = 1
+QUEENS = [1, 0, 0, 2, 10, 4, 40, 92]
+
+def queens(n):
+    cover = ExactCover()
+    for i in range(n):
+        cover.addConstraint(("row", i))
+        cover.addConstraint(("column", i))
+    for d in range(2 * n - 1):
+        cover.addConstraint(("diagonal", d), optional=True)
+        cover.addConstraint(("antidiagonal", d), optional=True)
+    for r in range(n):
+        for c in range(n):
+            cover.addOption((r, c), [("row", r), ("column", c),
+                ("diagonal", r + c), ("antidiagonal", r - c + n - 1)])
+    return cover
+
+def brute_force(items, options):
+    """Find every set of options covering each item exactly once."""
+
+    found = []
+    for k in range(len(options) + 1):
+        for chosen in itertools.combinations(range(len(options)), k):
+            covered = [i for o in chosen for i in options[o]]
+            if sorted(covered) == sorted(items):
+                found.append(set(chosen))
+    return found
+
+class ExactCoverTest(unittest.TestCase):
+
+    def testQueens(self):
+        for n, expected in enumerate(QUEENS, 1):
+            self.assertEqual(queens(n).count(), expected, n)
+
+    def testFirstIsValid(self):
+        placed = queens(8).first()
+        self.assertEqual(len(placed), 8)
+        self.assertEqual(len({r for r, c in placed}), 8)
+        self.assertEqual(len({c for r, c in placed}), 8)
+        self.assertEqual(len({r + c for r, c in placed}), 8)
+        self.assertEqual(len({r - c for r, c in placed}), 8)
+
+    def testNoSolution(self):
+        self.assertEqual(queens(3).first(), None)
+
+    def testAgainstBruteForce(self):
+        rand = random.Random(1)
+        for trial in range(60):
+            items = list(range(rand.randint(1, 6)))
+            options = [rand.sample(items, rand.randint(1, len(items)))
+                for i in range(rand.randint(1, 9))]
+            cover = ExactCover()
+            for item in items:
+                cover.addConstraint(item)
+            for number, option in enumerate(options):
+                cover.addOption(number, option)
+            found = [set(s) for s in cover.solutions()]
+            expected = brute_force(items, options)
+            self.assertEqual(len(found), len(expected), (items, options))
+            for solution in found:
+                self.assertIn(solution, expected)
+
+    def testLimitAndReuse(self):
+        cover = queens(8)
+        self.assertEqual(cover.count(limit=5), 5)
+        self.assertEqual(cover.count(), 92) # Links were restored after stopping early
+
+    def testCancel(self):
+        cover = queens(10)
+        context = support.context(self, support.CancelAfter(2))
+        self.assertEqual(cover.count(context=context), None)
+        self.assertGreater(context.progress.values[progress.NODES], 0)
+        self.assertEqual(cover.count(), 724)
+
+    def testBadDeclarations(self):
+        cover = ExactCover()
+        cover.addConstraint("a")
+        self.assertRaises(ValueError, cover.addConstraint, "a")
+        self.assertRaises(ValueError, cover.addOption, "empty", [])
+        self.assertRaises(KeyError, cover.addOption, "unknown", ["b"])
+        self.assertRaises(ValueError, cover.addOption, "twice", ["a", "a"])
+
+    def testBadOptionLeavesMatrixIntact(self):
+        cover = queens(6)
+        self.assertRaises(KeyError, cover.addOption, "partly", [("row", 0), ("column", 1), "missing"])
+        self.assertRaises(ValueError, cover.addOption, "twice", [("row", 0), ("row", 0)])
+        self.assertEqual(cover.count(), 4)
+        self.assertEqual(len(cover.options), 36)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+"""
+Tests for the compact grid of cells.
+
+"""
+
+# PuzzleSolver
+# Copyright (C) 2010  Andy Gurden
+#
+#     This file is part of PuzzleSolver.
+#
+#     PuzzleSolver is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     PuzzleSolver is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with PuzzleSolver.  If not, see <http://www.gnu.org/licenses/>.
+
+import pickle
+import unittest
+
+from solver.grid import Grid, layout
+
+ROWS = [
+    [1, 0, 0, 4],
+    [0, 4, 1, 0],
+    [0, 1, 4, 0],
+    [4, 0, 0, 1],
+]
+
+class GridTest(unittest.TestCase):
+
+    def testFromRows(self):
+        grid = Grid.fromRows(ROWS, 4, 2, 2)
+        self.assertEqual(len(grid), 16)
+        self.assertEqual([grid.row(r) for r in range(4)], ROWS)
+        self.assertEqual(grid.column(1), [0, 4, 1, 0])
+        self.assertEqual(grid.box(3), [4, 0, 0, 1])
+        self.assertEqual(grid[grid.index(1, 2)], 1)
+        self.assertEqual(grid.empty(), [i for i, v in enumerate(grid) if v == 0])
+
+    def testCandidates(self):
+        grid = Grid.fromRows(ROWS, 4, 2, 2)
+        self.assertEqual(grid.candidates(0), 0b0001)
+        self.assertEqual(grid.candidateValues(1), [1, 2, 3, 4])
+        self.assertTrue(grid.eliminate(1, 3))
+        self.assertFalse(grid.eliminate(1, 3))
+        self.assertEqual(grid.candidateValues(1), [1, 2, 4])
+        grid[1] = 2
+        self.assertEqual(grid.candidateValues(1), [2])
+        grid[1] = 0
+        self.assertEqual(grid.candidates(1), grid.full())
+
+    def testLayout(self):
+        shape = layout(4, 4, 2, 2)
+        self.assertIs(Grid(4, 4, 4, 2, 2).layout, shape)
+        self.assertEqual(len(shape.units), 12)
+        self.assertEqual(shape.peers[0], (1, 2, 3, 4, 5, 8, 12))
+        self.assertEqual(layout(2, 3).boxes, ())
+        self.assertEqual(layout(2, 3).peers[0], (1, 2, 3))
+
+    def testSnapshot(self):
+        grid = Grid.fromRows(ROWS, 4, 2, 2)
+        saved = grid.snapshot()
+        grid[1] = 2
+        grid.eliminate(2, 3)
+        self.assertEqual(saved[1], 0)
+        self.assertEqual(saved.candidates(2), saved.full())
+        grid.restore(saved)
+        self.assertEqual(grid, Grid.fromRows(ROWS, 4, 2, 2))
+        grid[1] = 3 # Changing after restoring must leave the snapshot alone
+        self.assertEqual(saved[1], 0)
+        saved[2] = 3
+        self.assertEqual(grid[2], 0)
+
+    def testBytes(self):
+        grid = Grid.fromRows(ROWS, 4, 2, 2)
+        grid.eliminate(1, 2)
+        plain = Grid.fromBytes(grid.toBytes())
+        self.assertEqual(list(plain), list(grid))
+        self.assertEqual(plain.candidates(1), plain.full())
+        full = Grid.fromBytes(grid.toBytes(True))
+        self.assertEqual(full, grid)
+        self.assertEqual(full.shape(), (4, 4, 4, 2, 2))
+
+    def testBadBytes(self):
+        data = Grid.fromRows(ROWS, 4, 2, 2).toBytes(True)
+        self.assertRaises(ValueError, Grid.fromBytes, data[:3])
+        self.assertRaises(ValueError, Grid.fromBytes, data[:-8])
+        self.assertRaises(ValueError, Grid.fromBytes, data + b"\0")
+
+    def testPickle(self):
+        grid = Grid(3, 5, 64)
+        grid[7] = 64
+        grid.eliminate(3, 64)
+        copy = pickle.loads(pickle.dumps(grid))
+        self.assertEqual(copy, grid)
+        self.assertEqual(copy.candidates(3), grid.full() >> 1)
+        self.assertEqual(copy.candidateValues(7), [64])
+
+    def testBadShape(self):
+        self.assertRaises(ValueError, Grid, 2, 2, 0)
+        self.assertRaises(ValueError, Grid, 2, 2, 65)
+        self.assertRaises(ValueError, Grid, 2, 2, 4, cells=[0, 0, 0])
+
+if __name__ == "__main__":
+    unittest.main()
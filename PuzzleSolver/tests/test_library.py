@@ -0,0 +1,139 @@
+"""
+Tests for the library of saved puzzles.
+
+"""
+
+# PuzzleSolver
+# Copyright (C) 2010  Andy Gurden
+#
+#     This file is part of PuzzleSolver.
+#
+#     PuzzleSolver is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     PuzzleSolver is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with PuzzleSolver.  If not, see <http://www.gnu.org/licenses/>.
+
+import gc
+import os
+import pickle
+import tempfile
+import tkinter
+import unittest
+
+import solver.state
+from solver import library
+from solver import saveformat
+
+import plugins.concrete
+
+from . import support
+from .test_plugin import TaskSolver, _ignore_cancel
+
+class HashTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.ptype = plugins.concrete.Puzzle()
+
+    def save(self, name, puzzle, codec):
+        filename = os.path.join(self.directory, name + plugins.concrete.EXTENSION)
+        saveformat.write(filename, self.ptype, puzzle, codec)
+        return filename
+
+    def testFileAndContentHashes(self):
+        packed = self.save("packed", "hello " * 100, "zlib")
+        plain = self.save("plain", "hello " * 100, None)
+        self.assertNotEqual(library.file_hash(packed), library.file_hash(plain))
+        self.assertEqual(saveformat.content_hash(self.ptype, saveformat.read(packed, self.ptype)),
+            saveformat.content_hash(self.ptype, saveformat.read(plain, self.ptype)))
+
+    def testContentHashWithoutPlugin(self):
+        for codec in ("zlib", None):
+            filename = self.save("file", "hello " * 100, codec)
+            self.assertEqual(saveformat.file_content_hash(filename),
+                saveformat.content_hash(self.ptype, "hello " * 100))
+        filename = os.path.join(self.directory, "legacy" + plugins.concrete.EXTENSION)
+        with open(filename, "wb") as file:
+            pickle.dump("hello", file)
+        self.assertEqual(saveformat.file_content_hash(filename), None)
+
+    def testIndexKeepsFileHash(self):
+        filename = self.save("one", "abc", "zlib")
+        lib = library.Library(os.path.join(self.directory, "library.sqlite"))
+        self.addCleanup(lib.close)
+        self.assertEqual(lib.index([filename], {plugins.concrete.EXTENSION: "plugins.concrete"}), 1)
+        entry, = lib.search("one")
+        self.assertEqual(entry.fileHash, library.file_hash(filename))
+        self.assertEqual(entry.plugin, "plugins.concrete")
+
+class UpdateTest(unittest.TestCase):
+    """Saves and solves in the GUI keep the user's library up to date."""
+
+    def setUp(self):
+        self.directory = support.isolate(self)
+        self.addCleanup(gc.collect) # Views made here are freed on this thread, for Tk
+        support.restore_state(self)
+        self.ptype = plugins.concrete.Puzzle()
+
+    def entries(self):
+        lib = library.Library()
+        self.addCleanup(lib.close)
+        return {os.path.basename(e.path): (e.status, e.bestTime) for e in lib.search()}
+
+    def save(self, name, puzzle, codec="zlib"):
+        filename = os.path.join(self.directory, name + plugins.concrete.EXTENSION)
+        saveformat.write(filename, self.ptype, puzzle, codec)
+        library.saved(filename, self.ptype.pluginId())
+        return filename
+
+    def testRecordedForEveryCopy(self):
+        self.save("packed", "abc")
+        self.save("plain", "abc", None)
+        self.save("other", "xyz")
+        entry = {"hash": saveformat.content_hash(self.ptype, "abc"), "outcome": "solved", "wall": 2.0}
+        library.solved(entry)
+        library.solved(dict(entry, wall=3.0))
+        self.assertEqual(self.entries(), {"packed.con": ("solved", 2.0),
+            "plain.con": ("solved", 2.0), "other.con": (None, None)})
+
+    def testSavedAgain(self):
+        self.save("one", "abc")
+        library.solved({"hash": saveformat.content_hash(self.ptype, "abc"),
+            "outcome": "solved", "wall": 2.0})
+        self.save("one", "abcd")
+        self.assertEqual(self.entries(), {"one.con": (None, None)})
+
+    def testUnwritableLibrary(self):
+        blocker = os.path.join(self.directory, "file")
+        open(blocker, "w").close()
+        os.environ["XDG_DATA_HOME"] = os.path.join(blocker, "data") # Restored by isolate
+        with self.assertLogs(library.log, "WARNING"):
+            library.solved({"hash": "0", "outcome": "solved", "wall": 1.0})
+
+    def testGuiSolve(self):
+        self.save("one", "abc")
+        tcl = support.tcl()
+        self.addCleanup(setattr, tkinter, "_default_root", tkinter._default_root)
+        tkinter._default_root = tcl
+        solver.state.mode.change("PLAY")
+        solver.state.puzzle.change(self.ptype)
+        solver.state.view.value().load("abc")
+        s = TaskSolver(support.FakeWidget(tcl), _ignore_cancel, 0)
+        s.start()
+        support.pump(tcl, lambda: not s.busy())
+        (status, taken), = self.entries().values()
+        self.assertEqual(status, "solved")
+        self.assertGreater(taken, 0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,186 @@
+"""
+Tests for searching a puzzle's tree across several processes.
+
+"""
+
+# PuzzleSolver
+# Copyright (C) 2010  Andy Gurden
+#
+#     This file is part of PuzzleSolver.
+#
+#     PuzzleSolver is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     PuzzleSolver is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with PuzzleSolver.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import tempfile
+import time
+import unittest
+
+from solver import pool
+from solver import transposition
+from solver.parallel import ParallelSearch, SearchError, SearchProblem
+
+from . import support
+
+class Queens(SearchProblem):
+    """Place n queens a row at a time, states being the columns so far."""
+
+    def __init__(self, n):
+        self.n = n
+
+    def root(self):
+        return ()
+
+    def children(self, state):
+        row = len(state)
+        return [state + (c,) for c in range(self.n)
+            if all(c != d and abs(c - d) != row - r for r, d in enumerate(state))]
+
+    def isGoal(self, state):
+        return len(state) == self.n
+
+def serial_count(problem):
+    count = 0
+    stack = [problem.root()]
+    while stack:
+        state = stack.pop()
+        if problem.isGoal(state):
+            count += 1
+        else:
+            stack.extend(problem.children(state))
+    return count
+
+class Broken(Queens):
+
+    def children(self, state):
+        if len(state) == 3:
+            raise RuntimeError("Broken on purpose")
+        return Queens.children(self, state)
+
+class Lattice(SearchProblem):
+    """Walk right and down a square grid, reaching each point many ways."""
+
+    def __init__(self, n, goal):
+        self.n = n
+        self.goal = goal
+        self.zobrist = transposition.Zobrist(2, n + 1)
+
+    def root(self):
+        return (0, 0)
+
+    def children(self, state):
+        x, y = state
+        return [s for s in ((x + 1, y), (x, y + 1)) if max(s) <= self.n]
+
+    def isGoal(self, state):
+        return state == self.goal
+
+    def key(self, state):
+        return self.zobrist.hash(state)
+
+class Recording(Queens):
+    """Queens that leaves a file named after each process searching it."""
+
+    def __init__(self, n, directory):
+        Queens.__init__(self, n)
+        self.directory = directory
+
+    def children(self, state):
+        open(os.path.join(self.directory, str(os.getpid())), "w").close()
+        return Queens.children(self, state)
+
+def _search_forever(token, directory):
+    # Ignores token, so it is only stopped by killing its worker
+    return ParallelSearch(Recording(14, directory), workers=2, depth=1, countAll=True).run()
+
+def alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    return True
+
+class ParallelSearchTest(unittest.TestCase):
+
+    def testCount(self):
+        for n in (6, 8):
+            expected = serial_count(Queens(n))
+            self.assertEqual(ParallelSearch(Queens(n), workers=2, countAll=True).run(), expected, n)
+            self.assertEqual(ParallelSearch(Queens(n), workers=3, depth=1, countAll=True).run(), expected, n)
+
+    def testCountGoalsWhileSplitting(self):
+        # Every solution is found before the tree is split enough
+        self.assertEqual(ParallelSearch(Queens(4), workers=4, depth=10, countAll=True).run(), 2)
+
+    def testFirst(self):
+        found = ParallelSearch(Queens(8), workers=2).run()
+        self.assertEqual(len(found), 8)
+        for row in range(8):
+            self.assertIn(found[:row+1], Queens(8).children(found[:row]))
+
+    def testNoSolution(self):
+        self.assertEqual(ParallelSearch(Queens(3), workers=2).run(), None)
+        self.assertEqual(ParallelSearch(Queens(3), workers=2, countAll=True).run(), 0)
+
+    def testFailure(self):
+        with self.assertRaises(SearchError) as caught:
+            ParallelSearch(Broken(6), workers=2, depth=1).run()
+        self.assertIn("Broken on purpose", str(caught.exception))
+
+    def testCancel(self):
+        context = support.context(self, support.CancelAfter(0))
+        self.assertEqual(ParallelSearch(Queens(13), workers=2, depth=1, countAll=True).run(context), None)
+
+class TableTest(unittest.TestCase):
+
+    def testSkipsRepeatedStates(self):
+        context = support.context(self, fields=transposition.FIELDS)
+        self.assertEqual(ParallelSearch(Lattice(12, None), workers=2, depth=2, table=1 << 16).run(context), None)
+        progress = context.progress
+        # Points are explored about once per worker, rather than once for every
+        # path to them, though keys sharing a slot may be explored again
+        self.assertLess(progress["nodes"], 20 * 13 * 13)
+        self.assertGreater(progress["table_hits"], 0)
+        self.assertEqual(progress["table_hits"] + progress["table_misses"], progress["nodes"])
+
+    def testFindsGoal(self):
+        self.assertEqual(ParallelSearch(Lattice(12, (7, 9)), workers=2, table=1 << 16).run(), (7, 9))
+
+    def testNotWhileCounting(self):
+        self.assertRaises(ValueError, ParallelSearch, Lattice(3, None), countAll=True, table=1 << 16)
+
+class KilledWorkerTest(unittest.TestCase):
+
+    def testSearchesDieWithWorker(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        workers = pool.WorkerPool(1)
+        self.addCleanup(workers.shutdown)
+        job = workers.submit(_search_forever, directory.name)
+
+        ended = time.perf_counter() + 10
+        while len(os.listdir(directory.name)) < 3: # The worker and both searches
+            self.assertLess(time.perf_counter(), ended, "Search did not start")
+            time.sleep(0.01)
+        searching = [int(name) for name in os.listdir(directory.name)]
+
+        job.requestCancel()
+        self.assertTrue(job.reap(0))
+        self.assertTrue(job.forced)
+        ended = time.perf_counter() + 5
+        while any(alive(pid) for pid in searching):
+            self.assertLess(time.perf_counter(), ended, "Searches outlived their worker")
+            time.sleep(0.01)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,277 @@
+"""
+Tests for PooledSolver and the channel it talks to its task through.
+
+"""
+
+# PuzzleSolver
+# Copyright (C) 2010  Andy Gurden
+#
+#     This file is part of PuzzleSolver.
+#
+#     PuzzleSolver is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     PuzzleSolver is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with PuzzleSolver.  If not, see <http://www.gnu.org/licenses/>.
+
+import contextlib
+import io
+import os
+import time
+import tkinter
+import types
+import unittest
+
+import solver.plugin
+import solver.pool
+import solver.profiling
+import solver.state
+import solver.telemetry
+from plugins import concrete
+
+from . import support
+
+def _ignore_cancel(context, seconds):
+    time.sleep(seconds)
+    return True
+
+def _partial_until_cancelled(context):
+    context.sendPartial({0: 1})
+    context.flushPartial()
+    return _until_cancelled(context)
+
+def _until_cancelled(context):
+    while not context.cancelled():
+        time.sleep(0.01)
+    return False
+
+def _fail(context):
+    raise RuntimeError("Failed on purpose")
+
+def _talk(channel, finish):
+    for colour in ("RED", "ORANGE", "GREEN"):
+        channel.send(colour)
+    channel.sendPartial({0: 1, 1: 2})
+    channel.sendPartial({1: 3})
+    if finish:
+        channel.finish()
+
+def _flood(channel, count):
+    for i in range(count):
+        channel.send(i)
+    channel.finish()
+
+class TaskSolver(solver.plugin.PooledSolver):
+    """Runs whatever task it is given."""
+
+    GRACE = 0.3
+
+    def __init__(self, widget, func, *args):
+        solver.plugin.PooledSolver.__init__(self, widget)
+        self.func = func
+        self.args = args
+        self.results = []
+
+    def task(self):
+        return self.func, self.args
+
+    def solved(self, result):
+        self.results.append(result)
+
+class StopTest(unittest.TestCase):
+
+    def setUp(self):
+        support.isolate(self)
+        self.tcl = support.tcl()
+        self.widget = support.FakeWidget(self.tcl)
+
+    def stopped(self, s):
+        started = time.perf_counter()
+        self.assertTrue(s.stop())
+        taken = time.perf_counter() - started
+        self.assertTrue(s.busy())
+        self.assertEqual(s.status(), "Stopping")
+        support.pump(self.tcl, lambda: not s.busy())
+        return taken
+
+    def testStopDoesNotBlock(self):
+        s = TaskSolver(self.widget, _ignore_cancel, 30)
+        s.start()
+        self.assertLess(self.stopped(s), 0.2)
+        self.assertTrue(s.job.forced)
+        self.assertTrue(s.status().startswith("Killed"))
+        self.assertEqual(s.results, [])
+
+    def testCooperativeStop(self):
+        s = TaskSolver(self.widget, _until_cancelled)
+        s.start()
+        self.stopped(s)
+        self.assertFalse(s.job.forced)
+        self.assertTrue(s.status().startswith("Stopped"))
+        entry, = solver.telemetry.records()
+        self.assertEqual(entry["outcome"], "cancelled")
+
+    def testReapAll(self):
+        s = TaskSolver(self.widget, _ignore_cancel, 30)
+        s.start()
+        s.stop()
+        solver.plugin.reap_all()
+        self.assertFalse(s.busy())
+        self.assertTrue(s.job.forced)
+
+    def testFinishes(self):
+        s = TaskSolver(self.widget, _ignore_cancel, 0)
+        s.start()
+        support.pump(self.tcl, lambda: not s.busy())
+        self.assertEqual(s.results, [True])
+        self.assertTrue(s.stop())
+        entry, = solver.telemetry.records()
+        self.assertEqual(entry["outcome"], "solved")
+
+    def testFails(self):
+        s = TaskSolver(self.widget, _fail)
+        s.start()
+        with contextlib.redirect_stderr(io.StringIO()): # The error is reported by Tk
+            support.pump(self.tcl, lambda: not s.busy())
+        self.assertEqual(s.results, [])
+        entry, = solver.telemetry.records()
+        self.assertEqual((entry["outcome"], entry["error"]), ("failed", "RuntimeError"))
+
+class ChannelTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tcl = support.tcl()
+        self.widget = support.FakeWidget(self.tcl)
+        self.updates = []
+        self.partials = []
+        self.finished = False
+
+    def listen(self, widget, finish=True, target=_talk):
+        channel = solver.plugin.SolverChannel()
+        proc = solver.pool.context().Process(target=target, args=(channel, finish))
+        proc.start()
+        proc.join() # So everything sent arrives together
+        channel.listen(widget, self.updates.append, lambda: setattr(self, "finished", True),
+            self.partials.append)
+        support.pump(self.tcl, lambda: self.finished)
+        return channel
+
+    def testMergesWhatArrivesTogether(self):
+        channel = self.listen(self.widget)
+        self.assertEqual(self.updates, ["GREEN"])
+        self.assertEqual(self.partials, [{0: 1, 1: 3}])
+        self.assertEqual(channel._widget, None) # Stopped listening
+
+    def testProcessGoneWithoutFinishing(self):
+        self.listen(self.widget, finish=False)
+        self.assertEqual(self.updates, ["GREEN"])
+
+    def testReadsInBatches(self):
+        ticks = []
+        def tick():
+            ticks.append(len(self.updates))
+            if not self.finished:
+                self.tcl.after(1, tick)
+        tick()
+        self.listen(self.widget, 250, _flood) # Sending all of them first
+        self.assertEqual(self.updates, [99, 199, 249])
+        self.assertIn(1, ticks) # The loop ran other events between batches
+
+    def testPollsWithoutFileHandlers(self):
+        widget = types.SimpleNamespace(tk=object(), after=self.widget.after)
+        self.listen(widget)
+        self.assertEqual(self.updates, ["GREEN"])
+        self.assertEqual(self.partials, [{0: 1, 1: 3}])
+
+class PartialView:
+    """Records the partial solution it is given."""
+
+    def __init__(self):
+        self.partial = {}
+
+    def applyPartial(self, changes):
+        self.partial.update(changes)
+
+    def clearPartial(self):
+        self.partial = {}
+
+class PartialTest(unittest.TestCase):
+
+    def setUp(self):
+        support.isolate(self)
+        self.tcl = support.tcl()
+        self.widget = support.FakeWidget(self.tcl)
+
+    def testClearedOnStop(self):
+        s = TaskSolver(self.widget, _partial_until_cancelled)
+        s.start()
+        s.view = view = PartialView()
+        support.pump(self.tcl, lambda: view.partial)
+        self.assertEqual(view.partial, {0: 1})
+        s.stop()
+        self.assertEqual(view.partial, {})
+        support.pump(self.tcl, lambda: not s.busy())
+
+    def testConcreteKeepsPuzzle(self):
+        self.addCleanup(setattr, tkinter, "_default_root", tkinter._default_root)
+        tkinter._default_root = self.tcl
+        view = concrete.ConcreteView("PLAY")
+        view.load("ab\u00e9c")
+        view.applyPartial({0: ord("A")})
+        view.applyPartial({4: ord("C")})
+        self.assertEqual(view.preview.get(), "Ab\u00e9C")
+        self.assertEqual(view.getPuzzle(), "ab\u00e9c")
+        self.assertFalse(view.changed())
+        view.applyPartial({0: None})
+        self.assertEqual(view.preview.get(), "ab\u00e9C")
+        view.clearPartial()
+        self.assertEqual(view.preview.get(), "")
+        self.assertFalse(view.changed())
+
+class ProfileTest(unittest.TestCase):
+
+    def setUp(self):
+        support.isolate(self)
+        support.restore_state(self)
+        self.tcl = support.tcl()
+        self.widget = support.FakeWidget(self.tcl)
+
+    def testCaptureReportsFiles(self):
+        errors = io.StringIO()
+        with contextlib.redirect_stderr(errors):
+            with solver.profiling.capture(solver.profiling.request("cprofile"), "test") as captured:
+                with solver.profiling.span("work"):
+                    pass
+        self.assertEqual(errors.getvalue(), "")
+        self.assertEqual(len(captured.files), 2)
+        self.assertTrue(all(os.path.exists(f) for f in captured.files))
+
+    def testWriteFailureKeepsResult(self):
+        blocker = os.path.join(support.isolate(self), "file")
+        open(blocker, "w").close() # Profiles cannot be written under a file
+        context = support.context(self)
+        with self.assertLogs("solver.profiling") as logged:
+            result, used, files = solver.plugin._run_task(context.token, None, context.progress,
+                None, ("spans", os.path.join(blocker, "profiles")), _ignore_cancel, (0,))
+        self.assertTrue(result)
+        self.assertEqual(files, [])
+        self.assertIn("Could not write the profile", logged.output[0])
+
+    def testStatusShowsFiles(self):
+        solver.state.profile.change("spans")
+        s = TaskSolver(self.widget, _ignore_cancel, 0)
+        s.start()
+        support.pump(self.tcl, lambda: not s.busy())
+        profile, = s.profiles
+        self.assertTrue(os.path.exists(profile))
+        self.assertIn(os.path.basename(profile), s.status())
+
+if __name__ == "__main__":
+    unittest.main()
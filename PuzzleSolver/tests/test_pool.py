@@ -0,0 +1,170 @@
+"""
+Tests for the worker pool and cancelling jobs.
+
+"""
+
+# PuzzleSolver
+# Copyright (C) 2010  Andy Gurden
+#
+#     This file is part of PuzzleSolver.
+#
+#     PuzzleSolver is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     PuzzleSolver is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with PuzzleSolver.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+from solver import pool
+
+def _stubborn(token, seconds):
+    time.sleep(seconds)
+    return "late"
+
+def _polite(token):
+    while not token.cancelled():
+        time.sleep(0.01)
+    return "cancelled"
+
+def _writable(token, conn):
+    return conn.writable
+
+def _open_files():
+    return len(os.listdir("/proc/self/fd"))
+
+def _imported(token, name):
+    return name in sys.modules
+
+class CancelTest(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = pool.WorkerPool(1)
+        self.addCleanup(self.pool.shutdown)
+
+    def testRequestDoesNotWait(self):
+        job = self.pool.submit(_stubborn, 30)
+        started = time.perf_counter()
+        job.requestCancel()
+        self.assertFalse(job.reap(5.0))
+        self.assertLess(time.perf_counter() - started, 0.5)
+        job.cancel(0)
+
+    def testCooperativeCancel(self):
+        job = self.pool.submit(_polite)
+        job.requestCancel()
+        while not job.reap(5.0):
+            time.sleep(0.01)
+        self.assertFalse(job.forced)
+        self.assertEqual(job.join(), "cancelled")
+
+    def testKilledOnceGraceIsOver(self):
+        job = self.pool.submit(_stubborn, 30)
+        job.requestCancel()
+        self.assertFalse(job.reap(0.2))
+        time.sleep(0.3)
+        self.assertTrue(job.reap(0.2))
+        self.assertTrue(job.forced)
+        self.assertRaises(pool.JobError, job.join)
+
+    def testBlockingCancel(self):
+        job = self.pool.submit(_stubborn, 30)
+        taken = job.cancel(0.2)
+        self.assertTrue(job.forced)
+        self.assertGreaterEqual(taken, 0.2)
+        self.assertEqual(self.pool.submit(_stubborn, 0).join(), "late")
+
+class QueueTest(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = pool.WorkerPool(1)
+        self.addCleanup(self.pool.shutdown)
+
+    def testSizeIsCap(self):
+        first = self.pool.submit(_stubborn, 0.3)
+        second = self.pool.submit(_stubborn, 0)
+        self.assertEqual(len(self.pool._workers), 1)
+        self.assertFalse(second.done())
+        self.assertEqual(second.join(), "late")
+        self.assertTrue(first.done())
+        self.assertEqual(len(self.pool._workers), 1)
+
+    def testQueuedJobStartsWhenWorkerFrees(self):
+        first = self.pool.submit(_polite)
+        second = self.pool.submit(_stubborn, 0)
+        first.requestCancel()
+        self.assertEqual(first.join(), "cancelled")
+        self.assertEqual(second.join(), "late")
+
+    def testCancelQueued(self):
+        first = self.pool.submit(_stubborn, 0.3)
+        second = self.pool.submit(_stubborn, 0)
+        second.requestCancel()
+        self.assertTrue(second.reap(5.0))
+        self.assertFalse(second.forced)
+        self.assertRaises(pool.JobError, second.join)
+        self.assertEqual(first.join(), "late")
+
+    @unittest.skipUnless(os.path.isdir("/proc/self/fd"), "Needs /proc to count open files")
+    def testCancelQueuedClosesPipes(self):
+        reader, writer = self.pool.context.Pipe(False)
+        self.assertTrue(self.pool.submit(_writable, writer).join()) # Pipes can be passed at all
+        reader.close()
+        writer.close()
+        first = self.pool.submit(_stubborn, 0.3)
+        opened = _open_files()
+        reader, writer = self.pool.context.Pipe(False)
+        second = self.pool.submit(_writable, writer)
+        reader.close()
+        writer.close()
+        second.requestCancel()
+        ended = time.perf_counter() + 5
+        while _open_files() > opened and time.perf_counter() < ended: # Closed by another thread
+            time.sleep(0.01)
+        self.assertEqual(_open_files(), opened)
+        self.assertEqual(first.join(), "late")
+
+    def testQueuedAfterKill(self):
+        first = self.pool.submit(_stubborn, 30)
+        second = self.pool.submit(_stubborn, 0)
+        first.cancel(0)
+        self.assertTrue(first.forced)
+        self.assertEqual(second.join(), "late")
+
+class WarmTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        with open(os.path.join(directory.name, "warmedplugin.py"), "w") as file:
+            file.write("")
+        sys.path.insert(0, directory.name)
+        self.addCleanup(sys.path.remove, directory.name)
+        self.pool = pool.WorkerPool(1)
+        self.addCleanup(self.pool.shutdown)
+
+    def testImportedBeforeFirstJob(self):
+        self.pool.warm(["warmedplugin"])
+        self.assertTrue(self.pool.submit(_imported, "warmedplugin").join())
+        self.assertNotIn("warmedplugin", sys.modules)
+
+    def testReplacementWorkersAreWarm(self):
+        self.pool.warm(["warmedplugin"])
+        self.pool.warm(["warmedplugin"]) # Only sent once
+        self.assertEqual(self.pool.preload, ("warmedplugin",))
+        self.pool.submit(_stubborn, 30).cancel(0)
+        self.assertTrue(self.pool.submit(_imported, "warmedplugin").join())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,145 @@
+"""
+Tests for racing several solving strategies on the same puzzle.
+
+"""
+
+# PuzzleSolver
+# Copyright (C) 2010  Andy Gurden
+#
+#     This file is part of PuzzleSolver.
+#
+#     PuzzleSolver is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     PuzzleSolver is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with PuzzleSolver.  If not, see <http://www.gnu.org/licenses/>.
+
+import time
+import tkinter
+import unittest
+from unittest import mock
+
+import solver.checkpoint
+import solver.pool
+import solver.telemetry
+from solver.portfolio import Portfolio
+from plugins import concrete
+
+from . import support
+from .test_plugin import PartialView, TaskSolver, _ignore_cancel, _partial_until_cancelled
+
+class SlowToStop(TaskSolver):
+    """Would hold up the Tk loop for a long time if stopping it waited."""
+
+    GRACE = 5.0
+
+def _win(context):
+    return True
+
+class PortfolioTest(unittest.TestCase):
+
+    def setUp(self):
+        support.isolate(self)
+        support.restore_state(self)
+        workers = solver.pool.WorkerPool(3)
+        self.addCleanup(workers.shutdown)
+        patch = mock.patch.object(solver.pool, "_pool", workers)
+        patch.start()
+        self.addCleanup(patch.stop)
+        self.tcl = support.tcl()
+        self.widget = support.FakeWidget(self.tcl)
+
+    def outcomes(self):
+        return {(e["strategy"], e["outcome"], e["won"]) for e in solver.telemetry.records()}
+
+    def testLosersStopWithoutWaiting(self):
+        slow = SlowToStop(self.widget, _ignore_cancel, 1.5)
+        fast = TaskSolver(self.widget, _win)
+        race = Portfolio([slow, fast])
+        race.start()
+        slow.checkpointer = solver.checkpoint.Checkpointer("puzzle:slow")
+        slow.checkpointer.save("state", [])
+        started = time.perf_counter()
+        support.pump(self.tcl, lambda: race.winner != None)
+        self.assertLess(time.perf_counter() - started, 1.0)
+        self.assertIs(race.winner, fast)
+        self.assertEqual(fast.results, [True])
+        self.assertTrue(race.busy())
+        self.assertTrue(slow.busy())
+
+        self.assertTrue(slow.checkpointer.exists()) # Could still be saved to
+        saved = slow.checkpointer
+        support.pump(self.tcl, lambda: not race.busy())
+        self.assertFalse(saved.exists())
+        self.assertEqual(slow.results, [])
+        self.assertEqual(self.outcomes(), {("SlowToStop", "cancelled", False),
+            ("TaskSolver", "solved", True)})
+
+    def testFavouritePartialCleared(self):
+        favourite = TaskSolver(self.widget, _partial_until_cancelled)
+        other = TaskSolver(self.widget, _ignore_cancel, 0.5)
+        race = Portfolio([favourite, other])
+        race.start()
+        view = PartialView()
+        favourite.view = other.view = view
+        support.pump(self.tcl, lambda: view.partial)
+        self.assertTrue(race.shows(favourite))
+        support.pump(self.tcl, lambda: race.winner != None)
+        self.assertIs(race.winner, other)
+        self.assertEqual(view.partial, {})
+        support.pump(self.tcl, lambda: not race.busy())
+
+    def testLoserDoneBeforeStop(self):
+        first = TaskSolver(self.widget, _win)
+        second = TaskSolver(self.widget, _win)
+        race = Portfolio([first, second])
+        race.start()
+        deadline = time.perf_counter() + 10
+        while not (first.job.done() and second.job.done()):
+            self.assertLess(time.perf_counter(), deadline)
+            time.sleep(0.01)
+        support.pump(self.tcl, lambda: race.winner != None and not race.busy())
+        loser = second if race.winner is first else first
+        self.assertEqual(loser.results, [])
+        won = sorted(e["won"] for e in solver.telemetry.records())
+        self.assertEqual(won, [False, True])
+        self.assertEqual({e["outcome"] for e in solver.telemetry.records()}, {"solved"})
+
+    def testStopStatus(self):
+        race = Portfolio([SlowToStop(self.widget, _ignore_cancel, 1.5),
+            TaskSolver(self.widget, _ignore_cancel, 30)])
+        race.start()
+        self.assertTrue(race.status().startswith("Racing 2 strategies"))
+        started = time.perf_counter()
+        self.assertTrue(race.stop())
+        self.assertLess(time.perf_counter() - started, 0.5)
+        self.assertEqual(race.status(), "Stopping 2 strategies")
+        support.pump(self.tcl, lambda: not race.busy())
+        self.assertTrue(race.status().startswith("Stopped 2 strategies"))
+        self.assertEqual(self.outcomes(), {("SlowToStop", "cancelled", False),
+            ("TaskSolver", "cancelled", False)})
+
+    def testOnlyFavouriteUpdatesView(self):
+        var = tkinter.StringVar(self.tcl, "abc")
+        favourite, other = (concrete.ConcreteSolver(var, self.widget, steps) for steps in (2, 1))
+        race = Portfolio([favourite, other])
+        race.racing = [favourite, other]
+        favourite.race = other.race = race
+        favourite.update("RED")
+        other.update("ORANGE")
+        self.assertEqual(self.widget.options["bg"], "RED")
+        other.board = concrete.SharedBuffer.publish(b"ABC")
+        self.addCleanup(other.release)
+        other.solved(True)
+        self.assertEqual(self.widget.options["bg"], "GREEN")
+        self.assertEqual(var.get(), "ABC")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+"""
+Tests for the live search counters.
+
+"""
+
+# PuzzleSolver
+# Copyright (C) 2010  Andy Gurden
+#
+#     This file is part of PuzzleSolver.
+#
+#     PuzzleSolver is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     PuzzleSolver is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with PuzzleSolver.  If not, see <http://www.gnu.org/licenses/>.
+
+import pickle
+import unittest
+from unittest import mock
+
+import solver.pool
+from solver import progress
+
+def _search(pickled):
+    counters = pickle.loads(pickled)
+    for i in range(100):
+        counters.values[progress.NODES] += 1
+    counters.values[progress.DEPTH] = 7
+    counters.close()
+
+class ProgressTest(unittest.TestCase):
+
+    def setUp(self):
+        self.progress = progress.Progress(progress.FIELDS + ("table_hits",))
+        self.addCleanup(self.progress.close)
+        self.now = 10.0
+        clock = mock.patch.object(progress.time, "perf_counter", lambda: self.now)
+        clock.start()
+        self.addCleanup(clock.stop)
+
+    def testStartsAtZero(self):
+        self.assertEqual(self.progress.sample(), {"nodes": 0, "depth": 0, "backtracks": 0,
+            "best": 0, "table_hits": 0, "rate": 0.0})
+
+    def testRateSinceLastSample(self):
+        self.progress.values[progress.NODES] = 50
+        self.assertEqual(self.progress.sample()["rate"], 0.0) # Nothing to compare with
+        self.now += 2
+        self.progress.values[progress.NODES] = 250
+        self.assertEqual(self.progress.sample()["rate"], 100.0)
+        self.assertEqual(self.progress.sample()["rate"], 0.0) # No time has passed
+        self.now += 0.5
+        self.progress.values[progress.NODES] = 300
+        self.assertEqual(self.progress.sample()["rate"], 100.0)
+
+    def testDescribe(self):
+        self.progress.sample()
+        self.now += 1
+        values = self.progress.values
+        values[progress.NODES], values[progress.DEPTH] = 40, 3
+        values[progress.BACKTRACKS], values[progress.BEST], values[4] = 2, 5, 9
+        self.assertEqual(self.progress["table_hits"], 9)
+        self.assertEqual(self.progress.describe(),
+            "40 nodes (40/s), depth 3, 2 backtracks, best 5, table hits 9")
+
+    def testSharedWithSolvingProcess(self):
+        proc = solver.pool.context().Process(target=_search, args=(pickle.dumps(self.progress),))
+        proc.start()
+        proc.join()
+        self.assertEqual(proc.exitcode, 0)
+        self.assertEqual(self.progress["nodes"], 100)
+        self.assertEqual(self.progress["depth"], 7)
+        self.assertEqual(self.progress.sample()["table_hits"], 0)
+
+if __name__ == "__main__":
+    unittest.main()
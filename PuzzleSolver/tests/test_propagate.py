@@ -0,0 +1,128 @@
+"""
+Tests for candidate elimination on grids.
+
+"""
+
+# PuzzleSolver
+# Copyright (C) 2010  Andy Gurden
+#
+#     This file is part of PuzzleSolver.
+#
+#     PuzzleSolver is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     PuzzleSolver is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with PuzzleSolver.  If not, see <http://www.gnu.org/licenses/>.
+
+import random
+import unittest
+from unittest import mock
+
+from solver import propagate
+from solver.grid import Grid
+
+# Shapes as (size, box rows, box cols), no boxes making a Latin square
+SHAPES = [(4, 2, 2), (5, 0, 0), (6, 2, 3), (9, 3, 3)]
+
+def solution(size, boxRows, boxCols, rand):
+    """Get a random solved grid, by shuffling a pattern that fits the boxes."""
+
+    if boxRows:
+        base = [[(boxCols * (r % boxRows) + r // boxRows + c) % size for c in range(size)]
+            for r in range(size)]
+    else:
+        base = [[(r + c) % size for c in range(size)] for r in range(size)]
+    values = list(range(1, size + 1))
+    rand.shuffle(values)
+    return [[values[v] for v in row] for row in base]
+
+def puzzles(count, rand, wrong=0):
+    """Get grids with some cells removed, and maybe some values changed."""
+
+    grids = []
+    for i in range(count):
+        size, boxRows, boxCols = rand.choice(SHAPES)
+        cells = [v for row in solution(size, boxRows, boxCols, rand) for v in row]
+        for cell in rand.sample(range(len(cells)), rand.randint(len(cells) // 3, len(cells))):
+            cells[cell] = 0
+        for cell in rand.sample(range(len(cells)), wrong):
+            cells[cell] = rand.randint(1, size)
+        grids.append(Grid(size, size, size, boxRows, boxCols, cells))
+    return grids
+
+def copies(grids):
+    return [Grid.fromBytes(g.toBytes(True)) for g in grids]
+
+@unittest.skipIf(propagate.numpy == None, "NumPy is not installed")
+class EquivalenceTest(unittest.TestCase):
+
+    def check(self, grids):
+        python = copies(grids)
+        stacked = copies(grids)
+        expected = propagate.propagate_many(python, False)
+        self.assertEqual(propagate.propagate_many(stacked, True), expected)
+        for before, a, b, ok in zip(grids, python, stacked, expected):
+            if ok:
+                self.assertEqual(a, b, before)
+
+    def testPossible(self):
+        self.check(puzzles(200, random.Random(5)))
+
+    def testImpossible(self):
+        rand = random.Random(6)
+        grids = puzzles(100, rand, wrong=2)
+        self.check(grids)
+        self.assertIn(False, propagate.propagate_many(copies(grids), False))
+
+    def testMixed(self):
+        rand = random.Random(7)
+        grids = puzzles(40, rand) + puzzles(40, rand, wrong=1)
+        rand.shuffle(grids)
+        self.check(grids)
+
+class PropagateTest(unittest.TestCase):
+
+    def testSolves(self):
+        rand = random.Random(8)
+        for size, boxRows, boxCols in SHAPES:
+            rows = solution(size, boxRows, boxCols, rand)
+            grid = Grid.fromRows(rows, size, boxRows, boxCols)
+            for cell in range(0, len(grid), size + 1): # One empty cell per row
+                grid[cell] = 0
+            self.assertTrue(propagate.propagate(grid, False))
+            self.assertEqual(grid, Grid.fromRows(rows, size, boxRows, boxCols))
+
+    def testHiddenSingle(self):
+        # 1 can only go in the last cell of the top row
+        grid = Grid.fromRows([
+            [0, 0, 0, 0],
+            [1, 0, 0, 0],
+            [0, 1, 0, 0],
+            [0, 0, 1, 0],
+        ], 4)
+        self.assertTrue(propagate.propagate(grid, False))
+        self.assertEqual(grid[3], 1)
+
+    def testContradiction(self):
+        grid = Grid.fromRows([[1, 2], [0, 2]], 2)
+        self.assertFalse(propagate.propagate(grid, False))
+
+    def testDefault(self):
+        rand = random.Random(9)
+        with mock.patch.object(propagate, "_propagate_stack") as stack:
+            propagate.propagate_many(puzzles(propagate.STACK_MIN - 1, rand))
+            propagate.propagate(puzzles(1, rand)[0])
+        stack.assert_not_called()
+        if propagate.numpy != None:
+            self.assertEqual(propagate.propagate_many(puzzles(propagate.STACK_MIN * 4, rand)),
+                [True] * propagate.STACK_MIN * 4)
+
+if __name__ == "__main__":
+    unittest.main()
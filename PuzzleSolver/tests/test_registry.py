@@ -0,0 +1,154 @@
+"""
+Tests for finding plugins from their manifests.
+
+"""
+
+# PuzzleSolver
+# Copyright (C) 2010  Andy Gurden
+#
+#     This file is part of PuzzleSolver.
+#
+#     PuzzleSolver is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     PuzzleSolver is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with PuzzleSolver.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+import os
+import sys
+import tempfile
+import types
+import unittest
+
+import solver.state
+from solver import registry
+from solver.utility import paths
+
+from . import support
+
+GOOD = """
+MANIFEST = {"name": "Good", "extension": ".good", "modes": ["PLAY"]}
+"""
+
+PUZZLE = GOOD + """
+import solver.plugin
+
+class Puzzle(solver.plugin.PuzzleType):
+    def name(self):
+        return "Good"
+
+    def get(self, mode):
+        return solver.plugin.DummyView()
+"""
+
+class PluginDirectory(unittest.TestCase):
+    """Makes a fakeplugins package to discover plugins in."""
+
+    def setUp(self):
+        support.isolate(self)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "fakeplugins")
+        os.mkdir(self.path)
+        self.write("__init__.py", "")
+        sys.path.insert(0, directory.name)
+        self.addCleanup(sys.path.remove, directory.name)
+        self.addCleanup(lambda: [sys.modules.pop(m) for m in list(sys.modules)
+            if m.startswith("fakeplugins")])
+        self.module = types.SimpleNamespace(__name__="fakeplugins", __path__=[self.path])
+
+    def write(self, name, source):
+        with open(os.path.join(self.path, name), "w") as file:
+            file.write(source)
+
+class DiscoverTest(PluginDirectory):
+
+    def discover(self):
+        check = self.assertLogs if self.broken else self.assertNoLogs
+        with check(registry.log, "ERROR"):
+            return [info.name for info in registry.discover(self.module)]
+
+    def testGood(self):
+        self.write("good.py", GOOD)
+        self.broken = False
+        self.assertEqual(self.discover(), ["Good"])
+
+    def testBrokenPluginsAreSkipped(self):
+        self.write("good.py", GOOD)
+        self.write("syntax.py", "MANIFEST = {\n")
+        self.write("malformed.py", "MANIFEST = {'extension': '.x'}\n")
+        self.write("notdict.py", "MANIFEST = [1, 2]\n")
+        self.write("raises.py", "raise RuntimeError('broken')\n")
+        self.broken = True
+        self.assertEqual(self.discover(), ["Good"])
+
+    def testUnwritableCache(self):
+        self.write("good.py", GOOD)
+        blocker = os.path.join(self.path, "blocker")
+        open(blocker, "w").close()
+        os.environ["XDG_CACHE_HOME"] = os.path.join(blocker, "cache") # Restored by isolate
+        with self.assertLogs(registry.log, "WARNING"):
+            self.assertEqual([info.name for info in registry.discover(self.module)], ["Good"])
+
+    def testDeletedFilesArePruned(self):
+        self.write("good.py", GOOD)
+        self.write("other.py", GOOD.replace("Good", "Other"))
+        self.broken = False
+        self.assertEqual(self.discover(), ["Good", "Other"])
+        os.remove(os.path.join(self.path, "other.py"))
+        self.assertEqual(self.discover(), ["Good"])
+        with open(paths.cache_file(registry.CACHE_NAME)) as file:
+            cached = json.load(file)
+        self.assertEqual([os.path.basename(f) for f in cached], ["good.py"])
+
+class CatalogueTest(PluginDirectory):
+
+    def setUp(self):
+        PluginDirectory.setUp(self)
+        support.restore_state(self)
+        self.write("good.py", PUZZLE)
+        self.catalogue = registry.Catalogue(registry.discover(self.module))
+        self.info, = self.catalogue
+
+    def testTypesAreSharedAndLazy(self):
+        puzzle = self.catalogue.get(self.info)
+        self.assertIs(self.catalogue.get(self.info), puzzle)
+        self.assertEqual(puzzle.name(), "Good")
+        self.assertEqual(puzzle.extension(), ".good")
+        self.assertEqual(puzzle.pluginId(), "fakeplugins.good")
+        self.assertNotIn("fakeplugins.good", sys.modules)
+        puzzle.get("PLAY")
+        self.assertIn("fakeplugins.good", sys.modules)
+
+    def testMembership(self):
+        puzzle = self.catalogue.get(self.info)
+        self.assertIn(None, self.catalogue)
+        self.assertIn(puzzle, self.catalogue)
+        self.assertNotIn(registry.LazyPuzzleType(self.info), self.catalogue)
+        self.assertNotIn(self.info.load()(), self.catalogue)
+        self.assertIs(self.catalogue.info(puzzle), self.info)
+        self.assertEqual(self.catalogue.info(None), None)
+        self.assertEqual(self.catalogue.info(registry.LazyPuzzleType(self.info)), None)
+
+    def testAllowablePuzzles(self):
+        solver.state.puzzle.allowable = self.catalogue
+        solver.state.mode.change("CREATE")
+        puzzle = self.catalogue.get(self.info)
+        self.assertTrue(solver.state.puzzle.change(puzzle))
+        self.assertFalse(solver.state.puzzle.change(registry.LazyPuzzleType(self.info)))
+        self.assertIs(solver.state.puzzle.value(), puzzle)
+        view = solver.state.view.value()
+        self.assertTrue(solver.state.puzzle.change(None))
+        self.assertTrue(solver.state.puzzle.change(self.catalogue.get(self.info)))
+        self.assertIs(solver.state.view.value(), view) # Same type, so the cached view
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,194 @@
+"""
+Tests for the CDCL satisfiability engine and its encoding helpers.
+
+"""
+
+# PuzzleSolver
+# Copyright (C) 2010  Andy Gurden
+#
+#     This file is part of PuzzleSolver.
+#
+#     PuzzleSolver is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     PuzzleSolver is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with PuzzleSolver.  If not, see <http://www.gnu.org/licenses/>.
+
+import itertools
+import math
+import random
+import unittest
+
+from solver.sat import SatEngine, luby
+
+from . import support
+
+def count_models(engine, lits):
+    """Count solutions distinct on lits, blocking each one as it is found."""
+
+    found = 0
+    while engine.solve():
+        found += 1
+        engine.addClause([-x if engine.value(x) else x for x in lits])
+    return found
+
+def brute_force(vars, clauses):
+    for values in itertools.product((False, True), repeat=vars):
+        if all(any(values[abs(x) - 1] == (x > 0) for x in clause) for clause in clauses):
+            return True
+    return False
+
+class SatEngineTest(unittest.TestCase):
+
+    def testLuby(self):
+        self.assertEqual([luby(i) for i in range(15)], [1, 1, 2, 1, 1, 2, 4, 1, 1, 2, 1, 1, 2, 4, 8])
+
+    def testAgainstBruteForce(self):
+        rand = random.Random(3)
+        for trial in range(150):
+            vars = rand.randint(1, 8)
+            clauses = [[rand.choice((-1, 1)) * rand.randint(1, vars)
+                for i in range(rand.randint(1, 3))] for j in range(rand.randint(1, 5 * vars))]
+            engine = SatEngine()
+            engine.newVars(vars)
+            for clause in clauses:
+                engine.addClause(clause)
+            expected = brute_force(vars, clauses)
+            self.assertEqual(engine.solve(), expected, clauses)
+            if expected:
+                for clause in clauses:
+                    self.assertTrue(any(engine.value(x) for x in clause), clause)
+
+    def testPigeonhole(self):
+        # Five pigeons do not fit in four holes
+        engine = SatEngine()
+        holes = [engine.newVars(4) for pigeon in range(5)]
+        for pigeon in holes:
+            engine.atLeastOne(pigeon)
+        for hole in zip(*holes):
+            engine.atMostOne(hole)
+        self.assertFalse(engine.solve())
+
+    def testCardinalityCounts(self):
+        for n in range(1, 8):
+            for k in range(n + 1):
+                counts = {}
+                for name in ("atMost", "atLeast", "exactly"):
+                    engine = SatEngine()
+                    lits = engine.newVars(n)
+                    getattr(engine, name)(lits, k)
+                    counts[name] = count_models(engine, lits)
+                self.assertEqual(counts["exactly"], math.comb(n, k), (n, k))
+                self.assertEqual(counts["atMost"], sum(math.comb(n, i) for i in range(k + 1)), (n, k))
+                self.assertEqual(counts["atLeast"], sum(math.comb(n, i) for i in range(k, n + 1)), (n, k))
+
+    def testCardinalityBounds(self):
+        for n in range(0, 4):
+            engine = SatEngine()
+            lits = engine.newVars(n)
+            self.assertFalse(engine.atLeast(lits, n + 1), n)
+            self.assertFalse(engine.solve(), n)
+
+            engine = SatEngine()
+            lits = engine.newVars(n)
+            self.assertFalse(engine.exactly(lits, n + 1), n)
+            self.assertFalse(engine.solve(), n)
+
+            engine = SatEngine()
+            lits = engine.newVars(n)
+            self.assertFalse(engine.atMost(lits, -1), n)
+            self.assertFalse(engine.solve(), n)
+
+            for k in (0, -1):
+                engine = SatEngine()
+                lits = engine.newVars(n)
+                self.assertTrue(engine.atLeast(lits, k), (n, k))
+                self.assertEqual(count_models(engine, lits), 2 ** n, (n, k))
+
+    def testIncremental(self):
+        engine = SatEngine()
+        a, b = engine.newVars(2)
+        engine.addClause((a, b))
+        self.assertTrue(engine.solve())
+        engine.addClause((-a,))
+        self.assertTrue(engine.solve())
+        self.assertTrue(engine.value(b))
+        engine.addClause((-b,))
+        self.assertFalse(engine.solve())
+        self.assertRaises(ValueError, engine.model)
+
+    def testUnknownVariable(self):
+        engine = SatEngine()
+        engine.newVar()
+        self.assertRaises(ValueError, engine.addClause, (2,))
+        self.assertRaises(ValueError, engine.addClause, (0,))
+
+    def testConnected(self):
+        # Pick exactly three edges of a 2x3 grid that join four used cells
+        cells = [(r, c) for r in range(2) for c in range(3)]
+        pairs = [(a, b) for a in cells for b in cells
+            if a < b and abs(a[0] - b[0]) + abs(a[1] - b[1]) == 1]
+        engine = SatEngine()
+        edges = dict(zip(pairs, engine.newVars(len(pairs))))
+        nodes = dict(zip(cells, engine.newVars(len(cells))))
+        for (a, b), lit in edges.items():
+            engine.addClause((-lit, nodes[a]))
+            engine.addClause((-lit, nodes[b]))
+        engine.exactly(nodes.values(), 4)
+        engine.exactly(edges.values(), 2)
+        engine.requireConnected(edges, nodes)
+        # Two edges can only connect three cells
+        self.assertFalse(engine.solve())
+
+    def testConnectedFound(self):
+        cells = [(r, c) for r in range(3) for c in range(3)]
+        pairs = [(a, b) for a in cells for b in cells
+            if a < b and abs(a[0] - b[0]) + abs(a[1] - b[1]) == 1]
+        engine = SatEngine()
+        edges = dict(zip(pairs, engine.newVars(len(pairs))))
+        engine.exactly(edges.values(), 4)
+        # Force two edges at opposite corners
+        engine.addClause((edges[((0, 0), (0, 1))],))
+        engine.addClause((edges[((2, 1), (2, 2))],))
+        engine.requireConnected(edges)
+        self.assertTrue(engine.solve())
+        chosen = [pair for pair, lit in edges.items() if engine.value(lit)]
+        self.assertEqual(len(chosen), 4)
+        seen = {chosen[0][0]}
+        for i in range(len(chosen)):
+            for a, b in chosen:
+                if a in seen or b in seen:
+                    seen.update((a, b))
+        self.assertEqual(seen, set(n for pair in chosen for n in pair))
+
+    def testConnectedThroughFalseNode(self):
+        # Node 1's literal is not tied to its edges, so is false while edge (1, 2) is used
+        engine = SatEngine()
+        x, e1, e2, e3 = engine.newVars(4)
+        engine.addClause((-x,))
+        engine.addClause((e1,))
+        engine.addClause((e2,))
+        engine.requireConnected({(1, 2): e1, (3, 4): e2, (2, 3): e3}, {1: x})
+        self.assertTrue(engine.solve())
+        self.assertTrue(engine.value(e3))
+
+    def testCancel(self):
+        engine = SatEngine()
+        holes = [engine.newVars(8) for pigeon in range(9)]
+        for pigeon in holes:
+            engine.atLeastOne(pigeon)
+        for hole in zip(*holes):
+            for a, b in itertools.combinations(hole, 2):
+                engine.addClause((-a, -b))
+        context = support.context(self, support.CancelAfter(0))
+        self.assertEqual(engine.solve(context), None)
+
+if __name__ == "__main__":
+    unittest.main()
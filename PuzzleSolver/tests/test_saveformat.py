@@ -0,0 +1,133 @@
+"""
+Tests for the saved puzzle file format.
+
+"""
+
+# PuzzleSolver
+# Copyright (C) 2010  Andy Gurden
+#
+#     This file is part of PuzzleSolver.
+#
+#     PuzzleSolver is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     PuzzleSolver is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with PuzzleSolver.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import pickle
+import struct
+import tempfile
+import unittest
+
+from solver import saveformat
+import solver.plugin
+
+import plugins.concrete
+
+class PickledType(solver.plugin.PuzzleType):
+    """Leaves its puzzles to be pickled."""
+
+    def name(self):
+        return "Pickled"
+
+    def get(self, mode):
+        return None
+
+class SaveFormatTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.filename = os.path.join(directory.name, "puzzle" + plugins.concrete.EXTENSION)
+        self.ptype = plugins.concrete.Puzzle()
+
+    def rewrite(self, data):
+        with open(self.filename, "wb") as file:
+            file.write(data)
+
+    def testRoundTrip(self):
+        for codec in saveformat.CODECS:
+            saveformat.write(self.filename, self.ptype, "hello " * 100, codec)
+            self.assertEqual(saveformat.read(self.filename, self.ptype), "hello " * 100, codec)
+            self.assertEqual(saveformat.read_header(self.filename).codec, codec)
+
+    def testRoundTripPickled(self):
+        ptype = PickledType()
+        saveformat.write(self.filename, ptype, {"a": [1, 2]})
+        self.assertEqual(saveformat.read_header(self.filename).encoding, saveformat.PICKLED)
+        self.assertEqual(saveformat.read(self.filename, ptype), {"a": [1, 2]})
+
+    def testRoundTripMapped(self):
+        puzzle = "x" * (saveformat.MMAP_THRESHOLD + 10)
+        saveformat.write(self.filename, self.ptype, puzzle, None)
+        self.assertEqual(saveformat.read(self.filename, self.ptype), puzzle)
+
+    def testIncompressibleStoredRaw(self):
+        saveformat.write(self.filename, self.ptype, "short", "zlib")
+        header = saveformat.read_header(self.filename)
+        self.assertEqual(header.codec, None)
+        self.assertEqual(header.storedSize, len("short"))
+        self.assertEqual(os.path.getsize(self.filename), saveformat.HEADER_SIZE + len("short"))
+        self.assertEqual(saveformat.read(self.filename, self.ptype), "short")
+
+    def testReplacesWithoutLeftovers(self):
+        saveformat.write(self.filename, self.ptype, "first")
+        saveformat.write(self.filename, self.ptype, "second")
+        self.assertEqual(saveformat.read(self.filename, self.ptype), "second")
+        self.assertEqual(os.listdir(os.path.dirname(self.filename)), [os.path.basename(self.filename)])
+
+    def testLegacyPickle(self):
+        self.rewrite(pickle.dumps("old puzzle"))
+        self.assertEqual(saveformat.read_header(self.filename), None)
+        self.assertEqual(saveformat.read(self.filename, self.ptype), "old puzzle")
+
+    def testCorruptLegacyPickle(self):
+        self.rewrite(b"not a pickle at all")
+        self.assertRaises(saveformat.SaveFormatError, saveformat.read, self.filename, self.ptype)
+
+    def corruptHeader(self, offset, value):
+        saveformat.write(self.filename, self.ptype, "hello " * 100)
+        with open(self.filename, "rb") as file:
+            data = bytearray(file.read())
+        data[offset:offset + len(value)] = value
+        self.rewrite(bytes(data))
+
+    def testCorruptHeader(self):
+        corruptions = [
+            (4, struct.pack("<H", saveformat.VERSION + 1)), # Version
+            (6, b"\x7f"), # Codec
+            (8, b"\xff\xfe"), # Plugin id
+            (8, b"plugins.other"),
+            (40, struct.pack("<Q", 12)), # Raw size
+            (48, struct.pack("<Q", 1 << 40)), # Stored size
+        ]
+        for offset, value in corruptions:
+            self.corruptHeader(offset, value)
+            with self.assertRaises(saveformat.SaveFormatError, msg=offset):
+                saveformat.read(self.filename, self.ptype)
+
+    def testTruncated(self):
+        saveformat.write(self.filename, self.ptype, "hello " * 100)
+        with open(self.filename, "rb") as file:
+            data = file.read()
+        self.rewrite(data[:-5])
+        self.assertRaises(saveformat.SaveFormatError, saveformat.read, self.filename, self.ptype)
+
+    def testCorruptBody(self):
+        self.rewrite(saveformat.Header(self.ptype.pluginId(), None, saveformat.ENCODED, 2, 2).pack()
+            + b"\xff\xfe")
+        self.assertRaises(saveformat.SaveFormatError, saveformat.read, self.filename, self.ptype)
+        self.rewrite(saveformat.Header(self.ptype.pluginId(), "zlib", saveformat.ENCODED, 2, 2).pack()
+            + b"\xff\xfe")
+        self.assertRaises(saveformat.SaveFormatError, saveformat.read, self.filename, self.ptype)
+
+if __name__ == "__main__":
+    unittest.main()
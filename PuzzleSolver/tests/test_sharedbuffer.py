@@ -0,0 +1,76 @@
+"""
+Tests for shared memory buffers.
+
+"""
+
+# PuzzleSolver
+# Copyright (C) 2010  Andy Gurden
+#
+#     This file is part of PuzzleSolver.
+#
+#     PuzzleSolver is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     PuzzleSolver is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with PuzzleSolver.  If not, see <http://www.gnu.org/licenses/>.
+
+import pickle
+import unittest
+
+import solver.pool
+from solver.sharedbuffer import SharedBuffer
+
+def _upper(pickled):
+    buffer = pickle.loads(pickled)
+    buffer.view[:] = bytes(buffer.view).upper()
+    buffer.cast("q")
+    buffer.close()
+
+class SharedBufferTest(unittest.TestCase):
+
+    def testPublish(self):
+        buffer = SharedBuffer.publish(b"hello")
+        self.addCleanup(buffer.close)
+        self.assertEqual(buffer.size, 5)
+        self.assertEqual(bytes(buffer.view), b"hello")
+
+    def testEmpty(self):
+        buffer = SharedBuffer.publish(b"")
+        self.assertEqual(bytes(buffer.view), b"")
+        buffer.close()
+
+    def testPicklesByName(self):
+        buffer = SharedBuffer.publish(b"x" * 100000)
+        self.addCleanup(buffer.close)
+        self.assertLess(len(pickle.dumps(buffer)), 200)
+
+    def testWrittenBySolvingProcess(self):
+        buffer = SharedBuffer.publish(b"abcdefgh")
+        self.addCleanup(buffer.close)
+        proc = solver.pool.context().Process(target=_upper, args=(pickle.dumps(buffer),))
+        proc.start()
+        proc.join()
+        self.assertEqual(proc.exitcode, 0)
+        self.assertEqual(bytes(buffer.view), b"ABCDEFGH") # Still there after the other side closed
+
+    def testCloseFreesOnlyOnOwner(self):
+        buffer = SharedBuffer.publish(b"abcdefgh")
+        pickled = pickle.dumps(buffer)
+        attached = pickle.loads(pickled)
+        values = attached.cast("q")
+        attached.close()
+        attached.close() # Closing twice does nothing
+        self.assertRaises(ValueError, len, values) # Views were released
+        self.assertEqual(bytes(buffer.view), b"abcdefgh")
+        buffer.close()
+        self.assertRaises(FileNotFoundError, pickle.loads, pickled)
+
+if __name__ == "__main__":
+    unittest.main()
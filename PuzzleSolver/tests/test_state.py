@@ -0,0 +1,150 @@
+"""
+Tests for the global state, its transactions and the view cache.
+
+"""
+
+# PuzzleSolver
+# Copyright (C) 2010  Andy Gurden
+#
+#     This file is part of PuzzleSolver.
+#
+#     PuzzleSolver is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     PuzzleSolver is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with PuzzleSolver.  If not, see <http://www.gnu.org/licenses/>.
+
+import functools
+import types
+import unittest
+from unittest import mock
+
+import solver.plugin
+import solver.state
+from solver.gui import puzzlechoice
+from solver.gui import viewframe
+
+from . import support
+
+class FakeView(solver.plugin.DummyView):
+    """View whose unsaved changes are just a flag."""
+
+    def __init__(self):
+        solver.plugin.DummyView.__init__(self)
+        self.edited = False
+        self.released = False
+
+    def changed(self):
+        return self.edited
+
+    def saved(self):
+        self.edited = False
+
+    def release(self):
+        self.released = True
+
+class FakeType:
+    """Puzzle type that makes FakeViews."""
+
+    def __init__(self, name):
+        self.label = name
+
+    def name(self):
+        return self.label
+
+    def get(self, mode):
+        return FakeView()
+
+class ViewCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        support.restore_state(self)
+        self.a = FakeType("a")
+        self.b = FakeType("b")
+        solver.state.mode.change("CREATE")
+
+    def testCachedViewIsReused(self):
+        solver.state.puzzle.change(self.a)
+        first = solver.state.view.value()
+        solver.state.puzzle.change(self.b)
+        solver.state.puzzle.change(self.a)
+        self.assertIs(solver.state.view.value(), first)
+
+    def testDiscardedChangesAreNotKept(self):
+        solver.state.puzzle.change(self.a)
+        first = solver.state.view.value()
+        first.edited = True # The user edits, then leaves without saving
+        solver.state.puzzle.change(self.b)
+        self.assertTrue(first.released)
+        solver.state.puzzle.change(self.a)
+        self.assertIsNot(solver.state.view.value(), first)
+        self.assertFalse(solver.state.view.value().changed())
+
+    def testSavedViewIsKept(self):
+        solver.state.puzzle.change(self.a)
+        first = solver.state.view.value()
+        first.edited = True
+        first.saved()
+        solver.state.mode.change("PLAY")
+        solver.state.mode.change("CREATE")
+        self.assertIs(solver.state.view.value(), first)
+
+class PromptTest(unittest.TestCase):
+    """Count the save prompts the ViewFrame's vitos give when switching puzzle."""
+
+    def setUp(self):
+        support.restore_state(self)
+        self.answer = True # As if the user chose not to save
+        self.prompts = 0
+        saver = mock.patch.object(viewframe, "PuzzleSaver", lambda: types.SimpleNamespace(check=self.check))
+        saver.start()
+        self.addCleanup(saver.stop)
+
+        frame = types.SimpleNamespace()
+        solver.state.mode.vitoChange(functools.partial(viewframe.ViewFrame.vitoPuzzleOrModeChange, frame))
+        solver.state.puzzle.vitoChange(functools.partial(viewframe.ViewFrame.vitoPuzzleOrModeChange, frame))
+        solver.state.wiping.vitoChange(functools.partial(viewframe.ViewFrame.vitoWiping, frame))
+
+        self.a = FakeType("a")
+        self.b = FakeType("b")
+        self.chooser = types.SimpleNamespace(catalogue=types.SimpleNamespace(get=lambda p: p),
+            setSelected=lambda p: None)
+        self.choose(self.a)
+        solver.state.view.value().edited = True
+
+    def check(self, master):
+        if not solver.state.view.value().changed():
+            return True
+        self.prompts += 1
+        return self.answer
+
+    def choose(self, puzzle):
+        puzzlechoice.PuzzleChoice.changePuzzle(self.chooser, puzzle)
+
+    def testOnePromptPerSwitch(self):
+        self.choose(self.b)
+        self.assertEqual(self.prompts, 1)
+        self.assertIs(solver.state.puzzle.value(), self.b)
+        self.assertEqual(solver.state.mode.value(), "CREATE")
+
+    def testCancelledSwitch(self):
+        self.answer = False
+        self.choose(self.b)
+        self.assertEqual(self.prompts, 1)
+        self.assertIs(solver.state.puzzle.value(), self.a)
+
+    def testPromptsAgainInNextTransaction(self):
+        self.choose(self.b)
+        solver.state.view.value().edited = True
+        self.choose(self.a)
+        self.assertEqual(self.prompts, 2)
+
+if __name__ == "__main__":
+    unittest.main()
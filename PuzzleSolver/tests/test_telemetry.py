@@ -0,0 +1,88 @@
+"""
+Tests for the log of solves.
+
+"""
+
+# PuzzleSolver
+# Copyright (C) 2010  Andy Gurden
+#
+#     This file is part of PuzzleSolver.
+#
+#     PuzzleSolver is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     PuzzleSolver is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with PuzzleSolver.  If not, see <http://www.gnu.org/licenses/>.
+
+import multiprocessing
+import os
+import unittest
+from unittest import mock
+
+import solver.telemetry
+
+from . import support
+
+WRITERS = 4
+RECORDS = 150
+
+def _write(number):
+    for i in range(RECORDS):
+        solver.telemetry.record({"writer": number, "i": i, "padding": "x" * 40})
+
+class LogTest(unittest.TestCase):
+
+    def setUp(self):
+        support.isolate(self)
+
+    @unittest.skipUnless(solver.telemetry.fcntl != None
+        and "fork" in multiprocessing.get_all_start_methods(), "Needs fcntl and fork")
+    def testConcurrentRotation(self):
+        # Enough backups to keep everything, rotating many times over
+        with mock.patch.multiple(solver.telemetry, MAX_BYTES=2000, BACKUPS=200):
+            ctx = multiprocessing.get_context("fork")
+            procs = [ctx.Process(target=_write, args=(n,)) for n in range(WRITERS)]
+            for proc in procs:
+                proc.start()
+            for proc in procs:
+                proc.join()
+            found = [(e["writer"], e["i"]) for e in solver.telemetry.records()]
+            self.assertTrue(os.path.exists(solver.telemetry.log_file() + ".20"))
+        self.assertEqual(sorted(found), [(n, i) for n in range(WRITERS) for i in range(RECORDS)])
+        for n in range(WRITERS): # Each writer's records stay in order
+            self.assertEqual([i for w, i in found if w == n], list(range(RECORDS)))
+
+    def testRotationKeepsBackups(self):
+        with mock.patch.multiple(solver.telemetry, MAX_BYTES=500, BACKUPS=2):
+            _write(0)
+            found = [e["i"] for e in solver.telemetry.records()]
+        self.assertEqual(found, list(range(found[0], RECORDS)))
+        self.assertLess(len(found), RECORDS)
+
+@unittest.skipIf(solver.telemetry.resource == None, "Needs the resource module")
+class UsageTest(unittest.TestCase):
+
+    def testGrowth(self):
+        started = solver.telemetry.begin()
+        held = bytearray(64 << 20)
+        held[::4096] = b"x" * len(held[::4096]) # Touch every page
+        used = solver.telemetry.usage(started)
+        self.assertGreater(used["rss_growth"], 32 << 20)
+        self.assertGreaterEqual(used["worker_rss"], used["rss_growth"])
+
+        # Nothing new is needed for a second solve in the same process
+        del held
+        started = solver.telemetry.begin()
+        used = solver.telemetry.usage(started)
+        self.assertLess(used["rss_growth"], 8 << 20)
+        self.assertGreater(used["worker_rss"], 32 << 20)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+"""
+Tests for Zobrist hashing and the transposition table.
+
+"""
+
+# PuzzleSolver
+# Copyright (C) 2010  Andy Gurden
+#
+#     This file is part of PuzzleSolver.
+#
+#     PuzzleSolver is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     PuzzleSolver is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with PuzzleSolver.  If not, see <http://www.gnu.org/licenses/>.
+
+import random
+import unittest
+
+from solver import transposition
+from solver.transposition import Zobrist, TranspositionTable
+
+from . import support
+
+class ZobristTest(unittest.TestCase):
+
+    def testIncrementalMatchesRehash(self):
+        zobrist = Zobrist(20, 5)
+        rand = random.Random(1)
+        board = [rand.randrange(5) for i in range(20)]
+        h = zobrist.hash(board)
+        for i in range(200):
+            cell, new = rand.randrange(20), rand.randrange(5)
+            h = zobrist.change(h, cell, board[cell], new)
+            board[cell] = new
+            self.assertEqual(h, zobrist.hash(board))
+
+    def testSameSeedSameKeys(self):
+        self.assertEqual(Zobrist(9, 3, seed=4).keys, Zobrist(9, 3, seed=4).keys)
+        self.assertNotEqual(Zobrist(9, 3, seed=4).keys, Zobrist(9, 3, seed=5).keys)
+
+class TableTest(unittest.TestCase):
+
+    def testSizedToBudget(self):
+        for budget in (transposition.ENTRY_SIZE, 1000, 1 << 16, (1 << 16) - 1):
+            table = TranspositionTable(budget)
+            self.assertEqual(table.size & (table.size - 1), 0, budget)
+            self.assertLessEqual(table.size * transposition.ENTRY_SIZE, budget)
+            self.assertGreater(table.size * 2 * transposition.ENTRY_SIZE, budget)
+        self.assertEqual(TranspositionTable(0).size, 1)
+
+    def testUnknownPolicy(self):
+        self.assertRaises(ValueError, TranspositionTable, 1000, "sometimes")
+
+    def colliding(self, table):
+        # Keys sharing a slot but not equal
+        return 5, 5 + table.size
+
+    def testDepthPreferred(self):
+        table = TranspositionTable(1000)
+        first, second = self.colliding(table)
+        self.assertTrue(table.store(first, 10, depth=3))
+        self.assertFalse(table.store(second, 20, depth=2))
+        self.assertEqual(table.lookup(first), (10, 3))
+        self.assertEqual(table.lookup(second), None)
+        self.assertTrue(table.store(second, 20, depth=4))
+        self.assertEqual(table.lookup(second), (20, 4))
+        self.assertEqual(table.lookup(first), None)
+        self.assertEqual(table.replaced, 1)
+
+    def testAlwaysReplace(self):
+        table = TranspositionTable(1000, transposition.ALWAYS_REPLACE)
+        first, second = self.colliding(table)
+        table.store(first, 10, depth=3)
+        self.assertTrue(table.store(second, 20, depth=0))
+        self.assertEqual(table.lookup(second), (20, 0))
+        self.assertEqual(table.lookup(first), None)
+
+    def testVisit(self):
+        table = TranspositionTable(1000)
+        self.assertFalse(table.visit(7, 2))
+        self.assertTrue(table.visit(7, 1))
+        self.assertTrue(table.visit(7, 2))
+        self.assertFalse(table.visit(7, 3))
+        self.assertFalse(table.visit(0)) # Zero is a key like any other
+        self.assertTrue(table.visit(0))
+
+    def testCounters(self):
+        table = TranspositionTable(1000)
+        first, second = self.colliding(table)
+        table.lookup(first)
+        table.store(first, 1)
+        table.store(first, 2)
+        table.store(8, 3)
+        table.lookup(first)
+        table.lookup(8)
+        table.store(second, 4)
+        self.assertEqual(table.stats(), (2, 1, 2, 1))
+        self.assertAlmostEqual(table.hitRate(), 2 / 3)
+
+        context = support.context(self, fields=transposition.FIELDS)
+        table.report(context.progress)
+        self.assertEqual(context.progress["table_hits"], 2)
+        self.assertEqual(context.progress["table_replaced"], 1)
+        self.assertIn("table replaced 1", context.progress.describe())
+
+        table.clear()
+        self.assertEqual(table.stats(), (0, 0, 0, 0))
+        self.assertEqual(table.lookup(first), None)
+
+if __name__ == "__main__":
+    unittest.main()
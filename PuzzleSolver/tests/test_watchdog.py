@@ -0,0 +1,83 @@
+"""
+Tests for the event loop watchdog.
+
+"""
+
+# PuzzleSolver
+# Copyright (C) 2010  Andy Gurden
+#
+#     This file is part of PuzzleSolver.
+#
+#     PuzzleSolver is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     PuzzleSolver is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with PuzzleSolver.  If not, see <http://www.gnu.org/licenses/>.
+
+import io
+import time
+import unittest
+
+import solver.state
+from solver.gui import watchdog
+
+from . import support
+
+SLOW = 0.2 # Seconds the slow callback blocks for
+
+def _slow(value):
+    time.sleep(SLOW)
+
+def _fast(value):
+    pass
+
+class WatchdogTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tcl = support.tcl()
+        self.dog = watchdog.Watchdog(support.FakeWidget(self.tcl), overlay=False)
+        self.addCleanup(setattr, solver.state, "timer", solver.state.timer)
+        self.addCleanup(self.dog.stop)
+        self.value = solver.state.WatchedValue(0)
+        self.value.onChange(_fast)
+        self.value.onChange(_slow)
+
+    def testTimesSlowCommit(self):
+        self.dog.start()
+        self.value.change(1)
+        self.value.change(2)
+        (name, calls, total, worst), fast = self.dog.slowest()
+        self.assertEqual(name, "tests.test_watchdog._slow")
+        self.assertEqual(calls, 2)
+        self.assertGreaterEqual(worst, SLOW)
+        self.assertGreaterEqual(total, 2 * SLOW)
+        self.assertEqual(fast[:2], ("tests.test_watchdog._fast", 2))
+        self.assertEqual(self.value.value(), 2)
+
+    def testTickFiresLateAfterSlowCommit(self):
+        self.dog.start()
+        self.tcl.after(0, lambda: self.value.change(1))
+        support.pump(self.tcl, lambda: len(self.dog.delays) >= 2)
+        p50, p99, worst = self.dog.stalls()
+        self.assertGreater(worst, SLOW - 2 * self.dog.INTERVAL_MS / 1000)
+        self.assertIn("_slow", self.dog.summary())
+
+    def testStopped(self):
+        self.dog.start()
+        self.dog.stop()
+        self.assertEqual(solver.state.timer, None)
+        self.value.change(1)
+        self.assertEqual(self.dog.slowest(), [])
+        out = io.StringIO()
+        self.dog.report(out)
+        self.assertEqual(out.getvalue(), "Watchdog: no ticks recorded.\n")
+
+if __name__ == "__main__":
+    unittest.main()